@@ -0,0 +1,87 @@
+import json
+from typing import Any, Dict, Optional
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from app.core.utils import graph_content_hash
+
+# Suffixes appended to the ETag by CompressionMiddleware so each encoding keeps a distinct strong validator
+ENCODING_ETAG_SUFFIXES = ("-gzip", "-br")
+# If-None-Match only yields 304 on these; other methods would owe a 412 (RFC 9110 13.1.2)
+SAFE_METHODS = ("GET", "HEAD")
+
+
+def make_etag(payload: Any) -> str:
+    """Strong ETag derived from the content hash of the payload."""
+    return f'"{graph_content_hash(payload)}"'
+
+
+def _normalize_etag(tag: str) -> str:
+    tag = tag.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    tag = tag.strip('"')
+    for suffix in ENCODING_ETAG_SUFFIXES:
+        if tag.endswith(suffix):
+            tag = tag[: -len(suffix)]
+            break
+    return tag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Evaluate an If-None-Match header against an ETag (weak comparison, RFC 9110).
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    current = _normalize_etag(etag)
+    return any(_normalize_etag(candidate) == current for candidate in if_none_match.split(","))
+
+
+def conditional_json_response(
+    request: Request,
+    payload: Any,
+    etag: Optional[str] = None,
+    headers: Optional[Dict[str, str]] = None,
+) -> Response:
+    """
+    Serve a JSON payload with a strong ETag, answering 304 Not Modified
+    when the client already holds the same representation (GET/HEAD only:
+    other methods always get the full body, with the ETag).
+    """
+    etag = etag or make_etag(payload)
+    if _revalidated(request, etag):
+        return not_modified_response(etag, headers)
+
+    body = json.dumps(jsonable_encoder(payload), ensure_ascii=False, separators=(",", ":"))
+    return Response(content=body, media_type=JSONResponse.media_type, headers=_validator_headers(etag, headers))
+
+
+def conditional_bytes_response(
+    request: Request,
+    body: bytes,
+    etag: str,
+    headers: Optional[Dict[str, str]] = None,
+    media_type: str = JSONResponse.media_type,
+) -> Response:
+    """Same as conditional_json_response for an already serialized body."""
+    if _revalidated(request, etag):
+        return not_modified_response(etag, headers)
+    return Response(content=body, media_type=media_type, headers=_validator_headers(etag, headers))
+
+
+def _revalidated(request: Request, etag: str) -> bool:
+    return request.method in SAFE_METHODS and etag_matches(request.headers.get("if-none-match"), etag)
+
+
+def not_modified_response(etag: str, headers: Optional[Dict[str, str]] = None) -> Response:
+    return Response(status_code=304, headers=_validator_headers(etag, headers))
+
+
+def _validator_headers(etag: str, headers: Optional[Dict[str, str]]) -> Dict[str, str]:
+    response_headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if headers:
+        response_headers.update(headers)
+    return response_headers
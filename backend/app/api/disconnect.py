@@ -0,0 +1,46 @@
+import asyncio
+from typing import Awaitable, TypeVar
+from fastapi import Request
+from app.core.metrics import CLIENT_DISCONNECTS
+
+T = TypeVar("T")
+
+# nginx's "client closed request"; never seen by the client, shows up in access logs and traces
+CLIENT_CLOSED_REQUEST = 499
+
+
+class ClientDisconnected(Exception):
+    """The client went away before the response was ready; the work was cancelled."""
+
+
+async def _wait_for_disconnect(request: Request) -> None:
+    # The body has been read by then: the next ASGI message can only be the disconnect
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def cancel_on_disconnect(request: Request, work: Awaitable[T], endpoint: str) -> T:
+    """
+    Await `work`, cancelling it as soon as the client disconnects (tab closed,
+    Generate clicked again...). Cancellation reaches the upstream LLM call, whose
+    HTTP request is aborted; work shared with other clients (single-flight) keeps
+    running for them.
+    """
+    task = asyncio.ensure_future(work)
+    watcher = asyncio.create_task(_wait_for_disconnect(request))
+    try:
+        await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    except BaseException:
+        watcher.cancel()
+        task.cancel()
+        raise
+    watcher.cancel()
+    if task.done():
+        return task.result()
+
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    CLIENT_DISCONNECTS.inc(endpoint=endpoint)
+    raise ClientDisconnected()
@@ -0,0 +1,48 @@
+from typing import Annotated, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import PlainTextResponse, Response
+from app.core import profiling
+
+
+def require_admin(x_admin_token: Annotated[Optional[str], Header()] = None) -> None:
+    # Without PROFILING_ADMIN_TOKEN the admin API does not exist
+    if profiling.admin_token() is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not profiling.is_admin(x_admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+@router.get("/profiles")
+async def list_profiles():
+    """Profiles kept by this worker, most recent first (PROFILING_MAX_PROFILES)."""
+    return {"profiles": profiling.get_profile_store().list()}
+
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(profile_id: str, format: str = "text", sort: str = "cumulative", limit: int = 60):
+    """
+    One profile: a readable report (`text`), the raw pstats file of a cProfile run
+    (`pstats`, for snakeviz / `python -m pstats`) or folded stacks of a sampled
+    one (`folded`, for flamegraph.pl / speedscope).
+    """
+    entry = profiling.get_profile_store().get(profile_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Unknown profile (expired or served by another worker)")
+
+    if format == "pstats":
+        if entry["stats"] is None:
+            raise HTTPException(status_code=400, detail="Sampled profile: use format=folded")
+        return Response(
+            profiling.cprofile_dump(entry), media_type="application/octet-stream",
+            headers={"Content-Disposition": f"attachment; filename={profile_id}.prof"},
+        )
+    if format == "folded":
+        return PlainTextResponse(profiling.folded_stacks(entry))
+    if format != "text":
+        raise HTTPException(status_code=400, detail="format must be text, pstats or folded")
+    if entry["stats"] is not None:
+        return PlainTextResponse(profiling.cprofile_report(entry, sort=sort, limit=limit))
+    return PlainTextResponse(profiling.samples_report(entry, limit=limit))
@@ -1,8 +1,17 @@
-from fastapi import APIRouter, HTTPException
+import os
+from io import BytesIO
+from fastapi import APIRouter, HTTPException, Query, Request
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from starlette.concurrency import run_in_threadpool
+from typing import Callable, Iterator, List, Dict, Any, Optional
 from app.services.export_service import ExportService
+from app.services.archimate_exchange import export_exchange, load_graph_dict
+from app.services.render_service import RenderInputError, render_pdf, render_svg
+from app.api.conditional import conditional_bytes_response
+from app.core.shared_cache import get_shared_cache
+from app.core.utils import graph_content_hash
+from app.core.metrics import EXPORT_BYTES, IN_FLIGHT, timed
 
 router = APIRouter()
 export_service = ExportService()
@@ -15,6 +24,7 @@ class ExportGraphRequest(BaseModel):
 async def export_pptx(data: ExportGraphRequest):
     """
     Export the provided graph data (nodes/edges) to a PowerPoint file.
+    Decks are cached by graph content hash in the shared cache.
     """
     try:
         # data.dict() might be needed or just data.nodes
@@ -23,7 +33,20 @@ async def export_pptx(data: ExportGraphRequest):
             "edges": data.edges
         }
         
-        file_stream = export_service.create_pptx(graph_data)
+        # Same graph -> same deck: reuse a rendering from any worker
+        cache = get_shared_cache().namespace("export")
+        # Hashing and building the deck are CPU-bound: off the event loop, like the renders
+        key = await run_in_threadpool(graph_content_hash, ["pptx", graph_data])
+        cached = await cache.aget(key)
+        if cached is not None:
+            file_stream = BytesIO(cached)
+        else:
+            with IN_FLIGHT.track_inprogress(endpoint="export_pptx"), timed("export_pptx"):
+                file_stream = await run_in_threadpool(export_service.create_pptx, graph_data)
+            body = file_stream.getvalue()
+            EXPORT_BYTES.observe(len(body), format="pptx")
+            if len(body) <= _export_cache_max_bytes():
+                await cache.aset(key, body, float(os.getenv("EXPORT_CACHE_TTL", "600")))
         
         headers = {
             "Content-Disposition": "attachment; filename=architecture.pptx"
@@ -38,3 +61,120 @@ async def export_pptx(data: ExportGraphRequest):
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
+
+
+def _export_cache_max_bytes() -> int:
+    return int(os.getenv("EXPORT_CACHE_MAX_BYTES", str(10 * 1024 * 1024)))
+
+
+def _counted(chunks: Iterator[bytes], export_format: str, store: Optional[Callable[[bytes], None]] = None) -> Iterator[bytes]:
+    """
+    Pass a streamed export through, observing its size once the last chunk is
+    out; with `store`, the complete body is handed over too (unless larger than
+    EXPORT_CACHE_MAX_BYTES, or the client went away before the end).
+    """
+    size = 0
+    kept: Optional[List[bytes]] = [] if store is not None else None
+    limit = _export_cache_max_bytes()
+    for chunk in chunks:
+        size += len(chunk)
+        if kept is not None and size > limit:
+            kept = None
+        if kept is not None:
+            kept.append(chunk)
+        yield chunk
+    EXPORT_BYTES.observe(size, format=export_format)
+    if kept is not None:
+        store(b"".join(kept))
+
+
+@router.post("/archimate")
+async def export_archimate(data: ExportGraphRequest, name: str = "DrawTogaf model"):
+    """
+    Export the graph as an ArchiMate Model Exchange file (Archi, BiZZdesign, Sparx...):
+    elements, relationships and one view with the canvas positions, Groupings
+    nesting what they compose or aggregate. The XML is written and sent chunk by
+    chunk, so large models start downloading at once.
+    """
+    graph, positions = await run_in_threadpool(load_graph_dict, {"nodes": data.nodes, "edges": data.edges})
+    # A sync generator: StreamingResponse pulls each chunk in the threadpool, off the event loop
+    chunks = _counted(export_exchange(graph, positions, name=name), "archimate")
+    return StreamingResponse(
+        chunks,
+        media_type="application/xml",
+        headers={"Content-Disposition": "attachment; filename=architecture.xml"},
+    )
+
+
+RENDER_FORMATS = {
+    "svg": ("image/svg+xml", render_svg),
+    "pdf": ("application/pdf", render_pdf),
+}
+
+
+async def _rendered(request: Request, data: ExportGraphRequest, export_format: str, **options):
+    """
+    Serve a rendering from the shared render cache, keyed by the graph content
+    hash and the options; on a miss, stream it as it is rendered and cache the
+    result. The key is the ETag, and Content-Location names the GET route
+    (render_by_key) where a client holding it can revalidate with If-None-Match.
+    """
+    media_type, render = RENDER_FORMATS[export_format]
+    graph_data = {"nodes": data.nodes, "edges": data.edges}
+    key = await run_in_threadpool(graph_content_hash, ["render", export_format, options, graph_data])
+    etag = f'"{key}"'
+    # Exports download; thumbnails (a width asked for) display inline
+    disposition = "inline" if options.get("width") else "attachment"
+    headers = {
+        "Content-Disposition": f"{disposition}; filename=architecture.{export_format}",
+        "Content-Location": request.url_for("render_by_key", key=key, export_format=export_format).path,
+    }
+
+    cache = get_shared_cache().namespace("render")
+    cached = await cache.aget(key)
+    if cached is not None:
+        return conditional_bytes_response(request, cached, etag, headers, media_type=media_type)
+
+    # The layout is read (and checked) here, before the status line goes out
+    try:
+        rendering = await run_in_threadpool(render, graph_data, **options)
+    except RenderInputError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    ttl = float(os.getenv("EXPORT_CACHE_TTL", "600"))
+    # The sync generator runs in the threadpool, so storing from it does not block the loop
+    chunks = _counted(rendering, export_format, store=lambda body: cache.set(key, body, ttl))
+    return StreamingResponse(
+        chunks, media_type=media_type, headers={**headers, "ETag": etag, "Cache-Control": "no-cache"}
+    )
+
+
+@router.get("/render/{key}.{export_format}", name="render_by_key")
+async def render_by_key(request: Request, key: str, export_format: str):
+    """
+    A cached rendering by its key (the ETag of the POST /svg or /pdf that made
+    it), where If-None-Match revalidates with a 304; 404 once it has left the
+    cache.
+    """
+    if export_format not in RENDER_FORMATS:
+        raise HTTPException(status_code=404, detail="Unknown render format")
+    etag = f'"{key}"'
+    headers = {"Content-Disposition": f"inline; filename=architecture.{export_format}"}
+    cached = await get_shared_cache().namespace("render").aget(key)
+    if cached is None:
+        raise HTTPException(status_code=404, detail="Rendering not cached")
+    return conditional_bytes_response(request, cached, etag, headers, media_type=RENDER_FORMATS[export_format][0])
+
+
+@router.post("/svg")
+async def export_svg(request: Request, data: ExportGraphRequest, width: Optional[float] = Query(None, gt=0, le=10000)):
+    """
+    Render the diagram as SVG (same colors as the PowerPoint export), streamed
+    element by element. `width` (pixels) gives a scaled thumbnail.
+    """
+    return await _rendered(request, data, "svg", width=width)
+
+
+@router.post("/pdf")
+async def export_pdf(request: Request, data: ExportGraphRequest):
+    """Render the diagram as a one-page vector PDF, streamed as it is written."""
+    return await _rendered(request, data, "pdf")
@@ -1,8 +1,16 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends
+import math
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends, Request, Response
 from pydantic import BaseModel
-from typing import Dict, Any, Optional, Annotated
+from typing import Dict, Any, List, Optional, Annotated, Literal
 from app.services.generation_service import GenerationService
 from app.services.compliance_service import ComplianceService
+from app.services.llm_service import LLMServiceError, upstream_status
+from app.core.rate_limit import Priority
+from app.services.model_catalogue import get_model_catalogue
+from app.core.shared_cache import get_shared_cache
+from app.core.metrics import IN_FLIGHT, timed
+from app.api.conditional import conditional_json_response, conditional_bytes_response
+from app.api.disconnect import CLIENT_CLOSED_REQUEST, ClientDisconnected, cancel_on_disconnect
 
 router = APIRouter()
 
@@ -19,46 +27,149 @@ class GenerateRequest(BaseModel):
     prompt: str
     schema_type: Optional[str] = "application"
     model: Optional[str] = "openai/gpt-3.5-turbo"
+    # "interactive" (UI) is served before "batch" / "background" jobs when upstream budget is short
+    priority: Literal["interactive", "batch", "background"] = "interactive"
+    # "chunked" plans zones first and generates them in parallel (large, enterprise-wide scenarios)
+    mode: Literal["single", "chunked"] = "single"
+
+class ExtendRequest(BaseModel):
+    graph: Dict[str, Any]
+    instruction: str
+    # Restrict the context sent to the LLM to these elements and their neighbours
+    selected_ids: Optional[List[str]] = None
+    schema_type: Optional[str] = "application"
+    model: Optional[str] = "openai/gpt-3.5-turbo"
+    priority: Literal["interactive", "batch", "background"] = "interactive"
+
+def _split_resolution(graph_dict: Dict[str, Any]):
+    """
+    Move the name-resolution report (fuzzy matches, ambiguities, unresolved
+    relationship endpoints) out of the graph; the shared dict is not mutated.
+    """
+    graph = {k: v for k, v in graph_dict.items() if k != "resolution"}
+    return graph, graph_dict.get("resolution")
 
 @router.get("/models")
-async def get_models(generation_service: GenerationServiceDep):
+async def get_models(http_request: Request, fields: Optional[str] = None, free_only: bool = False):
     """
     Get available models from OpenRouter.
+    Served from an in-process cache (refreshed in the background) with an ETag.
+    `fields` projects each model on a comma-separated list of keys (e.g. "id,name").
     """
     try:
-        models = await generation_service.llm_service.get_available_models()
-        return models
+        projection = tuple(f.strip() for f in fields.split(",") if f.strip()) if fields else None
+        view = await get_model_catalogue().view(fields=projection, free_only=free_only)
+        return conditional_bytes_response(http_request, view.body, view.etag)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch models: {str(e)}")
 
+@router.get("/upstream/status")
+async def get_upstream_status():
+    """
+    Upstream LLM traffic status for this worker: queue depth per priority,
+    scheduler counters and circuit breaker states.
+    """
+    return upstream_status()
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """
+    Shared cache hit/miss counters as seen by the worker answering this request
+    (one view per worker process; `pid` tells them apart).
+    """
+    return get_shared_cache().stats()
+
 @router.post("/generate")
 async def generate_architecture(
     request: GenerateRequest,
+    http_request: Request,
     generation_service: GenerationServiceDep,
     compliance_service: ComplianceServiceDep
 ):
     """
     Generate TOGAF architecture from natural language prompt, validated by Agent 5.
+    The response carries an ETag (graph content hash) so clients can tell an
+    unchanged result; If-None-Match is not evaluated on this POST.
     """
     try:
-        # 1. Generate Graph
-        graph_dict = await generation_service.generate_architecture(
-            prompt=request.prompt,
-            schema_type=request.schema_type,
-            model=request.model
-        )
-        
-        # 2. Validate using ComplianceService
-        # Refactored to use the service logic instead of inline code
-        compliance_report = compliance_service.validate_graph_dict(graph_dict)
-        
-        return {
-            "graph": graph_dict,
-            "compliance": compliance_report
-        }
+        with IN_FLIGHT.track_inprogress(endpoint="generate"):
+            # 1. Generate Graph
+            # Cancelled if the client goes away: the upstream call is aborted unless shared with another client
+            graph_dict = await cancel_on_disconnect(http_request, generation_service.generate_architecture(
+                prompt=request.prompt,
+                schema_type=request.schema_type,
+                model=request.model,
+                priority=Priority[request.priority.upper()],
+                mode=request.mode
+            ), endpoint="generate")
+
+            # 2. Validate using ComplianceService
+            # Refactored to use the service logic instead of inline code
+            with timed("compliance"):
+                compliance_report = compliance_service.validate_graph_dict(graph_dict)
 
+            graph, resolution = _split_resolution(graph_dict)
+            with timed("response"):
+                return conditional_json_response(http_request, {
+                    "graph": graph,
+                    "compliance": compliance_report,
+                    "resolution": resolution
+                })
+
+    except ClientDisconnected:
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
+    except LLMServiceError as e:
+        # Upstream trouble: surface it as 429/502/503/504 instead of a generic 500
+        headers = {"Retry-After": str(math.ceil(e.retry_after))} if e.retry_after is not None else None
+        raise HTTPException(status_code=e.status_code, detail=f"Generation failed: {str(e)}", headers=headers)
     except Exception as e:
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Generation failed: {str(e)}")
 
+
+@router.post("/extend")
+async def extend_architecture(
+    request: ExtendRequest,
+    http_request: Request,
+    generation_service: GenerationServiceDep,
+    compliance_service: ComplianceServiceDep
+):
+    """
+    Extend or refine an existing diagram from an instruction.
+    Only a compact summary of the graph is sent to the LLM; the additions are merged
+    into the graph, preserving existing ids. `added_node_ids` lists the new elements,
+    `dropped` the input elements (unknown type) and edges that could not be kept.
+    """
+    try:
+        with IN_FLIGHT.track_inprogress(endpoint="extend"):
+            result = await cancel_on_disconnect(http_request, generation_service.extend_architecture(
+                graph_dict=request.graph,
+                instruction=request.instruction,
+                schema_type=request.schema_type,
+                model=request.model,
+                priority=Priority[request.priority.upper()],
+                selected_ids=request.selected_ids
+            ), endpoint="extend")
+            with timed("compliance"):
+                compliance_report = compliance_service.validate_graph_dict(result["graph"])
+            graph, resolution = _split_resolution(result["graph"])
+
+            with timed("response"):
+                return conditional_json_response(http_request, {
+                    "graph": graph,
+                    "resolution": resolution,
+                    "added_node_ids": result["added_node_ids"],
+                    "dropped": result["dropped"],
+                    "compliance": compliance_report
+                })
+
+    except ClientDisconnected:
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
+    except LLMServiceError as e:
+        headers = {"Retry-After": str(math.ceil(e.retry_after))} if e.retry_after is not None else None
+        raise HTTPException(status_code=e.status_code, detail=f"Extension failed: {str(e)}", headers=headers)
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Extension failed: {str(e)}")
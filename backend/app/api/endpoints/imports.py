@@ -0,0 +1,39 @@
+import os
+from fastapi import APIRouter, HTTPException, Request
+from starlette.concurrency import run_in_threadpool
+from app.services.archimate_exchange import ExchangeFormatError, ExchangeImporter
+from app.core.metrics import IN_FLIGHT, timed
+
+
+def max_import_bytes() -> int:
+    return int(os.getenv("IMPORT_MAX_BYTES", str(200 * 1024 * 1024)))
+
+
+router = APIRouter()
+
+
+@router.post("/archimate")
+async def import_archimate(request: Request):
+    """
+    Import an ArchiMate Model Exchange file sent as the raw request body
+    (Content-Type application/xml). The body is parsed as it arrives, so large
+    repository exports never sit in memory as a whole; returns the graph with
+    nodes placed as in the model's first view, and a report of what was skipped.
+    """
+    limit = max_import_bytes()
+    received = 0
+    with IN_FLIGHT.track_inprogress(endpoint="import_archimate"), timed("import_archimate"):
+        importer = ExchangeImporter()
+        try:
+            async for chunk in request.stream():
+                received += len(chunk)
+                if received > limit:
+                    raise HTTPException(status_code=413, detail=f"Import larger than {limit} bytes")
+                if chunk:
+                    # Parsing is CPU-bound: keep it off the event loop
+                    await run_in_threadpool(importer.feed, chunk)
+            await run_in_threadpool(importer.close)
+        except ExchangeFormatError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        graph = await run_in_threadpool(importer.to_dict)
+    return {"graph": graph, "report": importer.report.to_dict()}
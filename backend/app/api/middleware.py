@@ -0,0 +1,260 @@
+import cProfile
+import gzip
+import os
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core import profiling
+from app.core.tracing import TRACER, current_request_id, parse_traceparent, request_context, sanitize_request_id
+
+try:
+    import brotli  # Optional: enables "br" when installed
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+# Content types worth compressing. Binary exports (pptx, png...) are already compressed.
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/xml", "image/svg+xml", "application/javascript")
+
+
+def _parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Parse an Accept-Encoding header into {coding: q-value}."""
+    codings: Dict[str, float] = {}
+    for part in header.split(","):
+        if not part.strip():
+            continue
+        name, _, params = part.partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        codings[name.strip().lower()] = q
+    return codings
+
+
+class CompressionMiddleware:
+    """
+    gzip / brotli response compression with a size threshold.
+
+    Only complete (non-streamed) responses are compressed: streamed bodies such as
+    the PPTX export are passed through untouched. ETags are suffixed with the
+    encoding so every representation keeps its own strong validator.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        encodings: Tuple[str, ...] = ("br", "gzip"),
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encodings = tuple(e for e in encodings if e == "gzip" or (e == "br" and brotli is not None))
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    @classmethod
+    def options_from_env(cls) -> Dict:
+        """Read COMPRESSION_* environment variables."""
+        encodings = os.getenv("COMPRESSION_ENCODINGS", "br,gzip")
+        return {
+            "minimum_size": int(os.getenv("COMPRESSION_MIN_SIZE", "1024")),
+            "encodings": tuple(e.strip() for e in encodings.split(",") if e.strip()),
+            "gzip_level": int(os.getenv("COMPRESSION_GZIP_LEVEL", "6")),
+            "brotli_quality": int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4")),
+        }
+
+    def select_encoding(self, accept_encoding: str) -> Optional[str]:
+        accepted = _parse_accept_encoding(accept_encoding)
+        best, best_q = None, 0.0
+        # self.encodings is in preference order, so ties go to the first one
+        for encoding in self.encodings:
+            q = accepted.get(encoding, accepted.get("*", 0.0))
+            if q > best_q:
+                best, best_q = encoding, q
+        return best
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.encodings:
+            await self.app(scope, receive, send)
+            return
+
+        encoding = self.select_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        passthrough = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start_message, passthrough
+
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            headers = MutableHeaders(scope=start_message)
+            content_type = headers.get("content-type", "")
+
+            # Streamed, small, already encoded or binary responses go out unchanged
+            if (
+                message.get("more_body", False)
+                or len(body) < self.minimum_size
+                or "content-encoding" in headers
+                or not content_type.startswith(COMPRESSIBLE_TYPES)
+            ):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            compressed = self.compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            etag = headers.get("etag")
+            if etag and etag.endswith('"'):
+                headers["ETag"] = f'{etag[:-1]}-{encoding}"'
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
+
+
+
+class TracingMiddleware:
+    """
+    Root span per HTTP request, correlated by request id.
+
+    The id comes from the client's X-Request-ID header when it is a short token
+    (otherwise a new one is generated) and is echoed in the response. A W3C
+    `traceparent` header continues the caller's trace. Every span opened while
+    serving the request (generation stages, upstream calls...) carries the id as
+    the `request.id` attribute.
+    """
+
+    header = "X-Request-ID"
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        request_id = sanitize_request_id(headers.get(self.header))
+        parent = parse_traceparent(headers.get("traceparent"))
+
+        with request_context(request_id), TRACER.span(
+            f"{scope['method']} {scope['path']}", parent=parent,
+            **{"http.method": scope["method"], "http.target": scope["path"]}
+        ) as span:
+
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    MutableHeaders(scope=message)[self.header] = request_id
+                    span.set_attribute("http.status_code", message["status"])
+                    if message["status"] >= 500:
+                        span.set_status("ERROR")
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+
+class ProfilingMiddleware:
+    """
+    On-demand and slow-request profiling.
+
+    An admin (X-Admin-Token matching PROFILING_ADMIN_TOKEN) asks for a profile of
+    one request with `X-Profile: 1` or `?profile=1` (cProfile, deterministic) or
+    `sample` (stack sampling, lower overhead, shows where async code waits). The
+    response carries X-Profile-Id, the id to read it from /api/admin/profiles.
+    Profiling flags from anyone else are ignored.
+
+    With PROFILING_SLOW_MS set, every request still running after that many
+    milliseconds is sampled too, and stored if it was.
+    """
+
+    header = "X-Profile"
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    def requested_mode(self, scope: Scope, headers: Headers) -> Optional[str]:
+        flag = headers.get(self.header.lower())
+        if flag is None:
+            flag = parse_qs(scope.get("query_string", b"").decode("latin-1")).get("profile", [None])[0]
+        if flag is None or flag.lower() in ("", "0", "false"):
+            return None
+        if not profiling.is_admin(headers.get("x-admin-token")):
+            return None
+        return "sample" if flag.lower() == "sample" else "cprofile"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        mode = self.requested_mode(scope, Headers(scope=scope))
+        slow_threshold = profiling.slow_request_threshold()
+        # cProfile hooks the whole thread: a second profiled request waits its turn as a sampled one
+        if mode == "cprofile" and not profiling.cprofile_lock.acquire(blocking=False):
+            mode = "sample"
+        if mode is None and slow_threshold is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile = profiling.RequestProfile(
+            current_request_id() or sanitize_request_id(None), scope["method"], scope["path"],
+            mode or "sample", threshold=slow_threshold if mode is None else 0.0,
+        )
+        status: Optional[int] = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if mode is not None:
+                    MutableHeaders(scope=message)["X-Profile-Id"] = profile.profile_id
+            await send(message)
+
+        sampler = profiling.get_sampler()
+        profiler = cProfile.Profile() if profile.mode == "cprofile" else None
+        started = time.perf_counter()
+        try:
+            with profiling.activate(profile):
+                if profiler is not None:
+                    profiler.enable()
+                else:
+                    sampler.register(profile)
+                try:
+                    await self.app(scope, receive, send_wrapper)
+                finally:
+                    if profiler is not None:
+                        profiler.disable()
+                    else:
+                        sampler.unregister(profile)
+        finally:
+            if profiler is not None:
+                profile.add_stats(profiler)
+                profiling.cprofile_lock.release()
+            if mode is not None or profile.samples:
+                profiling.get_profile_store().add(profile, status, time.perf_counter() - started, sampler.interval)
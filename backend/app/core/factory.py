@@ -1,4 +1,5 @@
-from typing import Dict, Type, Optional
+import re
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Type
 from app.core.metamodel import (
     ArchimateElement, ElementType, Layer,
     # Strategy
@@ -26,107 +27,105 @@ from app.core.metamodel import (
     Grouping, Location
 )
 
-class ElementFactory:
-    _mapping: Dict[str, Type[ArchimateElement]] = {
-        # Strategy
-        ElementType.RESOURCE.value: Resource,
-        ElementType.CAPABILITY.value: Capability,
-        ElementType.COURSE_OF_ACTION.value: CourseOfAction,
-        ElementType.VALUE_STREAM.value: ValueStream,
-        "Resource": Resource, "Capability": Capability, "CourseOfAction": CourseOfAction, "ValueStream": ValueStream,
+_ELEMENT_CLASSES = (
+    # Strategy
+    Resource, Capability, CourseOfAction, ValueStream,
+    # Business
+    BusinessActor, BusinessRole, BusinessCollaboration, BusinessInterface,
+    BusinessProcess, BusinessFunction, BusinessInteraction, BusinessEvent,
+    BusinessService, BusinessObject, Contract, Representation, Product,
+    # Application
+    ApplicationComponent, ApplicationCollaboration, ApplicationInterface,
+    ApplicationFunction, ApplicationInteraction, ApplicationProcess,
+    ApplicationEvent, ApplicationService, DataObject,
+    # Technology
+    Node, Device, SystemSoftware, TechnologyCollaboration, TechnologyInterface,
+    Path, CommunicationNetwork, TechnologyFunction, TechnologyProcess,
+    TechnologyInteraction, TechnologyEvent, TechnologyService, Artifact,
+    # Physical
+    Facility, Equipment, DistributionNetwork, Material,
+    # Motivation
+    Stakeholder, Driver, Assessment, Goal, Outcome, Principle,
+    Requirement, Constraint, Meaning, Value,
+    # Implementation
+    WorkPackage, Deliverable, ImplementationEvent, Plateau, Gap,
+    # Composite
+    Grouping, Location,
+)
 
-        # Business
-        ElementType.BUSINESS_ACTOR.value: BusinessActor,
-        ElementType.BUSINESS_ROLE.value: BusinessRole,
-        ElementType.BUSINESS_COLLABORATION.value: BusinessCollaboration,
-        ElementType.BUSINESS_INTERFACE.value: BusinessInterface,
-        ElementType.BUSINESS_PROCESS.value: BusinessProcess,
-        ElementType.BUSINESS_FUNCTION.value: BusinessFunction,
-        ElementType.BUSINESS_INTERACTION.value: BusinessInteraction,
-        ElementType.BUSINESS_EVENT.value: BusinessEvent,
-        ElementType.BUSINESS_SERVICE.value: BusinessService,
-        ElementType.BUSINESS_OBJECT.value: BusinessObject,
-        ElementType.CONTRACT.value: Contract,
-        ElementType.REPRESENTATION.value: Representation,
-        ElementType.PRODUCT.value: Product,
-        "BusinessActor": BusinessActor, "BusinessRole": BusinessRole, "BusinessCollaboration": BusinessCollaboration,
-        "BusinessInterface": BusinessInterface, "BusinessProcess": BusinessProcess, "BusinessFunction": BusinessFunction,
-        "BusinessInteraction": BusinessInteraction, "BusinessEvent": BusinessEvent, "BusinessService": BusinessService,
-        "BusinessObject": BusinessObject, "Contract": Contract, "Representation": Representation, "Product": Product,
+_NOT_ALNUM = re.compile(r"[^0-9a-z]")
 
-        # Application
-        ElementType.APPLICATION_COMPONENT.value: ApplicationComponent,
-        ElementType.APPLICATION_COLLABORATION.value: ApplicationCollaboration,
-        ElementType.APPLICATION_INTERFACE.value: ApplicationInterface,
-        ElementType.APPLICATION_FUNCTION.value: ApplicationFunction,
-        ElementType.APPLICATION_INTERACTION.value: ApplicationInteraction,
-        ElementType.APPLICATION_PROCESS.value: ApplicationProcess,
-        ElementType.APPLICATION_EVENT.value: ApplicationEvent,
-        ElementType.APPLICATION_SERVICE.value: ApplicationService,
-        ElementType.DATA_OBJECT.value: DataObject,
-        "ApplicationComponent": ApplicationComponent, "ApplicationCollaboration": ApplicationCollaboration,
-        "ApplicationInterface": ApplicationInterface, "ApplicationFunction": ApplicationFunction,
-        "ApplicationInteraction": ApplicationInteraction, "ApplicationProcess": ApplicationProcess,
-        "ApplicationEvent": ApplicationEvent, "ApplicationService": ApplicationService, "DataObject": DataObject,
 
-        # Technology
-        ElementType.NODE.value: Node,
-        ElementType.DEVICE.value: Device,
-        ElementType.SYSTEM_SOFTWARE.value: SystemSoftware,
-        ElementType.TECHNOLOGY_COLLABORATION.value: TechnologyCollaboration,
-        ElementType.TECHNOLOGY_INTERFACE.value: TechnologyInterface,
-        ElementType.PATH.value: Path,
-        ElementType.COMMUNICATION_NETWORK.value: CommunicationNetwork,
-        ElementType.TECHNOLOGY_FUNCTION.value: TechnologyFunction,
-        ElementType.TECHNOLOGY_PROCESS.value: TechnologyProcess,
-        ElementType.TECHNOLOGY_INTERACTION.value: TechnologyInteraction,
-        ElementType.TECHNOLOGY_EVENT.value: TechnologyEvent,
-        ElementType.TECHNOLOGY_SERVICE.value: TechnologyService,
-        ElementType.ARTIFACT.value: Artifact,
-        "Node": Node, "Device": Device, "SystemSoftware": SystemSoftware, "TechnologyCollaboration": TechnologyCollaboration,
-        "TechnologyInterface": TechnologyInterface, "Path": Path, "CommunicationNetwork": CommunicationNetwork,
-        "TechnologyFunction": TechnologyFunction, "TechnologyProcess": TechnologyProcess, "TechnologyInteraction": TechnologyInteraction,
-        "TechnologyEvent": TechnologyEvent, "TechnologyService": TechnologyService, "Artifact": Artifact,
+def _dispatch_key(el_type: str) -> str:
+    """"Application Component", "application-component", "APPLICATION_COMPONENT" -> "applicationcomponent"."""
+    return _NOT_ALNUM.sub("", el_type.casefold())
 
-        # Physical
-        ElementType.FACILITY.value: Facility,
-        ElementType.EQUIPMENT.value: Equipment,
-        ElementType.DISTRIBUTION_NETWORK.value: DistributionNetwork,
-        ElementType.MATERIAL.value: Material,
-        "Facility": Facility, "Equipment": Equipment, "DistributionNetwork": DistributionNetwork, "Material": Material,
 
-        # Motivation
-        ElementType.STAKEHOLDER.value: Stakeholder,
-        ElementType.DRIVER.value: Driver,
-        ElementType.ASSESSMENT.value: Assessment,
-        ElementType.GOAL.value: Goal,
-        ElementType.OUTCOME.value: Outcome,
-        ElementType.PRINCIPLE.value: Principle,
-        ElementType.REQUIREMENT.value: Requirement,
-        ElementType.CONSTRAINT.value: Constraint,
-        ElementType.MEANING.value: Meaning,
-        ElementType.VALUE.value: Value,
-        "Stakeholder": Stakeholder, "Driver": Driver, "Assessment": Assessment, "Goal": Goal, "Outcome": Outcome,
-        "Principle": Principle, "Requirement": Requirement, "Constraint": Constraint, "Meaning": Meaning, "Value": Value,
+# ElementType value -> class, derived from each class's default `type`
+_MAPPING: Dict[str, Type[ArchimateElement]] = {
+    element_cls.model_fields["type"].default.value: element_cls for element_cls in _ELEMENT_CLASSES
+}
 
-        # Implementation
-        ElementType.WORK_PACKAGE.value: WorkPackage,
-        ElementType.DELIVERABLE.value: Deliverable,
-        ElementType.IMPLEMENTATION_EVENT.value: ImplementationEvent,
-        ElementType.PLATEAU.value: Plateau,
-        ElementType.GAP.value: Gap,
-        "WorkPackage": WorkPackage, "Deliverable": Deliverable, "ImplementationEvent": ImplementationEvent,
-        "Plateau": Plateau, "Gap": Gap,
 
-        # Composite
-        ElementType.GROUPING.value: Grouping,
-        ElementType.LOCATION.value: Location,
-        "Grouping": Grouping, "Location": Location,
+class ElementFactory:
+    _mapping: Dict[str, Type[ArchimateElement]] = _MAPPING
+    # Case/format-insensitive table, also accepting enum member names (APPLICATION_COMPONENT)
+    _dispatch: Dict[str, Type[ArchimateElement]] = {
+        **{_dispatch_key(value): element_cls for value, element_cls in _MAPPING.items()},
+        **{_dispatch_key(member.name): _MAPPING[member.value] for member in ElementType if member.value in _MAPPING},
     }
+    # Raw spellings already seen -> class. Seeded with the canonical values; other spellings are
+    # client input (LLM output, imported files), so only the first RESOLVED_MAX_SIZE are kept
+    _resolved: Dict[str, Type[ArchimateElement]] = dict(_MAPPING)
+    RESOLVED_MAX_SIZE = 1024
+
+    @classmethod
+    def resolve_type(cls, el_type: Any) -> Optional[Type[ArchimateElement]]:
+        """Element class for a type name in any usual spelling, or None if unknown."""
+        if not isinstance(el_type, str):
+            el_type = getattr(el_type, "value", None)
+            if not isinstance(el_type, str):
+                return None
+        element_cls = cls._resolved.get(el_type)
+        if element_cls is None:
+            element_cls = cls._dispatch.get(_dispatch_key(el_type))
+            if element_cls is not None and len(cls._resolved) < cls.RESOLVED_MAX_SIZE:
+                cls._resolved[el_type] = element_cls
+        return element_cls
 
     @classmethod
     def create_element(cls, el_type: str, name: str, description: str = "") -> Optional[ArchimateElement]:
-        element_cls = cls._mapping.get(el_type)
+        element_cls = cls.resolve_type(el_type)
         if element_cls:
             return element_cls(name=name, description=description)
         return None
+
+    @classmethod
+    def create_elements(cls, rows: Iterable[Mapping[str, Any]]) -> List[Optional[ArchimateElement]]:
+        """
+        Build many elements at once from dicts with "type", "name" and optional
+        "description", "id", "attributes", "tags". The result is aligned with
+        `rows`; unknown types give None.
+
+        Ids are passed to the constructor rather than assigned afterwards, so no
+        uuid4() is generated and no assignment goes through BaseModel.__setattr__.
+        (model_construct is deliberately not used: with pydantic-core it is slower
+        than validating these small models.)
+        """
+        elements: List[Optional[ArchimateElement]] = []
+        append = elements.append
+        resolve = cls.resolve_type
+        for row in rows:
+            element_cls = resolve(row.get("type", ""))
+            if element_cls is None:
+                append(None)
+                continue
+            fields = {"name": row.get("name", "Unknown"), "description": row.get("description") or ""}
+            if row.get("id"):
+                fields["id"] = row["id"]
+            if row.get("attributes"):
+                fields["attributes"] = row["attributes"]
+            if row.get("tags"):
+                fields["tags"] = row["tags"]
+            append(element_cls(**fields))
+        return elements
@@ -1,10 +1,11 @@
-import networkx as nx
-from typing import List, Optional, Dict
+from typing import Iterable, List, Optional, Dict
 from .metamodel import ArchimateElement, ElementType, Layer
 from .relationships import Relation, RelationshipType
 
 class EnterpriseArchitectureGraph:
     def __init__(self):
+        # networkx is a heavy import: load it with the first graph, not at startup
+        import networkx as nx
         self.graph = nx.DiGraph()
 
     def add_element(self, element: ArchimateElement):
@@ -20,6 +21,16 @@ class EnterpriseArchitectureGraph:
             data=relation
         )
 
+    def add_elements(self, elements: Iterable[ArchimateElement]):
+        """Add many nodes in one networkx call (bulk loading)"""
+        self.graph.add_nodes_from((element.id, {"data": element}) for element in elements)
+
+    def add_relations(self, relations: Iterable[Relation]):
+        """Add many edges in one networkx call (bulk loading)"""
+        self.graph.add_edges_from(
+            (relation.source_id, relation.target_id, {"type": relation.type, "data": relation}) for relation in relations
+        )
+
     def get_element(self, element_id: str) -> Optional[ArchimateElement]:
         if element_id in self.graph.nodes:
             return self.graph.nodes[element_id]["data"]
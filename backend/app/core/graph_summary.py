@@ -0,0 +1,50 @@
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, Optional
+
+
+def summarize_graph(
+    graph_dict: Dict[str, Any],
+    selected_ids: Optional[Iterable[str]] = None,
+    max_relationships: int = 200,
+) -> str:
+    """
+    Compact text summary of a frontend graph dict for "extend this diagram" prompts.
+
+    Elements are listed by name, grouped by type; relationships as one
+    "source -Type-> target" line each, capped at `max_relationships` with a
+    per-type count of the rest. With `selected_ids`, only the selected elements,
+    their direct neighbours and the relationships between them are included.
+    """
+    nodes = graph_dict.get("nodes", [])
+    edges = graph_dict.get("edges", [])
+    names = {n.get("id"): n.get("name", "") for n in nodes}
+
+    hidden = 0
+    if selected_ids:
+        selected = set(selected_ids)
+        scope = set(selected)
+        for e in edges:
+            if e.get("source_id") in selected or e.get("target_id") in selected:
+                scope.update((e.get("source_id"), e.get("target_id")))
+        hidden = sum(1 for n in nodes if n.get("id") not in scope)
+        nodes = [n for n in nodes if n.get("id") in scope]
+        edges = [e for e in edges if e.get("source_id") in scope and e.get("target_id") in scope]
+
+    by_type: Dict[str, List[str]] = defaultdict(list)
+    for n in nodes:
+        by_type[str(n.get("type", ""))].append(n.get("name", ""))
+
+    lines = ["ELEMENTS:"]
+    lines += [f"{el_type}: {'; '.join(sorted(element_names))}" for el_type, element_names in sorted(by_type.items())]
+    if hidden:
+        lines.append(f"(+{hidden} other elements not shown)")
+
+    lines.append("RELATIONSHIPS:")
+    for e in edges[:max_relationships]:
+        source, target = names.get(e.get("source_id")), names.get(e.get("target_id"))
+        if source is not None and target is not None:
+            lines.append(f"{source} -{e.get('type', 'Association')}-> {target}")
+    rest = Counter(str(e.get("type", "Association")) for e in edges[max_relationships:])
+    if rest:
+        lines.append(f"(+{sum(rest.values())} more: " + ", ".join(f"{t} {c}" for t, c in sorted(rest.items())) + ")")
+    return "\n".join(lines)
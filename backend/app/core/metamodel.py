@@ -101,6 +101,8 @@ class ArchimateElement(BaseModel):
 
     class Config:
         use_enum_values = True
+        # Validators are built on first use (or by build_validators()), not at import
+        defer_build = True
 
 # --- Composite / Grouping ---
 class Grouping(ArchimateElement):
@@ -356,3 +358,19 @@ class Gap(ArchimateElement):
     layer: Layer = Layer.IMPLEMENTATION
     type: ElementType = ElementType.GAP
 
+
+def build_validators() -> int:
+    """
+    Build the deferred Pydantic validators of every element class now, e.g. at
+    worker startup, so the first request does not pay for it. Returns the number
+    of classes built.
+    """
+    built = 0
+    pending = [ArchimateElement]
+    while pending:
+        cls = pending.pop()
+        pending.extend(cls.__subclasses__())
+        if not cls.__pydantic_complete__:
+            cls.model_rebuild()
+            built += 1
+    return built
@@ -0,0 +1,268 @@
+import bisect
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from app.core.tracing import TRACER
+
+# Prometheus text exposition format, version 0.0.4
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+BYTES_BUCKETS = (1e3, 1e4, 5e4, 1e5, 5e5, 1e6, 5e6, 1e7, 5e7)
+
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self) -> Iterable[Sample]:
+        """(sample name, labels, value) of every series, for the exposition."""
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set_total(self, value: float, **labels: str) -> None:
+        """For totals counted by another component (collectors); `value` must never decrease."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> Iterable[Sample]:
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield self.name, dict(zip(self.labelnames, key)), value
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    @contextmanager
+    def track_inprogress(self, **labels: str) -> Iterator[None]:
+        """In-flight gauge: +1 for the duration of the block."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def samples(self) -> Iterable[Sample]:
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield self.name, dict(zip(self.labelnames, key)), value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [bucket counts..., +Inf count], sum
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            entry[0][index] += 1
+            entry[1][0] += value
+
+    def count(self, **labels: str) -> int:
+        entry = self._values.get(self._key(labels))
+        return sum(entry[0]) if entry else 0
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe the wall-clock duration of the block, in seconds (also on error)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> Iterable[Sample]:
+        with self._lock:
+            items = [(key, (list(counts), total[0])) for key, (counts, total) in self._values.items()]
+        for key, (counts, total) in items:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                yield self.name + "_bucket", {**labels, "le": _format_value(bound)}, cumulative
+            yield self.name + "_sum", labels, total
+            yield self.name + "_count", labels, cumulative
+
+
+class Registry:
+    """
+    Metrics of this worker process. Collectors are called at scrape time for
+    values owned by other components (cache, scheduler, single-flight stats).
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """`collector()` runs before each exposition to refresh gauges from their owners."""
+        self._collectors.append(collector)
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def exposition(self) -> str:
+        for collector in self._collectors:
+            collector()
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# --- Application metrics (process-local; scrape each worker separately) ---
+# "model" labels go through llm_service.model_label: ids outside the catalogue become "other"
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "drawtogaf_stage_duration_seconds",
+    "Time spent per pipeline stage (llm_call, parse, graph_build, compliance, serialize, export_pptx...)",
+    ["stage"],
+)
+IN_FLIGHT = REGISTRY.gauge("drawtogaf_in_flight_requests", "Requests being processed, per endpoint", ["endpoint"])
+UPSTREAM_IN_FLIGHT = REGISTRY.gauge("drawtogaf_upstream_in_flight", "Outbound LLM HTTP calls in progress")
+UPSTREAM_REQUESTS = REGISTRY.counter("drawtogaf_upstream_requests_total", "Outbound LLM HTTP calls by model and status", ["model", "status"])
+UPSTREAM_TOKENS = REGISTRY.counter("drawtogaf_upstream_tokens_total", "Tokens reported by the upstream, by model and kind", ["model", "kind"])
+EXPORT_BYTES = REGISTRY.histogram("drawtogaf_export_size_bytes", "Size of exported files", ["format"], buckets=BYTES_BUCKETS)
+CACHE_LOOKUPS = REGISTRY.counter("drawtogaf_cache_lookups_total", "Shared cache lookups by namespace and result (this worker)", ["namespace", "result"])
+CACHE_HIT_RATIO = REGISTRY.gauge("drawtogaf_cache_hit_ratio", "Shared cache hit ratio by namespace (this worker)", ["namespace"])
+UPSTREAM_QUEUE_DEPTH = REGISTRY.gauge("drawtogaf_upstream_queue_depth", "Calls waiting for upstream rate budget, by priority", ["priority"])
+CIRCUIT_OPEN = REGISTRY.gauge("drawtogaf_circuit_open", "1 when the model's circuit breaker is open or half-open", ["model"])
+CLIENT_DISCONNECTS = REGISTRY.counter(
+    "drawtogaf_client_disconnects_total", "Requests cancelled because the client went away before the response", ["endpoint"]
+)
+UPSTREAM_CANCELLED = REGISTRY.counter(
+    "drawtogaf_upstream_cancelled_total", "Outbound LLM HTTP calls aborted because nobody waits for them any more", ["model"]
+)
+UPSTREAM_SAVED_SECONDS = REGISTRY.counter(
+    "drawtogaf_upstream_saved_seconds_total",
+    "Estimated upstream time saved by aborted calls: the model's median latency minus the time already spent",
+    ["model"],
+)
+LLM_HEDGES = REGISTRY.counter(
+    "drawtogaf_llm_hedge_total",
+    "LLM calls by hedging outcome: unhedged (answered before the hedge delay), primary or backup (winner of a hedged call, "
+    "hedged on delay or early failure), failed",
+    ["model", "outcome"],
+)
+LLM_HEDGE_DELAY = REGISTRY.gauge("drawtogaf_llm_hedge_delay_seconds", "Current hedge delay, per primary model", ["model"])
+GENERATION_FLIGHTS = REGISTRY.gauge("drawtogaf_generation_flights", "Distinct generations in flight (after single-flight coalescing)")
+
+
+@contextmanager
+def timed(stage: str, **attributes) -> Iterator[None]:
+    """Record the duration of a pipeline stage, as a histogram sample and a trace span."""
+    with TRACER.span(stage, **attributes), STAGE_SECONDS.time(stage=stage):
+        yield
+
+
+def _collect_cache_stats() -> None:
+    from app.core.shared_cache import get_shared_cache
+    for namespace, stats in get_shared_cache().stats()["namespaces"].items():
+        CACHE_LOOKUPS.set_total(stats["hits"], namespace=namespace, result="hit")
+        CACHE_LOOKUPS.set_total(stats["misses"], namespace=namespace, result="miss")
+        if stats["hit_ratio"] is not None:
+            CACHE_HIT_RATIO.set(stats["hit_ratio"], namespace=namespace)
+
+
+REGISTRY.add_collector(_collect_cache_stats)
@@ -0,0 +1,111 @@
+import re
+import unicodedata
+from collections import defaultdict
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Set
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_name(name: str) -> str:
+    """Accent-, case-, punctuation- and whitespace-insensitive form of an element name."""
+    folded = unicodedata.normalize("NFKD", name)
+    folded = "".join(c for c in folded if not unicodedata.combining(c)).casefold()
+    return _NON_ALNUM.sub(" ", folded).strip()
+
+
+def _trigrams(key: str) -> Set[str]:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class NameIndex:
+    """
+    Resolves element names referenced by LLM relationships to element ids.
+
+    Lookup order: exact normalized name, then the same words in any order, then
+    fuzzy candidates sharing character trigrams with the reference, ranked by
+    edit similarity. Only a clear fuzzy winner is accepted; names shared by several
+    elements and close fuzzy ties are reported as ambiguous. Each lookup only
+    scores the few keys sharing trigrams with the reference, so resolving a whole
+    model stays near-linear.
+    """
+
+    def __init__(self, min_similarity: float = 0.85, margin: float = 0.05, max_candidates: int = 5):
+        self.min_similarity = min_similarity
+        self.margin = margin
+        self.max_candidates = max_candidates
+        self._ids: Dict[str, List[str]] = {}
+        self._names: Dict[str, str] = {}
+        self._by_tokens: Dict[str, Set[str]] = defaultdict(set)
+        self._by_trigram: Dict[str, Set[str]] = defaultdict(set)
+        self.report: Dict[str, list] = {"fuzzy": [], "ambiguous": [], "unresolved": []}
+
+    def __contains__(self, name: str) -> bool:
+        return normalize_name(name) in self._ids
+
+    def get(self, name: str) -> Optional[str]:
+        """Id of the first element registered under this exact (normalized) name."""
+        ids = self._ids.get(normalize_name(name))
+        return ids[0] if ids else None
+
+    def add(self, name: str, element_id: str) -> None:
+        key = normalize_name(name)
+        if key not in self._ids:
+            self._ids[key] = []
+            self._names[key] = name
+            self._by_tokens[" ".join(sorted(key.split()))].add(key)
+            for gram in _trigrams(key):
+                self._by_trigram[gram].add(key)
+        self._ids[key].append(element_id)
+
+    def resolve(self, name: str) -> Optional[str]:
+        """
+        Element id for a reference, or None (recorded in `report`) if unknown or a
+        fuzzy tie. A name shared by several elements resolves to the first one and
+        is reported as ambiguous.
+        """
+        key = normalize_name(name)
+        if not key:
+            self.report["unresolved"].append(name)
+            return None
+
+        if key not in self._ids:
+            same_words = self._by_tokens.get(" ".join(sorted(key.split())))
+            if same_words and len(same_words) == 1:
+                key = next(iter(same_words))
+            else:
+                key = self._fuzzy(name, key)
+                if key is None:
+                    return None
+
+        ids = self._ids[key]
+        if len(ids) > 1:
+            self._record("ambiguous", {"name": name, "candidates": [self._names[key]], "ids": ids})
+        return ids[0]
+
+    def _fuzzy(self, name: str, key: str) -> Optional[str]:
+        shared: Dict[str, int] = defaultdict(int)
+        for gram in _trigrams(key):
+            for candidate in self._by_trigram.get(gram, ()):
+                shared[candidate] += 1
+        if not shared:
+            self.report["unresolved"].append(name)
+            return None
+
+        shortlist = sorted(shared, key=shared.get, reverse=True)[: self.max_candidates]
+        scored = sorted(((SequenceMatcher(None, key, c).ratio(), c) for c in shortlist), reverse=True)
+        best_score, best = scored[0]
+        if best_score < self.min_similarity:
+            self.report["unresolved"].append(name)
+            return None
+        if len(scored) > 1 and best_score - scored[1][0] < self.margin:
+            close = [self._names[c] for s, c in scored if best_score - s < self.margin]
+            self._record("ambiguous", {"name": name, "candidates": close})
+            return None
+        self.report["fuzzy"].append({"name": name, "resolved_to": self._names[best], "score": round(best_score, 3)})
+        return best
+
+    def _record(self, kind: str, entry: Dict) -> None:
+        if entry not in self.report[kind]:
+            self.report[kind].append(entry)
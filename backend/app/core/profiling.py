@@ -0,0 +1,341 @@
+import asyncio
+import cProfile
+import functools
+import hmac
+import io
+import logging
+import os
+import pstats
+import secrets
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def admin_token() -> Optional[str]:
+    """PROFILING_ADMIN_TOKEN; profiling and the admin endpoints are disabled while it is unset."""
+    return os.getenv("PROFILING_ADMIN_TOKEN") or None
+
+
+def is_admin(token: Optional[str]) -> bool:
+    expected = admin_token()
+    return bool(expected and token and hmac.compare_digest(token.encode(), expected.encode()))
+
+
+class _LoadedStats:
+    """What pstats.Stats expects from a profiler, for stats kept as a plain dict."""
+
+    def __init__(self, stats: Dict):
+        self.stats = stats
+
+    def create_stats(self) -> None:
+        pass
+
+
+class RequestProfile:
+    """
+    Profiling state of one request.
+
+    `mode="cprofile"`: deterministic profile of everything running on the request's
+    thread while it is in flight, plus sync sections (@profiled) run in other threads.
+    `mode="sample"`: stack samples taken by the StackSampler once the request has
+    run for `threshold` seconds; samples follow the request's coroutine chain
+    (async waits included) and its sync calls.
+    """
+
+    def __init__(self, request_id: str, method: str, path: str, mode: str, threshold: float = 0.0):
+        # Stored under an id of our own: the request id can come from the client, and repeat
+        self.profile_id = secrets.token_hex(16)
+        self.request_id = request_id
+        self.method = method
+        self.path = path
+        self.mode = mode
+        # Sampled requests are only sampled once they have run for this long
+        self.threshold = threshold
+        self.started = time.perf_counter()
+        self.created_at = time.time()
+        self.thread_id = threading.get_ident()
+        self.task: Optional[asyncio.Task] = None
+        try:
+            self.task = asyncio.current_task()
+        except RuntimeError:
+            pass
+        # Threads running a @profiled section of this request (thread id -> depth)
+        self.threads: Dict[int, int] = {}
+        self.samples: Counter = Counter()
+        self.stats: Optional[pstats.Stats] = None
+        self._lock = threading.Lock()
+
+    def add_stats(self, profiler: cProfile.Profile) -> None:
+        with self._lock:
+            if self.stats is None:
+                self.stats = pstats.Stats(profiler)
+            else:
+                self.stats.add(profiler)
+
+    def enter_thread(self) -> None:
+        ident = threading.get_ident()
+        with self._lock:
+            self.threads[ident] = self.threads.get(ident, 0) + 1
+
+    def exit_thread(self) -> None:
+        ident = threading.get_ident()
+        with self._lock:
+            self.threads[ident] -= 1
+            if not self.threads[ident]:
+                del self.threads[ident]
+
+
+_current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("current_profile", default=None)
+
+
+def _label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def _thread_stack(frame) -> List[Any]:
+    stack = []
+    while frame is not None:
+        stack.append(frame)
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def _coroutine_frames(coro) -> List[Any]:
+    """Frames of a suspended (or running) coroutine chain, outermost first."""
+    frames = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None) or getattr(coro, "ag_frame", None)
+        if frame is None:
+            break
+        frames.append(frame)
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None) or getattr(coro, "ag_await", None)
+    return frames
+
+
+def request_stack(profile: RequestProfile, thread_frames: Dict[int, Any]) -> Optional[str]:
+    """
+    Folded stack ("outer;...;inner") of what the request is doing right now: a
+    @profiled section in a worker thread, otherwise its coroutine chain, extended
+    with the sync calls below it when the request is the one running on its thread.
+    """
+    for ident in list(profile.threads):
+        if ident != profile.thread_id and ident in thread_frames:
+            return ";".join(_label(f) for f in _thread_stack(thread_frames[ident]))
+
+    if profile.task is None or profile.task.done():
+        return None
+    frames = _coroutine_frames(profile.task.get_coro())
+    if not frames:
+        return None
+    running = thread_frames.get(profile.thread_id)
+    if running is not None:
+        # The innermost coroutine frame on the thread's stack means this request is executing
+        thread_stack = _thread_stack(running)
+        for i, frame in enumerate(thread_stack):
+            if frame is frames[-1]:
+                frames = frames + thread_stack[i + 1:]
+                break
+        else:
+            frames = frames + [None]  # Suspended: waiting on I/O or another task
+    return ";".join("(awaiting)" if f is None else _label(f) for f in frames)
+
+
+class StackSampler:
+    """
+    Low-overhead stack sampling: a daemon thread wakes every `interval` seconds
+    and records the current stack of each registered request that has run for
+    longer than its threshold. A request finishing below its threshold costs a
+    dict insert and delete.
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self._requests: Dict[int, RequestProfile] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def register(self, profile: RequestProfile) -> None:
+        with self._lock:
+            self._requests[id(profile)] = profile
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="request-sampler", daemon=True)
+                self._thread.start()
+
+    def unregister(self, profile: RequestProfile) -> None:
+        with self._lock:
+            self._requests.pop(id(profile), None)
+
+    def sample_once(self) -> None:
+        now = time.perf_counter()
+        with self._lock:
+            due = [p for p in self._requests.values() if now - p.started >= p.threshold]
+        if not due:
+            return
+        thread_frames = sys._current_frames()
+        for profile in due:
+            try:
+                stack = request_stack(profile, thread_frames)
+            except Exception:  # Racing with the request's thread; skip this sample
+                continue
+            if stack:
+                profile.samples[stack] += 1
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            self.sample_once()
+
+
+class ProfileStore:
+    """Most recent profiles of this worker, by profile id (the request id is kept alongside)."""
+
+    def __init__(self, max_entries: int = 50):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, profile: RequestProfile, status: Optional[int], duration: float, interval: Optional[float] = None) -> None:
+        entry = {
+            "id": profile.profile_id,
+            "request_id": profile.request_id,
+            "kind": profile.mode,
+            "method": profile.method,
+            "path": profile.path,
+            "status": status,
+            "duration_ms": round(duration * 1000, 3),
+            "created_at": profile.created_at,
+            "stats": profile.stats.stats if profile.stats is not None else None,
+            "samples": dict(profile.samples),
+            "sample_interval_ms": interval * 1000 if interval else None,
+        }
+        with self._lock:
+            self._entries[profile.profile_id] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        return self._entries.get(profile_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            entries = list(self._entries.values())
+        return [
+            {k: v for k, v in e.items() if k not in ("stats", "samples")} | {"samples": sum(e["samples"].values())}
+            for e in reversed(entries)
+        ]
+
+
+def cprofile_report(entry: Dict[str, Any], sort: str = "cumulative", limit: int = 60) -> str:
+    stream = io.StringIO()
+    pstats.Stats(_LoadedStats(entry["stats"]), stream=stream).sort_stats(sort).print_stats(limit)
+    return stream.getvalue()
+
+
+def cprofile_dump(entry: Dict[str, Any]) -> bytes:
+    """pstats file contents (snakeviz, `python -m pstats`)."""
+    import marshal
+    return marshal.dumps(entry["stats"])
+
+
+def folded_stacks(entry: Dict[str, Any]) -> str:
+    """Brendan Gregg's folded format ("frame;frame;frame count"), for flamegraph tools."""
+    return "".join(f"{stack} {count}\n" for stack, count in sorted(entry["samples"].items(), key=lambda i: -i[1]))
+
+
+def samples_report(entry: Dict[str, Any], limit: int = 30) -> str:
+    """Leaf functions by share of samples, then the most frequent stacks."""
+    samples: Dict[str, int] = entry["samples"]
+    total = sum(samples.values())
+    if not total:
+        return "No samples (the request finished below the threshold).\n"
+    leaves: Counter = Counter()
+    for stack, count in samples.items():
+        leaves[stack.rsplit(";", 1)[-1]] += count
+    lines = [f"{total} samples every {entry['sample_interval_ms']:.0f} ms, {entry['method']} {entry['path']} "
+             f"({entry['duration_ms']:.0f} ms)", "", "  share  frame"]
+    lines += [f"  {count / total:5.1%}  {leaf}" for leaf, count in leaves.most_common(limit)]
+    lines += ["", "Most frequent stacks:"]
+    for stack, count in sorted(samples.items(), key=lambda i: -i[1])[:5]:
+        lines.append(f"  {count / total:5.1%}  " + "\n         -> ".join(stack.split(";")))
+    return "\n".join(lines) + "\n"
+
+
+# cProfile can only profile one request at a time per thread
+cprofile_lock = threading.Lock()
+
+
+@contextmanager
+def activate(profile: RequestProfile) -> Iterator[None]:
+    """Make `profile` the current request profile (seen by @profiled sections)."""
+    token = _current_profile.set(profile)
+    try:
+        yield
+    finally:
+        _current_profile.reset(token)
+
+
+def profiled(fn: Callable) -> Callable:
+    """
+    Marks a synchronous hot path (create_pptx, validate_graph...). Free when the
+    request is not profiled. Otherwise, run in a worker thread it gets its own
+    cProfile merged into the request profile (the request's own thread is already
+    covered), and it is visible to the slow-request sampler.
+    """
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        profile = _current_profile.get()
+        if profile is None:
+            return fn(*args, **kwargs)
+        profile.enter_thread()
+        try:
+            if profile.mode != "cprofile" or threading.get_ident() == profile.thread_id:
+                return fn(*args, **kwargs)
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Python 3.12+: profilers are process-wide, the request's one already sees this thread
+                return fn(*args, **kwargs)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                profiler.disable()
+                profile.add_stats(profiler)
+        finally:
+            profile.exit_thread()
+
+    return wrapper
+
+
+_store: Optional[ProfileStore] = None
+_sampler: Optional[StackSampler] = None
+
+
+def get_profile_store() -> ProfileStore:
+    global _store
+    if _store is None:
+        _store = ProfileStore(int(os.getenv("PROFILING_MAX_PROFILES", "50")))
+    return _store
+
+
+def get_sampler() -> StackSampler:
+    global _sampler
+    if _sampler is None:
+        _sampler = StackSampler(float(os.getenv("PROFILING_SAMPLE_INTERVAL_MS", "10")) / 1000)
+    return _sampler
+
+
+def slow_request_threshold() -> Optional[float]:
+    """PROFILING_SLOW_MS in seconds: every request running longer is sampled (None = off)."""
+    threshold_ms = float(os.getenv("PROFILING_SLOW_MS", "0"))
+    return threshold_ms / 1000 if threshold_ms > 0 else None
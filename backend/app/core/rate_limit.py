@@ -0,0 +1,297 @@
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from enum import IntEnum
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+class Priority(IntEnum):
+    """Lower value is served first."""
+    INTERACTIVE = 0
+    BATCH = 10
+    BACKGROUND = 20
+
+
+class RateLimitRejected(Exception):
+    """The scheduler refused (or gave up on) a request instead of letting it time out."""
+
+    def __init__(self, reason: str, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.reason = reason  # "queue_full" | "budget" | "timeout"
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Continuously refilled bucket holding at most `per_minute` units."""
+
+    def __init__(self, per_minute: float, clock: Callable[[], float] = time.monotonic):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def available(self) -> float:
+        self._refill()
+        return self._tokens
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` units are available (amount is clamped to capacity)."""
+        missing = min(amount, self.capacity) - self.available()
+        return max(0.0, missing / self.rate)
+
+    def consume(self, amount: float) -> None:
+        """Take units unconditionally; the balance may go negative (debt)."""
+        self._refill()
+        self._tokens -= amount
+
+
+class _Budget:
+    """Requests-per-minute and tokens-per-minute buckets for one key or model (0 = unlimited)."""
+
+    def __init__(self, rpm: float, tpm: float, clock: Callable[[], float]):
+        self.requests = TokenBucket(rpm, clock) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm, clock) if tpm > 0 else None
+
+    def wait_time(self, tokens: float) -> float:
+        waits = [0.0]
+        if self.requests:
+            waits.append(self.requests.wait_time(1))
+        if self.tokens:
+            waits.append(self.tokens.wait_time(tokens))
+        return max(waits)
+
+    def consume(self, tokens: float) -> None:
+        if self.requests:
+            self.requests.consume(1)
+        if self.tokens:
+            self.tokens.consume(tokens)
+
+    def adjust_tokens(self, delta: float) -> None:
+        if self.tokens:
+            self.tokens.consume(delta)
+
+    def idle(self) -> bool:
+        """Every bucket refilled: a fresh budget would behave the same."""
+        return all(b.available() >= b.capacity for b in (self.requests, self.tokens) if b)
+
+
+class Grant:
+    """Permission for one upstream call; settle() reconciles estimated vs actual tokens."""
+
+    def __init__(self, budgets: Tuple[_Budget, _Budget], tokens: float, waited: float):
+        self._budgets = budgets
+        self.tokens = tokens
+        self.waited = waited
+
+    def settle(self, actual_tokens: Optional[float]) -> None:
+        if actual_tokens is None:
+            return
+        for budget in self._budgets:
+            budget.adjust_tokens(actual_tokens - self.tokens)
+        self.tokens = actual_tokens
+
+
+class _Waiter:
+    def __init__(self, priority: int, seq: int, key_budget: _Budget, model_budget: _Budget, tokens: float, future: asyncio.Future):
+        self.priority = priority
+        self.seq = seq
+        self.key_budget = key_budget
+        self.model_budget = model_budget
+        self.tokens = tokens
+        self.future = future
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class UpstreamScheduler:
+    """
+    Client-side rate limiter and priority queue for upstream LLM calls.
+
+    Requests-per-minute / tokens-per-minute budgets are enforced per API key and
+    per model. When a call cannot start right away it is queued by priority
+    (interactive before batch before background). A waiter only blocked by its
+    own model's budget is skipped so other models keep flowing, but nobody jumps
+    ahead of a higher-priority waiter for the shared key budget. Requests are
+    rejected up front when the queue is full or the estimated wait exceeds their
+    budget, so callers get a clear 429/503 instead of a timeout.
+    """
+
+    def __init__(
+        self,
+        key_rpm: float = 0,
+        key_tpm: float = 0,
+        model_rpm: float = 0,
+        model_tpm: float = 0,
+        max_queue_depth: int = 100,
+        max_wait: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+        max_budgets: int = 256,
+    ):
+        self.key_rpm, self.key_tpm = key_rpm, key_tpm
+        self.model_rpm, self.model_tpm = model_rpm, model_tpm
+        self.max_queue_depth = max_queue_depth
+        self.max_wait = max_wait
+        self._clock = clock
+        # Keys and model ids come from callers: past this many budgets, idle ones are forgotten
+        self.max_budgets = max_budgets
+        self._key_budgets: Dict[str, _Budget] = {}
+        self._model_budgets: Dict[str, _Budget] = {}
+        self._queue: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self.stats: Dict[str, float] = {"granted": 0, "queued": 0, "rejected": 0, "wait_seconds": 0.0}
+
+    @classmethod
+    def from_env(cls) -> "UpstreamScheduler":
+        return cls(
+            key_rpm=float(os.getenv("LLM_KEY_RPM", "0")),
+            key_tpm=float(os.getenv("LLM_KEY_TPM", "0")),
+            model_rpm=float(os.getenv("LLM_MODEL_RPM", "0")),
+            model_tpm=float(os.getenv("LLM_MODEL_TPM", "0")),
+            max_queue_depth=int(os.getenv("LLM_MAX_QUEUE_DEPTH", "100")),
+            max_wait=float(os.getenv("LLM_MAX_QUEUE_WAIT", "30")),
+        )
+
+    def queue_depth(self) -> Dict[str, int]:
+        depth = {p.name.lower(): 0 for p in Priority}
+        for waiter in self._queue:
+            depth[Priority(waiter.priority).name.lower()] += 1
+        return depth
+
+    def _budgets(self, key: str, model: str) -> Tuple[_Budget, _Budget]:
+        return (
+            self._budget(self._key_budgets, key, self.key_rpm, self.key_tpm),
+            self._budget(self._model_budgets, model, self.model_rpm, self.model_tpm),
+        )
+
+    def _budget(self, budgets: Dict[str, _Budget], name: str, rpm: float, tpm: float) -> _Budget:
+        budget = budgets.get(name)
+        if budget is None:
+            if len(budgets) >= self.max_budgets:
+                self._forget_idle(budgets)
+            budget = budgets[name] = _Budget(rpm, tpm, self._clock)
+        return budget
+
+    def _forget_idle(self, budgets: Dict[str, _Budget]) -> None:
+        """Drop full budgets nobody is queued on; recreating one later starts full, as it was."""
+        queued = {id(b) for w in self._queue for b in (w.key_budget, w.model_budget)}
+        for name in [n for n, b in budgets.items() if id(b) not in queued and b.idle()]:
+            del budgets[name]
+
+    def _bind_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Queued futures cannot outlive their event loop
+            self._loop = loop
+            self._queue = []
+            self._wakeup = asyncio.Event()
+            self._dispatcher = None
+
+    async def acquire(
+        self,
+        key: str,
+        model: str,
+        tokens: float,
+        priority: int = Priority.INTERACTIVE,
+        timeout: Optional[float] = None,
+    ) -> Grant:
+        """Wait for budget to run one call of `tokens` estimated tokens."""
+        self._bind_loop()
+        timeout = self.max_wait if timeout is None else min(timeout, self.max_wait)
+        key_budget, model_budget = self._budgets(key, model)
+
+        blocked = any(w.priority <= priority for w in self._queue)
+        wait = max(key_budget.wait_time(tokens), model_budget.wait_time(tokens))
+        if not blocked and wait == 0:
+            key_budget.consume(tokens)
+            model_budget.consume(tokens)
+            self.stats["granted"] += 1
+            return Grant((key_budget, model_budget), tokens, 0.0)
+
+        if len(self._queue) >= self.max_queue_depth:
+            self.stats["rejected"] += 1
+            raise RateLimitRejected("queue_full", "Upstream queue is full", retry_after=max(wait, 1.0))
+        if wait > timeout:
+            self.stats["rejected"] += 1
+            raise RateLimitRejected("budget", f"Upstream budget exhausted for {model}", retry_after=wait)
+
+        started = self._clock()
+        waiter = _Waiter(priority, next(self._seq), key_budget, model_budget, tokens, self._loop.create_future())
+        heapq.heappush(self._queue, waiter)
+        self.stats["queued"] += 1
+        self._kick()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout)
+        except asyncio.TimeoutError:
+            self._discard(waiter)
+            self.stats["rejected"] += 1
+            raise RateLimitRejected("timeout", f"Timed out waiting for upstream budget for {model}", retry_after=1.0)
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Granted just as we were cancelled: give the budget back
+                key_budget.adjust_tokens(-tokens)
+                model_budget.adjust_tokens(-tokens)
+            self._discard(waiter)
+            raise
+
+        waited = self._clock() - started
+        self.stats["wait_seconds"] += waited
+        return Grant((key_budget, model_budget), tokens, waited)
+
+    def _discard(self, waiter: _Waiter) -> None:
+        if waiter in self._queue:
+            self._queue.remove(waiter)
+            heapq.heapify(self._queue)
+        if not waiter.future.done():
+            waiter.future.cancel()
+        self._kick()
+
+    def _kick(self) -> None:
+        self._wakeup.set()
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.ensure_future(self._dispatch())
+
+    async def _dispatch(self) -> None:
+        while self._queue:
+            self._wakeup.clear()
+            next_check = self._grant_eligible()
+            if not self._queue:
+                break
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), next_check)
+            except asyncio.TimeoutError:
+                pass
+
+    def _grant_eligible(self) -> float:
+        """Grant every waiter that can run now; return seconds until the next one could."""
+        next_check = self.max_wait
+        for waiter in sorted(self._queue):
+            if waiter.future.done():
+                self._queue.remove(waiter)
+                continue
+            key_wait = waiter.key_budget.wait_time(waiter.tokens)
+            model_wait = waiter.model_budget.wait_time(waiter.tokens)
+            if key_wait == 0 and model_wait == 0:
+                waiter.key_budget.consume(waiter.tokens)
+                waiter.model_budget.consume(waiter.tokens)
+                self._queue.remove(waiter)
+                self.stats["granted"] += 1
+                waiter.future.set_result(True)
+                continue
+            next_check = min(next_check, max(key_wait, model_wait))
+            if key_wait > 0:
+                # Shared key budget: lower priorities must not overtake this waiter
+                break
+        heapq.heapify(self._queue)
+        return max(next_check, 0.001)
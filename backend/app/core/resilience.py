@@ -0,0 +1,256 @@
+import math
+import os
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from email.utils import parsedate_to_datetime
+from typing import Callable, Deque, Dict, List, Optional
+
+
+class Deadline:
+    """Time budget shared by every attempt of one logical request."""
+
+    def __init__(self, seconds: float, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self.expires_at = clock() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - self._clock())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout(self, cap: float) -> float:
+        """Per-attempt timeout: the attempt cap, shortened to what is left of the budget."""
+        return min(cap, self.remaining())
+
+
+class RetryPolicy:
+    """Jittered exponential backoff settings for upstream calls."""
+
+    RETRYABLE_STATUS = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+    def __init__(
+        self,
+        max_retries: int = 2,
+        base_delay: float = 0.5,
+        max_delay: float = 8.0,
+        attempt_timeout: float = 60.0,
+        deadline: float = 120.0,
+    ):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.attempt_timeout = attempt_timeout
+        self.deadline = deadline
+
+    @classmethod
+    def from_env(cls) -> "RetryPolicy":
+        return cls(
+            max_retries=int(os.getenv("LLM_MAX_RETRIES", "2")),
+            base_delay=float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5")),
+            max_delay=float(os.getenv("LLM_RETRY_MAX_DELAY", "8")),
+            attempt_timeout=float(os.getenv("LLM_ATTEMPT_TIMEOUT", "60")),
+            deadline=float(os.getenv("LLM_DEADLINE_SECONDS", "120")),
+        )
+
+    def backoff(self, attempt: int, rng: Callable[[float, float], float] = random.uniform) -> float:
+        """'Full jitter' delay before retry number `attempt` (0-based)."""
+        return rng(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+def parse_retry_after(value: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """Parse a Retry-After header (delta-seconds or HTTP-date) into seconds."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    now = time.time() if now is None else now
+    return max(0.0, when.timestamp() - now)
+
+
+class CircuitBreaker:
+    """
+    Classic closed / open / half-open breaker.
+
+    After `failure_threshold` consecutive failures the circuit opens and calls fail
+    fast for `reset_timeout` seconds; then a single trial call is let through
+    (half-open) and its outcome closes or re-opens the circuit.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return self.CLOSED
+        if self._clock() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def retry_after(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.reset_timeout - (self._clock() - self.opened_at))
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._trial_in_flight or self.failures >= self.failure_threshold:
+            self.opened_at = self._clock()
+        self._trial_in_flight = False
+
+    def release(self) -> None:
+        """Give back a half-open trial slot without a verdict (e.g. caller cancelled)."""
+        self._trial_in_flight = False
+
+
+class CircuitBreakerRegistry:
+    """
+    One breaker per key (model id), created on first use. Keys come from
+    clients, so at most `max_keys` are kept: past that the least recently used
+    closed breaker is dropped (the least recently used one if none is closed).
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, max_keys: int = 256):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_keys = max_keys
+        self._breakers: "OrderedDict[str, CircuitBreaker]" = OrderedDict()
+
+    @classmethod
+    def from_env(cls) -> "CircuitBreakerRegistry":
+        return cls(
+            failure_threshold=int(os.getenv("LLM_BREAKER_FAILURES", "5")),
+            reset_timeout=float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30")),
+        )
+
+    def get(self, key: str) -> CircuitBreaker:
+        breaker = self._breakers.get(key)
+        if breaker is not None:
+            self._breakers.move_to_end(key)
+            return breaker
+        if len(self._breakers) >= self.max_keys:
+            # Forgetting a closed breaker only loses a failure count below the threshold
+            evicted = next((k for k, b in self._breakers.items() if b.state == CircuitBreaker.CLOSED), None)
+            del self._breakers[evicted if evicted is not None else next(iter(self._breakers))]
+        breaker = self._breakers[key] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+        return breaker
+
+    def states(self) -> Dict[str, str]:
+        return {key: breaker.state for key, breaker in self._breakers.items()}
+
+
+class LatencyTracker:
+    """
+    Rolling window of the most recent latencies per key (model id), for
+    percentile estimates; the `max_keys` most recently observed keys are kept.
+    """
+
+    def __init__(self, window: int = 200, max_keys: int = 256):
+        self.window = window
+        self.max_keys = max_keys
+        self._samples: "OrderedDict[str, Deque[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def observe(self, key: str, seconds: float) -> None:
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                if len(self._samples) >= self.max_keys:
+                    self._samples.popitem(last=False)
+                samples = self._samples[key] = deque(maxlen=self.window)
+            else:
+                self._samples.move_to_end(key)
+            samples.append(seconds)
+
+    def count(self, key: str) -> int:
+        return len(self._samples.get(key, ()))
+
+    def percentile(self, key: str, q: float) -> Optional[float]:
+        with self._lock:
+            ordered = sorted(self._samples.get(key, ()))
+        if not ordered:
+            return None
+        # Nearest rank: the smallest sample with at least q% of the samples at or below it
+        index = min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))
+        return ordered[index]
+
+
+class HedgePolicy:
+    """
+    Hedged requests: when the primary model has not answered after a delay, the
+    same request goes to a backup model and the first usable answer wins.
+
+    The delay is the `percentile` of the primary model's recent latencies, so
+    only its slow tail (about 100 - percentile % of calls) is hedged; until
+    `min_samples` latencies are known, `default_delay` is used. The delay is
+    clamped to [min_delay, max_delay].
+    """
+
+    def __init__(
+        self,
+        backup_models: List[str],
+        percentile: float = 95.0,
+        default_delay: float = 20.0,
+        min_delay: float = 1.0,
+        max_delay: float = 60.0,
+        min_samples: int = 20,
+    ):
+        self.backup_models = backup_models
+        self.percentile = percentile
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+
+    @classmethod
+    def from_env(cls) -> "HedgePolicy":
+        return cls(
+            backup_models=[m.strip() for m in os.getenv("LLM_HEDGE_MODELS", "").split(",") if m.strip()],
+            percentile=float(os.getenv("LLM_HEDGE_PERCENTILE", "95")),
+            default_delay=float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", "20")),
+            min_delay=float(os.getenv("LLM_HEDGE_MIN_DELAY", "1")),
+            max_delay=float(os.getenv("LLM_HEDGE_MAX_DELAY", "60")),
+            min_samples=int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20")),
+        )
+
+    def backup_for(self, model: str) -> Optional[str]:
+        """First backup model other than `model` (None: no hedging)."""
+        return next((m for m in self.backup_models if m != model), None)
+
+    def delay(self, model: str, latencies: LatencyTracker) -> float:
+        observed = latencies.percentile(model, self.percentile) if latencies.count(model) >= self.min_samples else None
+        delay = self.default_delay if observed is None else observed
+        return min(self.max_delay, max(self.min_delay, delay))
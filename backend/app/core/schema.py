@@ -0,0 +1,65 @@
+from functools import lru_cache
+from typing import Any, Dict
+from app.core.metamodel import ElementType
+from app.core.relationships import RelationshipType
+
+# Keys GenerationService reads from the LLM output, in prompt order
+LAYER_KEYS = (
+    "strategy_layer", "business_layer", "application_layer", "technology_layer",
+    "physical_layer", "motivation_layer", "implementation_layer",
+)
+
+
+@lru_cache(maxsize=1)
+def graph_json_schema() -> Dict[str, Any]:
+    """
+    JSON schema of the LLM graph output, generated from the metamodel enums.
+    Written for strict structured-output mode: every property is required and
+    no extra keys are allowed (empty layers are returned as []).
+    """
+    element = {
+        "type": "object",
+        "properties": {
+            "type": {"type": "string", "enum": [t.value for t in ElementType]},
+            "name": {"type": "string"},
+            "description": {"type": "string"},
+        },
+        "required": ["type", "name", "description"],
+        "additionalProperties": False,
+    }
+    relationship = {
+        "type": "object",
+        "properties": {
+            "source": {"type": "string"},
+            "target": {"type": "string"},
+            "type": {"type": "string", "enum": [t.value for t in RelationshipType if t != RelationshipType.JUNCTION]},
+            "description": {"type": "string"},
+        },
+        "required": ["source", "target", "type", "description"],
+        "additionalProperties": False,
+    }
+    properties = {key: {"type": "array", "items": element} for key in LAYER_KEYS}
+    properties["relationships"] = {"type": "array", "items": relationship}
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+
+
+@lru_cache(maxsize=1)
+def plan_json_schema() -> Dict[str, Any]:
+    """Schema of the planning call of chunked generation: the list of zones."""
+    zone = {
+        "type": "object",
+        "properties": {"name": {"type": "string"}, "description": {"type": "string"}},
+        "required": ["name", "description"],
+        "additionalProperties": False,
+    }
+    return {
+        "type": "object",
+        "properties": {"zones": {"type": "array", "items": zone}},
+        "required": ["zones"],
+        "additionalProperties": False,
+    }
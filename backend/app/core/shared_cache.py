@@ -0,0 +1,336 @@
+import hashlib
+import json
+import logging
+import os
+import struct
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlparse
+from starlette.concurrency import run_in_threadpool
+from app.core.utils import _canonical_default
+
+logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct("<d")  # expiry as a unix timestamp, 0 = never
+
+
+class CacheStats:
+    """Per-process counters of one cache namespace."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.errors = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "sets": self.sets,
+            "errors": self.errors,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+class SharedCache(ABC):
+    """
+    Byte cache shared by the worker processes of one host.
+
+    Backends implement _get/_set/_delete; errors are logged and counted but never
+    raised, a broken cache only means misses. Hit/miss counters are kept per
+    namespace and per process (each worker reports its own view).
+
+    Calls are synchronous: async code uses the a* methods of CacheNamespace,
+    which run them in the threadpool when the backend can block.
+    """
+
+    backend = "base"
+    # Reads and writes may wait on I/O (files, network)
+    blocking = True
+
+    def __init__(self):
+        self._stats: Dict[str, CacheStats] = {}
+
+    def namespace(self, name: str) -> "CacheNamespace":
+        return CacheNamespace(self, name)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pid": os.getpid(),
+            "backend": self.backend,
+            "namespaces": {name: s.as_dict() for name, s in sorted(self._stats.items())},
+        }
+
+    def _stats_for(self, namespace: str) -> CacheStats:
+        stats = self._stats.get(namespace)
+        if stats is None:
+            stats = self._stats[namespace] = CacheStats()
+        return stats
+
+    def get(self, namespace: str, key: str) -> Optional[bytes]:
+        stats = self._stats_for(namespace)
+        try:
+            value = self._get(f"{namespace}:{key}")
+        except Exception as e:
+            stats.errors += 1
+            logger.warning(f"Shared cache read failed ({self.backend}): {e}")
+            value = None
+        if value is None:
+            stats.misses += 1
+        else:
+            stats.hits += 1
+        return value
+
+    def set(self, namespace: str, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        stats = self._stats_for(namespace)
+        try:
+            self._set(f"{namespace}:{key}", value, ttl)
+            stats.sets += 1
+        except Exception as e:
+            stats.errors += 1
+            logger.warning(f"Shared cache write failed ({self.backend}): {e}")
+
+    def delete(self, namespace: str, key: str) -> None:
+        try:
+            self._delete(f"{namespace}:{key}")
+        except Exception as e:
+            self._stats_for(namespace).errors += 1
+            logger.warning(f"Shared cache delete failed ({self.backend}): {e}")
+
+    @abstractmethod
+    def _get(self, key: str) -> Optional[bytes]:
+        """The value, or None when missing or expired."""
+
+    @abstractmethod
+    def _set(self, key: str, value: bytes, ttl: Optional[float]) -> None:
+        """Store `value`, expiring after `ttl` seconds (None or 0: never)."""
+
+    @abstractmethod
+    def _delete(self, key: str) -> None:
+        """Remove the key if present."""
+
+
+class CacheNamespace:
+    """Keys of one feature (generation, catalogue, export...) in a SharedCache."""
+
+    def __init__(self, cache: SharedCache, name: str):
+        self.cache = cache
+        self.name = name
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.cache.get(self.name, key)
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        self.cache.set(self.name, key, value, ttl)
+
+    def delete(self, key: str) -> None:
+        self.cache.delete(self.name, key)
+
+    def get_json(self, key: str) -> Optional[Any]:
+        raw = self.get(key)
+        return json.loads(raw) if raw is not None else None
+
+    def set_json(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self.set(key, json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=_canonical_default).encode("utf-8"), ttl)
+
+    # Async variants, for the event loop: a slow Redis or filesystem must not stall every request
+
+    async def aget(self, key: str) -> Optional[bytes]:
+        return await self._off_loop(self.get, key)
+
+    async def aset(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        await self._off_loop(self.set, key, value, ttl)
+
+    async def aget_json(self, key: str) -> Optional[Any]:
+        return await self._off_loop(self.get_json, key)
+
+    async def aset_json(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        await self._off_loop(self.set_json, key, value, ttl)
+
+    async def _off_loop(self, fn, *args):
+        if not self.cache.blocking:
+            return fn(*args)
+        return await run_in_threadpool(fn, *args)
+
+
+class MemoryCache(SharedCache):
+    """In-process LRU; shared by nothing but the current worker (default, and for tests)."""
+
+    backend = "memory"
+    blocking = False
+
+    def __init__(self, max_entries: int = 1024):
+        super().__init__()
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at and expires_at <= time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def _set(self, key: str, value: bytes, ttl: Optional[float]) -> None:
+        with self._lock:
+            self._data[key] = (time.time() + ttl if ttl else 0.0, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def _delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+
+class FileCache(SharedCache):
+    """
+    One file per key in a directory every worker can see. On /dev/shm (the
+    default) this is shared memory: reads and writes never touch the disk.
+
+    Writes go to a temporary file renamed into place, so readers in other
+    processes always see a complete value. Expired entries are pruned, and the
+    oldest ones dropped above `max_entries`, every `prune_every` writes.
+    """
+
+    backend = "file"
+
+    def __init__(self, directory: str, max_entries: int = 10_000, prune_every: int = 256):
+        super().__init__()
+        self.directory = directory
+        self.max_entries = max_entries
+        self.prune_every = prune_every
+        self._writes = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(key.encode("utf-8")).hexdigest())
+
+    def _get(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key), "rb") as f:
+                raw = f.read()
+        except FileNotFoundError:
+            return None
+        (expires_at,) = _HEADER.unpack_from(raw)
+        if expires_at and expires_at <= time.time():
+            return None
+        return raw[_HEADER.size:]
+
+    def _set(self, key: str, value: bytes, ttl: Optional[float]) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(_HEADER.pack(time.time() + ttl if ttl else 0.0))
+                f.write(value)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        self._writes += 1
+        if self._writes % self.prune_every == 0:
+            self.prune()
+
+    def _delete(self, key: str) -> None:
+        try:
+            os.unlink(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def prune(self) -> int:
+        """Remove expired entries and the oldest ones above max_entries; return how many."""
+        now = time.time()
+        live = []
+        removed = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.startswith(".tmp-"):
+                continue
+            try:
+                with open(entry.path, "rb") as f:
+                    (expires_at,) = _HEADER.unpack(f.read(_HEADER.size))
+                if expires_at and expires_at <= now:
+                    os.unlink(entry.path)
+                    removed += 1
+                else:
+                    live.append((entry.stat().st_mtime, entry.path))
+            except (FileNotFoundError, struct.error):
+                continue  # Replaced or removed by another worker meanwhile
+        if len(live) > self.max_entries:
+            for _, path in sorted(live)[: len(live) - self.max_entries]:
+                try:
+                    os.unlink(path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+
+class RedisCache(SharedCache):
+    """Local (or remote) Redis through the `redis` package."""
+
+    backend = "redis"
+
+    def __init__(self, url: str, prefix: str = "drawtogaf:"):
+        super().__init__()
+        import redis  # Optional dependency, only needed for redis:// URLs
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+    def _get(self, key: str) -> Optional[bytes]:
+        return self._client.get(self.prefix + key)
+
+    def _set(self, key: str, value: bytes, ttl: Optional[float]) -> None:
+        self._client.set(self.prefix + key, value, px=int(ttl * 1000) if ttl else None)
+
+    def _delete(self, key: str) -> None:
+        self._client.delete(self.prefix + key)
+
+
+def create_cache(url: str) -> SharedCache:
+    """
+    Cache from a URL:
+    - memory://                      per-process (no sharing)
+    - shm:// or shm:///dev/shm/name  files in shared memory
+    - file:///path/to/dir            files in any directory
+    - redis://host:port/db           Redis
+    """
+    parsed = urlparse(url)
+    if parsed.scheme == "memory":
+        return MemoryCache()
+    if parsed.scheme == "shm":
+        shm_root = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+        return FileCache(parsed.path or os.path.join(shm_root, "drawtogaf-cache"))
+    if parsed.scheme == "file":
+        return FileCache(parsed.path)
+    if parsed.scheme in ("redis", "rediss", "unix"):
+        return RedisCache(url)
+    raise ValueError(f"Unsupported SHARED_CACHE_URL: {url}")
+
+
+_cache: Optional[SharedCache] = None
+
+
+def get_shared_cache() -> SharedCache:
+    """Process-wide cache configured by SHARED_CACHE_URL (memory:// by default)."""
+    global _cache
+    if _cache is None:
+        url = os.getenv("SHARED_CACHE_URL", "memory://")
+        try:
+            _cache = create_cache(url)
+        except Exception as e:
+            logger.warning(f"Shared cache {url} unavailable, using a per-process cache: {e}")
+            _cache = MemoryCache()
+    return _cache
@@ -0,0 +1,59 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+
+T = TypeVar("T")
+
+
+class _Call:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into a single in-flight task.
+
+    The first caller (the leader) starts the work; callers arriving while it runs
+    await the same task and receive the same result (or exception). Waiters are
+    shielded from each other: a cancelled waiter only detaches itself, and the
+    shared task is cancelled once the last waiter has gone away.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self.stats: Dict[str, int] = {"leaders": 0, "shared": 0, "abandoned": 0}
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda task, key=key, call=call: self._forget(key, call))
+            self.stats["leaders"] += 1
+        else:
+            self.stats["shared"] += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Every interested client disconnected: stop paying for the upstream call.
+                # Forget it now, not when the task is done: it can take a while to unwind,
+                # and a caller arriving meanwhile must start a new flight, not join a cancelled one
+                call.task.cancel()
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+                self.stats["abandoned"] += 1
+
+    def _forget(self, key: str, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        # Mark the exception as retrieved even if every waiter already left
+        if not call.task.cancelled():
+            call.task.exception()
@@ -0,0 +1,41 @@
+import math
+import re
+from typing import Any, Optional
+
+_WORD_RE = re.compile(r"\w+|[^\w\s]")
+_encoding: Optional[Any] = None
+_encoding_loaded = False
+
+
+def _get_encoding():
+    """cl100k_base from tiktoken (optional, imported on first use), or None."""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        try:
+            import tiktoken  # Optional: exact counts for OpenAI-style BPE vocabularies
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            # Not installed, or the vocabulary (downloaded on first use) is unreachable offline
+            _encoding = None
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """
+    Token count of a text. Uses tiktoken (cl100k_base) when available, otherwise
+    a BPE-like estimate: one token per punctuation mark, ~4 characters per word piece.
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return sum(math.ceil(len(piece) / 4) for piece in _WORD_RE.findall(text))
+
+
+def count_message_tokens(content: Any) -> int:
+    """Token count of a chat message content (plain string or list of content parts)."""
+    if isinstance(content, list):
+        return sum(count_tokens(part.get("text", "")) for part in content if isinstance(part, dict))
+    return count_tokens(str(content or ""))
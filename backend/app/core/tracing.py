@@ -0,0 +1,215 @@
+import contextvars
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, Optional, TextIO, Tuple
+
+logger = logging.getLogger(__name__)
+
+# W3C Trace Context: version-traceid-parentid-flags
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+_REQUEST_ID = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+
+def _new_id(bits: int) -> str:
+    # Same id scheme as the OpenTelemetry SDK (random, never all zeros)
+    value = 0
+    while not value:
+        value = random.getrandbits(bits)
+    return f"{value:0{bits // 4}x}"
+
+
+class Span:
+    """One timed operation of a trace; attribute and status names follow OpenTelemetry."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "status", "status_message")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str] = None, attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = _new_id(64)
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.status = "UNSET"
+        self.status_message = ""
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_status(self, status: str, message: str = "") -> None:
+        self.status = status
+        self.status_message = message
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        return (self.end_ns - self.start_ns) / 1e6 if self.end_ns is not None else None
+
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """OTLP/JSON-like representation (ids in hex, times in unix nanoseconds)."""
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "durationMs": round(self.duration_ms, 3) if self.end_ns is not None else None,
+            "attributes": self.attributes,
+            "status": {"code": self.status, "message": self.status_message},
+        }
+
+
+class InMemorySpanExporter:
+    """Keeps the last `max_spans` finished spans (tests, debugging)."""
+
+    def __init__(self, max_spans: int = 10_000):
+        self._spans: Deque[Span] = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        with self._lock:
+            self._spans.append(span)
+
+    def get_finished_spans(self, trace_id: Optional[str] = None) -> List[Span]:
+        with self._lock:
+            spans = list(self._spans)
+        return [s for s in spans if trace_id is None or s.trace_id == trace_id]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._spans.clear()
+
+
+class ConsoleSpanExporter:
+    """Writes one JSON line per finished span; grep a request id to get its trace."""
+
+    def __init__(self, stream: Optional[TextIO] = None):
+        self.stream = stream
+
+    def export(self, span: Span) -> None:
+        stream = self.stream or sys.stderr
+        stream.write(json.dumps(span.to_dict(), default=str) + "\n")
+
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+_current_request_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("current_request_id", default=None)
+
+
+class Tracer:
+    """
+    Minimal OpenTelemetry-style tracer.
+
+    The active span lives in a context variable, so spans opened in asyncio tasks
+    (chunked generation fans out with gather) are parented to the span that was
+    active when the task was created. Finished spans go to every exporter; with no
+    exporter configured spans are still created (ids, request correlation) but
+    nothing is recorded.
+    """
+
+    def __init__(self, exporters: Optional[List[Any]] = None):
+        self.exporters: List[Any] = list(exporters or [])
+
+    def add_exporter(self, exporter: Any) -> None:
+        self.exporters.append(exporter)
+
+    def remove_exporter(self, exporter: Any) -> None:
+        if exporter in self.exporters:
+            self.exporters.remove(exporter)
+
+    @contextmanager
+    def span(self, name: str, parent: Optional[Tuple[str, str]] = None, **attributes: Any) -> Iterator[Span]:
+        """
+        Child of the current span, or a new trace. `parent` is a remote
+        (trace_id, span_id) pair, e.g. from an incoming traceparent header.
+        """
+        current = _current_span.get()
+        if parent is not None:
+            trace_id, parent_id = parent
+        elif current is not None:
+            trace_id, parent_id = current.trace_id, current.span_id
+        else:
+            trace_id, parent_id = _new_id(128), None
+        span = Span(name, trace_id, parent_id, attributes)
+        request_id = _current_request_id.get()
+        if request_id is not None:
+            span.attributes.setdefault("request.id", request_id)
+
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set_status("ERROR", str(e) or type(e).__name__)
+            span.set_attribute("exception.type", type(e).__name__)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end_ns = time.time_ns()
+            for exporter in self.exporters:
+                try:
+                    exporter.export(span)
+                except Exception as e:  # An exporter must never fail a request
+                    logger.warning(f"Span export failed: {e}")
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def current_request_id() -> Optional[str]:
+    return _current_request_id.get()
+
+
+@contextmanager
+def request_context(request_id: str) -> Iterator[None]:
+    """Spans opened in the block carry `request.id`."""
+    token = _current_request_id.set(request_id)
+    try:
+        yield
+    finally:
+        _current_request_id.reset(token)
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str]]:
+    """(trace_id, parent span_id) from a W3C traceparent header, or None if absent/invalid."""
+    if not header:
+        return None
+    match = _TRACEPARENT.match(header.strip().lower())
+    if match is None or set(match.group(1)) == {"0"} or set(match.group(2)) == {"0"}:
+        return None
+    return match.group(1), match.group(2)
+
+
+def sanitize_request_id(value: Optional[str]) -> str:
+    """Client-supplied X-Request-ID if it is a short token, otherwise a new id."""
+    if value and _REQUEST_ID.match(value):
+        return value
+    return _new_id(128)
+
+
+def exporters_from_env() -> List[Any]:
+    """TRACING_EXPORTER: comma-separated list of "console" and "memory" (empty = off)."""
+    exporters: List[Any] = []
+    for name in os.getenv("TRACING_EXPORTER", "").split(","):
+        name = name.strip().lower()
+        if name == "console":
+            exporters.append(ConsoleSpanExporter())
+        elif name == "memory":
+            exporters.append(InMemorySpanExporter())
+        elif name and name != "none":
+            logger.warning(f"Unknown TRACING_EXPORTER {name!r} ignored")
+    return exporters
+
+
+TRACER = Tracer(exporters_from_env())
@@ -1,5 +1,6 @@
 import json
 import re
+import hashlib
 import logging
 from typing import Dict, Any
 
@@ -15,7 +16,16 @@ def extract_json_from_text(text: str) -> Dict[str, Any]:
 
     # 1. Strip whitespace
     text = text.strip()
-    
+
+    # Fast path: structured-output mode returns the bare object
+    if text.startswith("{") and text.endswith("}"):
+        try:
+            data = json.loads(text)
+            if isinstance(data, dict):
+                return data
+        except json.JSONDecodeError:
+            pass
+
     # 2. Key Step: Remove <think>...</think> blocks first (DeepSeek/Reasoning models)
     # This prevents finding JSON-like structures inside reasoning traces.
     text = re.sub(r"<think>.*?</think>", "", text, flags=re.DOTALL).strip()
@@ -63,3 +73,21 @@ def extract_json_from_text(text: str) -> Dict[str, Any]:
     # 5. If all fails
     logger.error(f"Failed to parse JSON from text. Content snippet of first 200 chars: {text[:200]}...")
     raise ValueError("Could not parse JSON from LLM response: No JSON object found in response")
+
+
+def _canonical_default(value: Any) -> Any:
+    # Sets (e.g. element tags) have no stable order, sort them so the hash is deterministic
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=str)
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    return str(value)
+
+def graph_content_hash(data: Any) -> str:
+    """
+    Stable content hash of a graph (or any JSON-like payload).
+    Key order and set ordering do not affect the result, so the same graph
+    always hashes to the same value across requests and worker processes.
+    """
+    canonical = json.dumps(data, sort_keys=True, separators=(",", ":"), default=_canonical_default)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
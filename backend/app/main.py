@@ -1,14 +1,37 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
 from dotenv import load_dotenv
 import os
 
 load_dotenv()
 
-from app.api.endpoints import generation, export
+# Routers, middleware and metrics are imported eagerly: FastAPI needs every route at startup
+# (routing table, OpenAPI). They stay cheap because the heavy libraries they use load on first call.
+from app.api.endpoints import generation, export, imports, admin
+from app.api.middleware import CompressionMiddleware, ProfilingMiddleware, TracingMiddleware
+from app.core.metrics import REGISTRY, CONTENT_TYPE as METRICS_CONTENT_TYPE
 
 
-app = FastAPI(title="DrawTogaf API", version="0.1.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Heavy subsystems (python-pptx, networkx, Pydantic validators) load on first use.
+    # Long-lived workers can pay that cost up front instead of on the first request.
+    if os.getenv("PRELOAD_ON_STARTUP", "false").lower() == "true":
+        preload()
+    yield
+
+
+def preload() -> None:
+    """Import and build everything that is otherwise loaded lazily."""
+    import networkx  # noqa: F401
+    import pptx  # noqa: F401
+    from app.core.metamodel import build_validators
+    build_validators()
+
+
+app = FastAPI(title="DrawTogaf API", version="0.1.0", lifespan=lifespan)
 
 # CORS Setup
 origins = [
@@ -25,10 +48,22 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Request-ID"],
 )
 
+# Response compression (gzip / brotli above COMPRESSION_MIN_SIZE bytes)
+app.add_middleware(CompressionMiddleware, **CompressionMiddleware.options_from_env())
+
+# On-demand (admin) and slow-request profiling, inside the root span so profiles share the request id
+app.add_middleware(ProfilingMiddleware)
+
+# Outermost: request id + root span around everything else (TRACING_EXPORTER selects where spans go)
+app.add_middleware(TracingMiddleware)
+
 app.include_router(generation.router, prefix="/api", tags=["generation"])
 app.include_router(export.router, prefix="/api/export", tags=["export"])
+app.include_router(imports.router, prefix="/api/import", tags=["import"])
+app.include_router(admin.router, prefix="/api/admin", tags=["admin"], include_in_schema=False)
 
 @app.get("/")
 def read_root():
@@ -37,3 +72,8 @@ def read_root():
 @app.get("/health")
 def health_check():
     return {"status": "healthy"}
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus scrape endpoint (metrics of the worker process answering)."""
+    return Response(content=REGISTRY.exposition(), media_type=METRICS_CONTENT_TYPE)
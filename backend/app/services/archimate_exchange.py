@@ -0,0 +1,576 @@
+import math
+import re
+from collections import Counter
+from enum import Enum
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from app.core.factory import ElementFactory
+from app.core.graph import EnterpriseArchitectureGraph
+from app.core.relationships import Relation, RelationshipType
+
+# The Open Group ArchiMate Model Exchange File Format (3.0 / 3.1 share the namespace)
+EXCHANGE_NS = "http://www.opengroup.org/xsd/archimate/3.0/"
+XSI_TYPE = "{http://www.w3.org/2001/XMLSchema-instance}type"
+XML_LANG = "{http://www.w3.org/XML/1998/namespace}lang"
+
+JUNCTION_TYPES = ("AndJunction", "OrJunction", "Junction")
+
+# Node size when the frontend did not send one (same defaults as the PPTX export)
+DEFAULT_WIDTH, DEFAULT_HEIGHT = 150.0, 80.0
+
+# The only tags the importer gets events for (any namespace); everything else is read through them.
+# View nodes and connections get their own events: one view can show the whole model.
+# Organization items (the folder tree, an item per element) are not read, only dropped like the rest.
+_EVENT_TAGS = (
+    "{*}element", "{*}relationship", "{*}propertyDefinition", "{*}view", "{*}node", "{*}connection",
+    "{*}item", "{*}organizations",
+)
+
+
+def _local(tag: Any) -> str:
+    """"{namespace}name" -> "name"."""
+    # Comments and processing instructions have a function as tag
+    return tag.rsplit("}", 1)[-1] if isinstance(tag, str) else ""
+
+
+def _text(parent: Any, tag: str, lang: Optional[str] = None) -> str:
+    """Text of the `tag` child in `lang` (first one otherwise)."""
+    first = None
+    for child in parent.iterchildren(tag):
+        if lang is None or child.get(XML_LANG) == lang:
+            return (child.text or "").strip()
+        if first is None:
+            first = (child.text or "").strip()
+    return first or ""
+
+
+class ExchangeFormatError(ValueError):
+    """Not a well-formed exchange file."""
+
+
+class ImportReport:
+    def __init__(self):
+        self.model_name = ""
+        self.elements = 0
+        self.relationships = 0
+        self.views = 0
+        self.skipped_elements: Counter = Counter()
+        self.skipped_relationships: Counter = Counter()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "model_name": self.model_name,
+            "elements": self.elements,
+            "relationships": self.relationships,
+            "views": self.views,
+            "skipped_elements": dict(self.skipped_elements),
+            "skipped_relationships": dict(self.skipped_relationships),
+        }
+
+
+class ExchangeImporter:
+    """
+    Incremental reader of ArchiMate Model Exchange files into an EnterpriseArchitectureGraph.
+
+    Bytes are fed as they arrive (file chunks, request body) to a pull parser;
+    each <element>, <relationship> and view <node> is mapped as soon as it is
+    complete and then dropped from the XML tree, so the parser's memory stays
+    flat however large the file (lxml pull parser, events for those tags only).
+    Elements go through ElementFactory.create_elements and are added to the
+    graph in batches of `batch_size`, relationships likewise.
+
+    Node positions come from the first view showing the element (the exchange
+    format uses absolute diagram coordinates, nested nodes included). Junctions,
+    unknown types and relationships to them or to other relationships are
+    skipped and counted in the report. The graph keeps one relationship per
+    source and target: the first one wins, later ones count as "duplicate_pair".
+    """
+
+    def __init__(self, batch_size: int = 1000, lang: Optional[str] = None):
+        # lxml comes with python-pptx; loaded on first import like the rest of the export stack
+        from lxml import etree
+
+        self.batch_size = batch_size
+        self.lang = lang
+        self.graph = EnterpriseArchitectureGraph()
+        self.report = ImportReport()
+        self.positions: Dict[str, Dict[str, float]] = {}
+        # No DTD entities, no network: an uploaded file must not make the server fetch anything
+        self._parser = etree.XMLPullParser(
+            events=("end",), tag=_EVENT_TAGS, resolve_entities=False, no_network=True, huge_tree=True
+        )
+        # Qualified child tags, set from the namespace of the first event (files without one work too)
+        self._ns: Optional[str] = None
+        self._element_rows: List[Dict[str, Any]] = []
+        self._relations: List[Relation] = []
+        # (source, target) of the pending batch, not yet visible through graph.has_edge
+        self._pending_pairs: Set[Tuple[str, str]] = set()
+        self._property_names: Dict[str, str] = {}
+        # Elements carrying properties, renamed once the propertyDefinitions are known
+        self._with_properties: List[Any] = []
+        # Event tag -> local name; per import, a file only uses a few dozen tags
+        self._local_names: Dict[Any, str] = {}
+
+    def feed(self, data: bytes) -> None:
+        try:
+            self._parser.feed(data)
+        except SyntaxError as e:  # lxml's XMLSyntaxError
+            raise ExchangeFormatError(f"Invalid XML: {e}") from e
+        self._process_events()
+
+    def close(self) -> EnterpriseArchitectureGraph:
+        try:
+            root = self._parser.close()
+        except SyntaxError as e:
+            raise ExchangeFormatError(f"Invalid XML: {e}") from e
+        self._process_events()
+        self._flush_elements()
+        self._flush_relations()
+        if root is not None and self._ns is None:
+            self._ns = root.tag[:-len(_local(root.tag))]
+            self.report.model_name = self._text(root, "name")
+        if self._property_names:
+            for element in self._with_properties:
+                element.attributes = {self._property_names.get(k, k): v for k, v in element.attributes.items()}
+        return self.graph
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Frontend graph dict, nodes placed as in the imported views."""
+        graph_dict = self.graph.to_dict()
+        for node in graph_dict["nodes"]:
+            position = self.positions.get(node["id"])
+            if position is not None:
+                node["position"] = {"x": position["x"], "y": position["y"]}
+                node["width"] = position["w"]
+                node["height"] = position["h"]
+        return graph_dict
+
+    def _process_events(self) -> None:
+        for _, elem in self._parser.read_events():
+            name = self._local_names.get(elem.tag)
+            if name is None:
+                name = self._local_names[elem.tag] = _local(elem.tag)
+            if self._ns is None:
+                self._ns = elem.tag[:-len(name)]
+                self.report.model_name = self._text(elem.getroottree().getroot(), "name")
+            if name == "element":
+                self._on_element(elem)
+            elif name == "relationship":
+                self._on_relationship(elem)
+            elif name == "node":
+                self._on_node(elem)
+            elif name == "view":
+                self.report.views += 1
+            elif name == "propertyDefinition":
+                self._property_names[elem.get("identifier", "")] = self._text(elem, "name")
+            # Processed: drop it and its processed siblings, so the tree never holds more than one entry
+            elem.clear()
+            parent = elem.getparent()
+            if parent is not None:
+                while elem.getprevious() is not None:
+                    del parent[0]
+
+    def _text(self, parent: Any, name: str) -> str:
+        return _text(parent, self._ns + name, self.lang)
+
+    def _read(self, elem: Any) -> Tuple[str, str, Dict[str, str]]:
+        """Name, documentation and properties of an element or relationship, in one pass over its children."""
+        ns, lang = self._ns, self.lang
+        texts: Dict[str, Optional[str]] = {}
+        properties: Dict[str, str] = {}
+        for child in elem:
+            tag = child.tag
+            if tag == ns + "properties":
+                for prop in child:
+                    properties[prop.get("propertyDefinitionRef", "")] = _text(prop, ns + "value", lang)
+            elif tag not in texts or (lang is not None and child.get(XML_LANG) == lang):
+                texts[tag] = child.text
+        name = texts.get(ns + "name") or ""
+        documentation = texts.get(ns + "documentation") or ""
+        return name.strip(), documentation.strip(), properties
+
+    def _on_element(self, elem: Any) -> None:
+        el_type = elem.get(XSI_TYPE, "")
+        identifier = elem.get("identifier")
+        if el_type in JUNCTION_TYPES or not identifier or ElementFactory.resolve_type(el_type) is None:
+            self.report.skipped_elements[el_type or "untyped"] += 1
+            return
+        name, documentation, properties = self._read(elem)
+        self._element_rows.append(
+            {"id": identifier, "type": el_type, "name": name, "description": documentation, "attributes": properties}
+        )
+        if len(self._element_rows) >= self.batch_size:
+            self._flush_elements()
+
+    def _flush_elements(self) -> None:
+        if not self._element_rows:
+            return
+        rows, self._element_rows = self._element_rows, []
+        elements = [el for el in ElementFactory.create_elements(rows) if el is not None]
+        self.graph.add_elements(elements)
+        self._with_properties.extend(el for el in elements if el.attributes)
+        self.report.elements += len(elements)
+
+    def _on_relationship(self, elem: Any) -> None:
+        # Elements precede relationships in the file: make sure every one is in the graph
+        self._flush_elements()
+        rel_type = elem.get(XSI_TYPE, "")
+        try:
+            relationship_type = RelationshipType(rel_type)
+        except ValueError:
+            self.report.skipped_relationships[rel_type or "untyped"] += 1
+            return
+        source, target = elem.get("source"), elem.get("target")
+        nodes = self.graph.graph.nodes
+        if source not in nodes or target not in nodes:
+            self.report.skipped_relationships["dangling"] += 1
+            return
+        # A DiGraph holds one edge per direction: a second one would silently replace the first
+        if (source, target) in self._pending_pairs or self.graph.graph.has_edge(source, target):
+            self.report.skipped_relationships["duplicate_pair"] += 1
+            return
+        self._pending_pairs.add((source, target))
+        # Most relationships are unnamed, empty tags
+        name, documentation, _ = self._read(elem) if len(elem) else ("", "", None)
+        self._relations.append(Relation(
+            source_id=source, target_id=target, type=relationship_type,
+            description=documentation or name,
+            # Undirected unless the Association says otherwise
+            bidirectional=relationship_type == RelationshipType.ASSOCIATION and elem.get("isDirected") != "true",
+        ))
+        if len(self._relations) >= self.batch_size:
+            self._flush_relations()
+
+    def _flush_relations(self) -> None:
+        if not self._relations:
+            return
+        relations, self._relations = self._relations, []
+        self.graph.add_relations(relations)
+        self._pending_pairs.clear()
+        self.report.relationships += len(relations)
+
+    def _on_node(self, elem: Any) -> None:
+        # Nested nodes end (and are dropped) before their container; coordinates are absolute anyway
+        ref = elem.get("elementRef")
+        if ref is None or ref in self.positions:
+            return
+        self._flush_elements()
+        if ref not in self.graph.graph.nodes:
+            return
+        try:
+            self.positions[ref] = {k: float(elem.get(k, 0)) for k in ("x", "y", "w", "h")}
+        except ValueError:
+            pass
+
+
+def import_exchange(chunks: Iterable[bytes], batch_size: int = 1000) -> ExchangeImporter:
+    """Import a whole exchange file given as an iterable of byte chunks; the graph is `importer.graph`."""
+    importer = ExchangeImporter(batch_size=batch_size)
+    for chunk in chunks:
+        importer.feed(chunk)
+    importer.close()
+    return importer
+
+
+def read_chunks(path: str, chunk_size: int = 1 << 16) -> Iterable[bytes]:
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+# --- Export ---
+
+# Identifiers are xs:ID: NCNames (uuids starting with a digit need a prefix), unique in the file
+_NCNAME = re.compile(r"^[A-Za-z_][\w.\-]*$", re.ASCII)
+_NOT_NCNAME_CHARS = re.compile(r"[^\w.\-]", re.ASCII)
+# Identifiers export_exchange makes up itself: element identifiers stay clear of them
+_GENERATED_ID = re.compile(r"^(?:id-model|view-1|(?:rel|c|propid)-\d+|n-.*)$")
+# Characters XML 1.0 cannot carry, even escaped
+_INVALID_XML_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+# Most names need no escaping at all: one regex scan decides
+_NEEDS_ESCAPE = re.compile('[&<>"\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+# A Grouping nests the elements it composes or aggregates
+_NESTING_TYPES = (RelationshipType.COMPOSITION.value, RelationshipType.AGGREGATION.value)
+
+# Grid used for elements without a position, and the margin of a Grouping around its content
+_GRID_COLUMNS, _GRID_GAP = 10, 50.0
+_GROUP_PADDING, _GROUP_HEADER = 20.0, 30.0
+
+
+def _xml_ids(element_ids: Iterable[str]) -> Dict[str, str]:
+    """
+    Exchange identifier of each element: its id when that is a valid NCName,
+    otherwise with invalid characters replaced by "_" and, when it still does
+    not start like a name, an "id-" prefix; a numeric suffix keeps identifiers
+    unique ("1-a" next to an existing "id-1-a").
+    `element_ids` is read twice.
+    """
+    ids: Dict[str, str] = {}
+    used: Set[str] = set()
+    # Valid ids first, so they are kept whatever the order: renamed ones go around them
+    for element_id in element_ids:
+        if isinstance(element_id, str) and _NCNAME.match(element_id) and not _GENERATED_ID.match(element_id):
+            ids[element_id] = element_id
+            used.add(element_id)
+    for element_id in element_ids:
+        if element_id in ids:
+            continue
+        base = _NOT_NCNAME_CHARS.sub("_", str(element_id))
+        if not _NCNAME.match(base) or _GENERATED_ID.match(base):
+            base = "id-" + base
+        candidate, n = base, 1
+        while candidate in used or _GENERATED_ID.match(candidate):
+            n += 1
+            candidate = f"{base}-{n}"
+        used.add(candidate)
+        ids[element_id] = candidate
+    return ids
+
+
+def _escape(value: Any) -> str:
+    text = value if isinstance(value, str) else str(value)
+    if _NEEDS_ESCAPE.search(text) is None:
+        return text
+    text = _INVALID_XML_CHARS.sub("", text)
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;").replace('"', "&quot;")
+
+
+def _nesting(graph: EnterpriseArchitectureGraph) -> Tuple[Dict[str, List[str]], set]:
+    """
+    Children of each Grouping in the view, and the (source, target) pairs
+    shown by nesting instead of a connection. An element nested in several
+    groupings goes into the first one; cycles are ignored.
+    """
+    nodes = graph.graph.nodes
+    parents: Dict[str, str] = {}
+    children: Dict[str, List[str]] = {}
+    nested_edges = set()
+    for source, target, data in graph.graph.edges(data=True):
+        if _relation_type(data) not in _NESTING_TYPES or target in parents or source == target:
+            continue
+        if _value(nodes[source]["data"].type) != "Grouping":
+            continue
+        ancestor = source
+        while ancestor is not None and ancestor != target:
+            ancestor = parents.get(ancestor)
+        if ancestor == target:
+            continue
+        parents[target] = source
+        children.setdefault(source, []).append(target)
+        nested_edges.add((source, target))
+    return children, nested_edges
+
+
+def _value(value: Any) -> str:
+    # Enum fields left at their class default are members, validated ones plain strings
+    return value.value if isinstance(value, Enum) else str(value)
+
+
+def _relation_type(data: Dict[str, Any]) -> str:
+    return _value(data["type"])
+
+
+def _layout(
+    graph: EnterpriseArchitectureGraph, positions: Dict[str, Dict[str, float]], children: Dict[str, List[str]]
+) -> Dict[str, Tuple[float, float, float, float]]:
+    """Box (x, y, w, h) of every element: sent positions, a grid otherwise; groupings wrap their content."""
+    boxes: Dict[str, Tuple[float, float, float, float]] = {}
+    cell = 0
+    for element_id in graph.graph.nodes:
+        position = positions.get(element_id)
+        if position is not None:
+            boxes[element_id] = (
+                position.get("x", 0.0), position.get("y", 0.0),
+                position.get("w") or DEFAULT_WIDTH, position.get("h") or DEFAULT_HEIGHT,
+            )
+        elif element_id not in children:
+            row, column = divmod(cell, _GRID_COLUMNS)
+            boxes[element_id] = (
+                column * (DEFAULT_WIDTH + _GRID_GAP), row * (DEFAULT_HEIGHT + _GRID_GAP), DEFAULT_WIDTH, DEFAULT_HEIGHT
+            )
+            cell += 1
+
+    # Nesting is a forest (see _nesting): no cycle to guard against
+    def fit(group_id: str) -> Tuple[float, float, float, float]:
+        if group_id in boxes:
+            return boxes[group_id]
+        content = [fit(child) for child in children[group_id]]
+        left = min(x for x, _, _, _ in content) - _GROUP_PADDING
+        top = min(y for _, y, _, _ in content) - _GROUP_PADDING - _GROUP_HEADER
+        right = max(x + w for x, _, w, _ in content) + _GROUP_PADDING
+        bottom = max(y + h for _, y, _, h in content) + _GROUP_PADDING
+        boxes[group_id] = (left, top, right - left, bottom - top)
+        return boxes[group_id]
+
+    for group_id in children:
+        fit(group_id)
+    return boxes
+
+
+def load_graph_dict(graph_dict: Dict[str, Any]) -> Tuple[EnterpriseArchitectureGraph, Dict[str, Dict[str, float]]]:
+    """Graph and node boxes of a frontend graph dict (the /api/export request body), ids kept."""
+    graph = EnterpriseArchitectureGraph()
+    nodes = graph_dict.get("nodes", [])
+    positions: Dict[str, Dict[str, float]] = {}
+    elements = []
+    for node, element in zip(nodes, ElementFactory.create_elements(nodes)):
+        if element is None:
+            continue
+        elements.append(element)
+        position = node.get("position") or {}
+        if "x" in position or "y" in position:
+            positions[element.id] = {
+                "x": float(position.get("x") or 0), "y": float(position.get("y") or 0),
+                "w": float(node.get("width") or DEFAULT_WIDTH), "h": float(node.get("height") or DEFAULT_HEIGHT),
+            }
+    graph.add_elements(elements)
+    relations = []
+    for edge in graph_dict.get("edges", []):
+        if edge.get("source_id") in graph.graph.nodes and edge.get("target_id") in graph.graph.nodes:
+            try:
+                relations.append(Relation(**edge))
+            except ValueError:
+                continue
+    graph.add_relations(relations)
+    return graph, positions
+
+
+def _number(value: float) -> str:
+    # Exchange coordinates are integers
+    return str(int(math.floor(value + 0.5)))
+
+
+def export_exchange(
+    graph: EnterpriseArchitectureGraph,
+    positions: Optional[Dict[str, Dict[str, float]]] = None,
+    name: str = "DrawTogaf model",
+    view_name: str = "Default View",
+    lang: str = "en",
+    batch_size: int = 500,
+) -> Iterator[bytes]:
+    """
+    The graph as an ArchiMate Model Exchange file, yielded in chunks of about
+    `batch_size` entries as it is written: the XML is never held in memory as a
+    whole, and the first bytes go out before any element is serialized.
+
+    One view shows every element at its `positions` entry ({"x", "y", "w", "h"},
+    as collected by ExchangeImporter); Groupings contain the elements they
+    compose or aggregate as nested nodes, with the nesting relationship left
+    implicit rather than drawn. Junction relations have no exchange
+    equivalent and are left out.
+    """
+    positions = positions or {}
+    ids = _xml_ids(list(graph.graph.nodes))
+    lang_attr = f' xml:lang="{_escape(lang)}"'
+    nx_graph = graph.graph
+    edges = [(u, v, data) for u, v, data in nx_graph.edges(data=True)
+             if _relation_type(data) != RelationshipType.JUNCTION.value]
+
+    yield (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<model xmlns="{EXCHANGE_NS}" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+        f'identifier="id-model">\n'
+        f'  <name{lang_attr}>{_escape(name)}</name>\n'
+    ).encode()
+    if not nx_graph.number_of_nodes():
+        yield b"</model>\n"
+        return
+
+    # Property definitions are numbered as attribute keys show up; they are written after the relationships
+    property_ids: Dict[str, str] = {}
+    buffer: List[str] = ["  <elements>\n"]
+    for element_id, data in nx_graph.nodes(data=True):
+        element = data["data"]
+        entry = f'    <element identifier="{ids[element_id]}" xsi:type="{_value(element.type)}">' \
+                f"<name{lang_attr}>{_escape(element.name)}</name>"
+        if element.description:
+            entry += f"<documentation{lang_attr}>{_escape(element.description)}</documentation>"
+        if element.attributes:
+            entry += "<properties>"
+            for key, value in element.attributes.items():
+                ref = property_ids.setdefault(key, f"propid-{len(property_ids) + 1}")
+                entry += f'<property propertyDefinitionRef="{ref}"><value{lang_attr}>{_escape(value)}</value></property>'
+            entry += "</properties>"
+        buffer.append(entry + "</element>\n")
+        if len(buffer) >= batch_size:
+            yield "".join(buffer).encode()
+            buffer = []
+    buffer.append("  </elements>\n")
+
+    if edges:
+        buffer.append("  <relationships>\n")
+        for i, (source, target, data) in enumerate(edges):
+            relation: Relation = data["data"]
+            rel_type = _relation_type(data)
+            entry = f'    <relationship identifier="rel-{i}" source="{ids[source]}" target="{ids[target]}" ' \
+                    f'xsi:type="{rel_type}"'
+            if rel_type == RelationshipType.ASSOCIATION.value and not relation.bidirectional:
+                entry += ' isDirected="true"'
+            if relation.description:
+                entry += f"><name{lang_attr}>{_escape(relation.description)}</name></relationship>\n"
+            else:
+                entry += "/>\n"
+            buffer.append(entry)
+            if len(buffer) >= batch_size:
+                yield "".join(buffer).encode()
+                buffer = []
+        buffer.append("  </relationships>\n")
+
+    if property_ids:
+        buffer.append("  <propertyDefinitions>\n")
+        for key, ref in property_ids.items():
+            buffer.append(
+                f'    <propertyDefinition identifier="{ref}" type="string"><name{lang_attr}>{_escape(key)}</name>'
+                "</propertyDefinition>\n"
+            )
+        buffer.append("  </propertyDefinitions>\n")
+
+    children, nested_edges = _nesting(graph)
+    boxes = _layout(graph, positions, children)
+    nested = {child for group in children.values() for child in group}
+    buffer.append(
+        '  <views>\n    <diagrams>\n'
+        f'      <view identifier="view-1" xsi:type="Diagram"><name{lang_attr}>{_escape(view_name)}</name>\n'
+    )
+    # Depth-first over each top-level element and what it nests; closing tags are pending entries
+    for root in nx_graph.nodes:
+        if root in nested:
+            continue
+        pending: List[Any] = [root]
+        while pending:
+            element_id = pending.pop()
+            if element_id is None:
+                buffer.append("</node>")
+                continue
+            x, y, w, h = boxes[element_id]
+            node_id = ids[element_id]
+            buffer.append(
+                f'<node identifier="n-{node_id}" elementRef="{node_id}" xsi:type="Element" '
+                f'x="{_number(x)}" y="{_number(y)}" w="{_number(w)}" h="{_number(h)}"'
+            )
+            content = children.get(element_id)
+            if content:
+                buffer.append(">")
+                pending.append(None)
+                pending.extend(reversed(content))
+            else:
+                buffer.append("/>")
+        buffer.append("\n")
+        if len(buffer) >= batch_size:
+            yield "".join(buffer).encode()
+            buffer = []
+    for i, (source, target, _) in enumerate(edges):
+        if (source, target) in nested_edges:
+            continue
+        buffer.append(
+            f'<connection identifier="c-{i}" relationshipRef="rel-{i}" xsi:type="Relationship" '
+            f'source="n-{ids[source]}" target="n-{ids[target]}"/>\n'
+        )
+        if len(buffer) >= batch_size:
+            yield "".join(buffer).encode()
+            buffer = []
+    buffer.append("      </view>\n    </diagrams>\n  </views>\n</model>\n")
+    yield "".join(buffer).encode()
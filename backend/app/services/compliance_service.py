@@ -2,8 +2,10 @@ from typing import List, Dict, Any
 from app.core.graph import EnterpriseArchitectureGraph
 from app.core.metamodel import Layer, ElementType
 from app.core.relationships import RelationshipType
+from app.core.profiling import profiled
 
 class ComplianceService:
+    @profiled
     def validate_graph(self, graph: EnterpriseArchitectureGraph) -> Dict[str, Any]:
         """
         Validate the EA model against TOGAF and ArchiMate rules.
@@ -72,20 +74,11 @@ class ComplianceService:
 
             # Reconstruction logic (similar to GenerationService but simplified)
             all_nodes = graph_dict.get("nodes", [])
-            for node_data in all_nodes:
-                el_type = node_data.get("type", "")
-                name = node_data.get("name", "Unknown")
-                desc = node_data.get("description", "")
-                
-                # Use Factory
-                obj = ElementFactory.create_element(el_type, name, desc)
+            # Batch factory; ids preserved in the dict are kept (important for edges)
+            for obj in ElementFactory.create_elements(all_nodes):
                 if obj:
-                    # If ID is preserved in dict, use it (important for edges)
-                    if "id" in node_data:
-                        obj.id = node_data["id"]
-                    
                     graph.add_element(obj)
-                    name_to_id[name.lower()] = obj.id
+                    name_to_id[obj.name.lower()] = obj.id
                     # Also map by ID if available for edge reconstruction
                     name_to_id[obj.id] = obj.id
 
@@ -1,51 +1,159 @@
-from pptx import Presentation
-from pptx.util import Pt, Inches
-from pptx.enum.shapes import MSO_SHAPE
-from pptx.enum.dml import MSO_THEME_COLOR
-from pptx.dml.color import RGBColor
+import os
 from io import BytesIO
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Tuple
 import logging
+from app.core.profiling import profiled
 
 logger = logging.getLogger(__name__)
 
+RGB = Tuple[int, int, int]
+
+# Colors (RGB) matching the frontend, as (fill, border); shared by every export format
+# Active (Blue): bg #E1F5FE (225, 245, 254), border #0288D1 (2, 136, 209)
+# Behavior (Yellow): bg #FFF9C4 (255, 249, 196), border #FBC02D (251, 192, 45)
+# Passive (Green): bg #E8F5E9 (232, 245, 233), border #43A047 (67, 160, 71)
+ACTIVE_COLORS: Tuple[RGB, RGB] = ((225, 245, 254), (2, 136, 209))
+BEHAVIOR_COLORS: Tuple[RGB, RGB] = ((255, 249, 196), (251, 192, 45))
+PASSIVE_COLORS: Tuple[RGB, RGB] = ((232, 245, 233), (67, 160, 71))
+DEFAULT_COLORS: Tuple[RGB, RGB] = ((245, 245, 245), (158, 158, 158))
+
+_COLORS_BY_TYPE: Dict[str, Tuple[RGB, RGB]] = {
+    **dict.fromkeys([
+        'applicationcomponent', 'applicationinterface',
+        'businessactor', 'businessrole',
+        'node', 'device', 'systemsoftware', 'communicationnetwork'
+    ], ACTIVE_COLORS),
+    **dict.fromkeys([
+        'businessprocess', 'businessfunction', 'businessinteraction', 'businessservice',
+        'applicationservice', 'applicationfunction', 'applicationinteraction',
+        'technologyservice', 'technologyfunction'
+    ], BEHAVIOR_COLORS),
+    **dict.fromkeys([
+        'dataobject', 'businessobject', 'artifact', 'contract', 'representation'
+    ], PASSIVE_COLORS),
+}
+
+
+def colors_by_type(type_str: str) -> Tuple[RGB, RGB]:
+    """(fill, border) colors of an element type, case-insensitive."""
+    return _COLORS_BY_TYPE.get(type_str.lower() if type_str else "", DEFAULT_COLORS)
+
+
+def node_label(node: Dict[str, Any]) -> str:
+    return node.get("name") or node.get("data", {}).get("label") or node.get("label", "Node")
+
+
+def node_type_of(node: Dict[str, Any]) -> str:
+    # The color logic relies on type strings (layer is not used)
+    return node.get("type") or node.get("data", {}).get("type") or "Unknown"
+
+
+class SlideLayout:
+    """
+    Fits the diagram into one slide: a single scale factor for the whole
+    diagram, centered between 50pt margins. Shared by both PPTX writers so
+    they place shapes identically.
+    """
+
+    # Margins (50pt)
+    MARGIN = 50
+
+    def __init__(self, nodes: List[Dict[str, Any]], slide_width_pt: float, slide_height_pt: float):
+        # Extract coordinates and dimensions, falling back to 0 if missing (though they shouldn't be now)
+        # We need to handle potential string values or missing keys safely
+        xs = [float(n.get("position", {}).get("x", 0) or 0) for n in nodes]
+        ys = [float(n.get("position", {}).get("y", 0) or 0) for n in nodes]
+
+        # Calculate bounding box of all nodes including their width/height
+        # to ensure nothing is clipped
+        self.min_x = min(xs)
+        self.min_y = min(ys)
+
+        # Calculate max extents
+        max_x = max([float(n.get("position", {}).get("x", 0) or 0) + float(n.get("width", 150) or 150) for n in nodes])
+        max_y = max([float(n.get("position", {}).get("y", 0) or 0) + float(n.get("height", 80) or 80) for n in nodes])
+
+        diagram_width = max_x - self.min_x
+        diagram_height = max_y - self.min_y
+
+        # Protect against div by zero for single point diagrams
+        if diagram_width == 0: diagram_width = 1
+        if diagram_height == 0: diagram_height = 1
+
+        # PowerPoint Slide Dimensions (Standard 4:3 is 10x7.5 inches, Widescreen 16:9 is 13.33x7.5 inches)
+        # python-pptx default is 10x7.5 inches (9144000 EMUs width, 6858000 EMUs height)
+        # 1 inch = 914400 EMUs.
+        # Slide width in points: 10 * 72 = 720 pt
+        # Slide height in points: 7.5 * 72 = 540 pt
+        available_width = slide_width_pt - (2 * self.MARGIN)
+        available_height = slide_height_pt - (2 * self.MARGIN)
+
+        # Calculate Scale Factor to fit diagram into available space.
+        # Scaling up small diagrams is fine for visibility; "see all objects" is the priority.
+        scale_x = available_width / diagram_width
+        scale_y = available_height / diagram_height
+        self.scale = min(scale_x, scale_y)
+
+        # Center the diagram: offsets of the scaled diagram
+        scaled_w = diagram_width * self.scale
+        scaled_h = diagram_height * self.scale
+        self.offset_x = self.MARGIN + (available_width - scaled_w) / 2
+        self.offset_y = self.MARGIN + (available_height - scaled_h) / 2
+
+    def box(self, node: Dict[str, Any]) -> Tuple[float, float, float, float]:
+        """Left, top, width and height of a node on the slide, in points."""
+        # Original coords
+        x = float(node.get("position", {}).get("x", 0) or 0)
+        y = float(node.get("position", {}).get("y", 0) or 0)
+        w = float(node.get("width", 150) or 150)
+        h = float(node.get("height", 80) or 80)
+
+        # New coordinate = (Original - Min) * Scale + Offset
+        left_pt = (x - self.min_x) * self.scale + self.offset_x
+        top_pt = (y - self.min_y) * self.scale + self.offset_y
+        return left_pt, top_pt, w * self.scale, h * self.scale
+
+    @property
+    def font_size_pt(self) -> float:
+        # Font size follows the scale to avoid huge text on small blocks; minimum 8pt
+        return max(8, 12 * self.scale)
+
+
 class ExportService:
     def __init__(self):
         pass
 
     def _get_color_by_type(self, type_str: str):
-        t = type_str.lower() if type_str else ""
-        
-        # Colors (RGB) matching the frontend
-        # Active (Blue): bg #E1F5FE (225, 245, 254), border #0288D1 (2, 136, 209)
-        # Behavior (Yellow): bg #FFF9C4 (255, 249, 196), border #FBC02D (251, 192, 45)
-        # Passive (Green): bg #E8F5E9 (232, 245, 233), border #43A047 (67, 160, 71)
-
-        if t in [
-            'applicationcomponent', 'applicationinterface',
-            'businessactor', 'businessrole',
-            'node', 'device', 'systemsoftware', 'communicationnetwork'
-        ]:
-            return RGBColor(225, 245, 254), RGBColor(2, 136, 209) # Active
-        
-        if t in [
-            'businessprocess', 'businessfunction', 'businessinteraction', 'businessservice',
-            'applicationservice', 'applicationfunction', 'applicationinteraction',
-            'technologyservice', 'technologyfunction'
-        ]:
-            return RGBColor(255, 249, 196), RGBColor(251, 192, 45) # Behavior
-            
-        if t in [
-            'dataobject', 'businessobject', 'artifact', 'contract', 'representation'
-        ]:
-            return RGBColor(232, 245, 233), RGBColor(67, 160, 71) # Passive
+        from pptx.dml.color import RGBColor
 
-        return RGBColor(245, 245, 245), RGBColor(158, 158, 158) # Default
+        fill, border = colors_by_type(type_str)
+        return RGBColor(*fill), RGBColor(*border)
 
+    @profiled
     def create_pptx(self, graph_data: Dict[str, Any]) -> BytesIO:
         """
         Generates a PowerPoint file from the graph data.
+
+        PPTX_WRITER selects the implementation: "fast" (default) writes the
+        slide XML in bulk into a prebuilt package (app.services.pptx_writer),
+        "python-pptx" builds it shape by shape through python-pptx. Both give
+        the same slide.
+        """
+        if os.getenv("PPTX_WRITER", "fast").lower() == "python-pptx":
+            return self.create_pptx_python_pptx(graph_data)
+        from app.services.pptx_writer import write_pptx
+        return write_pptx(graph_data)
+
+    def create_pptx_python_pptx(self, graph_data: Dict[str, Any]) -> BytesIO:
         """
+        Generates a PowerPoint file from the graph data, one python-pptx shape at a time.
+        """
+        # python-pptx (and lxml) are only loaded when a deck is actually exported
+        from pptx import Presentation
+        from pptx.util import Pt
+        from pptx.enum.shapes import MSO_CONNECTOR, MSO_SHAPE
+        from pptx.dml.color import RGBColor
+
         prs = Presentation()
         # Use a blank slide layout (usually index 6)
         slide_layout = prs.slide_layouts[6] 
@@ -62,81 +170,12 @@ class ExportService:
             output.seek(0)
             return output
 
-        # Extract coordinates and dimensions, falling back to 0 if missing (though they shouldn't be now)
-        # We need to handle potential string values or missing keys safely
-        xs = [float(n.get("position", {}).get("x", 0) or 0) for n in nodes]
-        ys = [float(n.get("position", {}).get("y", 0) or 0) for n in nodes]
-        
-        # Calculate bounding box of all nodes including their width/height
-        # to ensure nothing is clipped
-        min_x = min(xs)
-        min_y = min(ys)
-        
-        # Calculate max extents
-        max_x = max([float(n.get("position", {}).get("x", 0) or 0) + float(n.get("width", 150) or 150) for n in nodes])
-        max_y = max([float(n.get("position", {}).get("y", 0) or 0) + float(n.get("height", 80) or 80) for n in nodes])
-        
-        diagram_width = max_x - min_x
-        diagram_height = max_y - min_y
-        
-        # Protect against div by zero for single point diagrams
-        if diagram_width == 0: diagram_width = 1
-        if diagram_height == 0: diagram_height = 1
-
-        # PowerPoint Slide Dimensions (Standard 4:3 is 10x7.5 inches, Widescreen 16:9 is 13.33x7.5 inches)
-        # python-pptx default is 10x7.5 inches (9144000 EMUs width, 6858000 EMUs height)
-        # 1 inch = 914400 EMUs. 
-        # Slide width in points: 10 * 72 = 720 pt
-        # Slide height in points: 7.5 * 72 = 540 pt
-        
-        SLIDE_WIDTH_PT = prs.slide_width.pt
-        SLIDE_HEIGHT_PT = prs.slide_height.pt
-        
-        # Margins (50pt)
-        MARGIN = 50
-        available_width = SLIDE_WIDTH_PT - (2 * MARGIN)
-        available_height = SLIDE_HEIGHT_PT - (2 * MARGIN)
-        
-        # Calculate Scale Factor to fit diagram into available space
-        scale_x = available_width / diagram_width
-        scale_y = available_height / diagram_height
-        scale = min(scale_x, scale_y)
-        
-        # Don't scale up if the diagram is small, just center it? 
-        # Actually scaling up is fine for visibility, but maybe cap it at 1.0 or 1.5 to check?
-        # User said "see all objects", so scaling down is the priority. Scaling up is a bonus.
-        # Let's simple use the calculated scale.
-        
-        # Center the diagram
-        # The scaled diagram dimensions
-        scaled_w = diagram_width * scale
-        scaled_h = diagram_height * scale
-        
-        # Offsets to center
-        offset_x = MARGIN + (available_width - scaled_w) / 2
-        offset_y = MARGIN + (available_height - scaled_h) / 2
-        
+        layout = SlideLayout(nodes, prs.slide_width.pt, prs.slide_height.pt)
         node_shapes = {}
         
         for node in nodes:
-            # Original coords
-            x = float(node.get("position", {}).get("x", 0) or 0)
-            y = float(node.get("position", {}).get("y", 0) or 0)
-            w = float(node.get("width", 150) or 150)
-            h = float(node.get("height", 80) or 80)
-            
-            label = node.get("name") or node.get("data", {}).get("label") or node.get("label", "Node")
-            node_type = node.get("type") or node.get("data", {}).get("type") or "Unknown"
-            
-            # Use layer to override type for color if specific generic type is used
-            # But the existing color logic relies on type strings.
-            
-            # Apply scaling
-            # New coordinate = (Original - Min) * Scale + Offset
-            left_pt = (x - min_x) * scale + offset_x
-            top_pt = (y - min_y) * scale + offset_y
-            width_pt = w * scale
-            height_pt = h * scale
+            left_pt, top_pt, width_pt, height_pt = layout.box(node)
+            label, node_type = node_label(node), node_type_of(node)
             
             fill_color, line_color = self._get_color_by_type(node_type)
             
@@ -155,10 +194,9 @@ class ExportService:
             text_frame = shape.text_frame
             text_frame.text = label
             # Adjust font size based on scale to avoid huge text on small blocks
-            # Base font 12?
             for paragraph in text_frame.paragraphs:
                 for run in paragraph.runs:
-                    run.font.size = Pt(max(8, 12 * scale)) # Minimum 8pt
+                    run.font.size = Pt(layout.font_size_pt)
                     
             node_shapes[node["id"]] = shape
             
@@ -172,11 +210,11 @@ class ExportService:
                 target_shape = node_shapes[target_id]
                 
                 connector = slide.shapes.add_connector(
-                    MSO_SHAPE.STRAIGHT_CONNECTOR_1, 0, 0, 0, 0
+                    MSO_CONNECTOR.STRAIGHT, 0, 0, 0, 0
                 )
                 
-                connector.begin_connect(source_shape, idx=2) # Bottom
-                connector.end_connect(target_shape, idx=0)   # Top
+                connector.begin_connect(source_shape, 2) # Bottom
+                connector.end_connect(target_shape, 0)   # Top
                 
                 connector.line.color.rgb = RGBColor(100, 100, 100)
                 connector.line.width = Pt(1)
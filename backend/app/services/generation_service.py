@@ -1,42 +1,387 @@
+import asyncio
 import json
 import logging
+import os
 import re
-from typing import Dict, Any
-from app.services.llm_service import LLMService
-from app.core.utils import extract_json_from_text
+import time
+from typing import Dict, Any, List, Optional
+from app.services.llm_service import LLMService, model_label
+from app.core.utils import extract_json_from_text, graph_content_hash
+from app.core.singleflight import SingleFlight
+from app.core.shared_cache import get_shared_cache
+from app.core.metrics import GENERATION_FLIGHTS, LLM_HEDGE_DELAY, LLM_HEDGES, timed
+from app.core.tracing import TRACER, current_span
+from app.core.rate_limit import Priority
+from app.core.resilience import HedgePolicy, LatencyTracker
 from app.core.graph import EnterpriseArchitectureGraph
 from app.core.factory import ElementFactory
 from app.core.relationships import Relation, RelationshipType
-from app.core.prompts import TOGAF_SYSTEM_PROMPTS
+from app.core.prompts import TOGAF_SYSTEM_PROMPTS, PLANNING_PROMPT, build_zone_prompt, build_extend_prompt
+from app.core.graph_summary import summarize_graph
+from app.core.name_index import NameIndex
+from app.core.schema import LAYER_KEYS, graph_json_schema, plan_json_schema
 
 logger = logging.getLogger(__name__)
 
+# Shared by every GenerationService instance (one is created per request)
+_generation_flights = SingleFlight()
+# Completion latencies (LLM call + parse) per model, for the hedge delay
+_latencies = LatencyTracker()
+
+
+async def _tracked(work) -> Dict[str, Any]:
+    with GENERATION_FLIGHTS.track_inprogress():
+        return await work()
+
+
+async def _cached_flight(key: str, work, priority: Priority) -> Dict[str, Any]:
+    """
+    Shared cache lookup, then single-flight; the leader stores the result.
+    Flights are per priority: a request never waits behind a lower-priority
+    leader's place in the upstream queue. The cached result serves any priority.
+    """
+    flight_key = f"{key}:{priority.name}"
+    ttl = float(os.getenv("GENERATION_CACHE_TTL", "0"))
+    if ttl <= 0:
+        return await _generation_flights.do(flight_key, lambda: _tracked(work))
+
+    cache = get_shared_cache().namespace("generation")
+    cached = await cache.aget_json(key)
+    span = current_span()
+    if span is not None:
+        span.set_attribute("cache.hit", cached is not None)
+    if cached is not None:
+        return cached
+
+    async def work_and_store() -> Dict[str, Any]:
+        result = await _tracked(work)
+        await cache.aset_json(key, result, ttl)
+        return result
+
+    return await _generation_flights.do(flight_key, work_and_store)
+
+
+class _GraphAssembler:
+    """
+    Builds an EnterpriseArchitectureGraph from one or more LLM outputs.
+
+    With `merge=True` (chunked generation) elements are deduplicated by name and
+    the first relationship between two elements wins; otherwise every element is
+    kept, as in single-shot generation.
+    """
+
+    def __init__(self, merge: bool = False):
+        self.graph = EnterpriseArchitectureGraph()
+        # Built once per generation; resolves near-miss relationship endpoints
+        self.names = NameIndex()
+        self.merge = merge
+        # What load() could not bring into the graph, reported back to the client
+        self.dropped: Dict[str, List[Any]] = {"node_ids": [], "edges": []}
+
+    def load(self, graph_dict: Dict[str, Any]) -> None:
+        """
+        Seed with an existing frontend graph dict, keeping its ids and relationships.
+        Elements of an unknown type and edges that are invalid or lose an endpoint
+        are left out and listed in `dropped`.
+        """
+        nodes = graph_dict.get("nodes", [])
+        for node, obj in zip(nodes, ElementFactory.create_elements(nodes)):
+            if not obj:
+                logger.warning(f"Unknown element type: {node.get('type')} for element {node.get('name')}")
+                self.dropped["node_ids"].append(node.get("id"))
+                continue
+            self.graph.add_element(obj)
+            self.names.add(obj.name, obj.id)
+        for edge in graph_dict.get("edges", []):
+            if self.graph.get_element(edge.get("source_id")) and self.graph.get_element(edge.get("target_id")):
+                try:
+                    self.graph.add_relation(Relation(**edge))
+                    continue
+                except ValueError:
+                    logger.warning(f"Invalid relationship {edge.get('type')} from {edge.get('source_id')} to {edge.get('target_id')}")
+            self.dropped["edges"].append({k: edge.get(k) for k in ("source_id", "target_id", "type")})
+
+    def add_element(self, el_type: str, name: str, desc: str) -> Optional[str]:
+        if self.merge and name in self.names:
+            return self.names.get(name)
+
+        # Use Factory to create element
+        obj = ElementFactory.create_element(el_type, name, desc)
+        if not obj:
+            logger.warning(f"Unknown element type: {el_type} for element {name}")
+            return None
+        self.graph.add_element(obj)
+        self.names.add(name, obj.id)
+        return obj.id
+
+    def add_layers(self, data: Dict[str, Any]) -> List[str]:
+        """Add every element of every layer; return their ids in order."""
+        ids = []
+        for layer_key in LAYER_KEYS:
+            for el in data.get(layer_key, []):
+                element_id = self.add_element(el.get("type", ""), el.get("name", "Unknown"), el.get("description", ""))
+                if element_id:
+                    ids.append(element_id)
+        return ids
+
+    def add_relationship(self, rel: Dict[str, Any]) -> None:
+        source_id = self.names.resolve(rel.get("source", ""))
+        target_id = self.names.resolve(rel.get("target", ""))
+        if source_id is None or target_id is None:
+            return
+
+        # Map string to Enum
+        try:
+            rel_enum = RelationshipType(rel.get("type", "Association"))
+        except ValueError:
+            rel_enum = RelationshipType.ASSOCIATION
+        self.relate(source_id, target_id, rel_enum, rel.get("description", ""))
+
+    def relate(self, source_id: str, target_id: str, rel_type: RelationshipType, description: str = "") -> None:
+        if self.merge and (source_id == target_id or self.graph.graph.has_edge(source_id, target_id)):
+            return
+        self.graph.add_relation(Relation(source_id=source_id, target_id=target_id, type=rel_type, description=description))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Frontend graph dict plus the name-resolution report under "resolution"."""
+        report = self.names.report
+        if report["fuzzy"] or report["ambiguous"] or report["unresolved"]:
+            logger.warning(
+                f"Relationship endpoints: {len(report['fuzzy'])} fuzzy-matched, "
+                f"{len(report['ambiguous'])} ambiguous, {len(report['unresolved'])} unresolved"
+            )
+        with timed("serialize"):
+            return {**self.graph.to_dict(), "resolution": report}
+
+
 class GenerationService:
     def __init__(self):
         self.llm_service = LLMService()
+        self.hedge_policy = HedgePolicy.from_env()
 
-    async def generate_architecture(self, prompt: str, schema_type: str = "application", model: str = "openai/gpt-3.5-turbo") -> Dict[str, Any]:
+    async def generate_architecture(
+        self,
+        prompt: str,
+        schema_type: str = "application",
+        model: str = "openai/gpt-3.5-turbo",
+        priority: Priority = Priority.INTERACTIVE,
+        mode: str = "single"
+    ) -> Dict[str, Any]:
         """
         Orchestrates the generation flow: Prompt -> LLM -> JSON -> Graph -> Frontend Dict
+
+        mode="chunked" plans zones first and generates them concurrently (see
+        _generate_chunked), for scenarios too large for a single answer.
+
+        Identical concurrent requests (same prompt, schema_type, model, mode and priority)
+        share a single upstream LLM call and all receive the same graph dict, which must not be mutated.
+        With GENERATION_CACHE_TTL set (off by default: a repeated Generate is expected to
+        give a new answer), results are also kept that many seconds in the shared cache,
+        so every worker process can answer a repeated request without calling the LLM.
         """
+        key = graph_content_hash(["generate", prompt, schema_type, model, mode])
+        if mode == "chunked":
+            work = lambda: self._generate_chunked(prompt, schema_type, model, priority)
+        else:
+            work = lambda: self._generate_architecture(prompt, schema_type, model, priority)
+        with TRACER.span("generate_architecture", model=model, mode=mode, schema_type=schema_type):
+            return await _cached_flight(key, work, priority)
+
+    async def _generate_architecture(self, prompt: str, schema_type: str, model: str, priority: Priority) -> Dict[str, Any]:
         logger.info(f"Generating architecture for prompt: {prompt[:50]}... with schema {schema_type} and model {model}")
         
         # Select prompt based on schema_type
         system_prompt = TOGAF_SYSTEM_PROMPTS.get(schema_type, TOGAF_SYSTEM_PROMPTS["default"])
 
-        # 1. Call LLM
-        response_json = await self.llm_service.generate_response(
-            prompt=prompt,
-            system_prompt=system_prompt,
-            model=model
+        # 1-2. Call LLM and parse content
+        data = await self._complete_json(prompt, system_prompt, model, priority, graph_json_schema())
+
+        with timed("graph_build"):
+            # 3. Build Graph
+            assembler = _GraphAssembler()
+            assembler.add_layers(data)
+
+            # 4. Process Relationships
+            for rel in data.get("relationships", []):
+                assembler.add_relationship(rel)
+
+        return assembler.to_dict()
+
+    async def _generate_chunked(self, prompt: str, schema_type: str, model: str, priority: Priority) -> Dict[str, Any]:
+        """
+        Map-reduce generation: a planning call returns the zone (Grouping) skeleton,
+        each zone is generated concurrently, and the partial models are merged with
+        name-based deduplication. Relationships are resolved only after every zone is
+        merged, so cross-zone references find their targets. Wall-clock time follows
+        the largest zone instead of the whole model.
+        """
+        planner_model = os.getenv("GENERATION_PLANNER_MODEL") or model
+        plan = await self._complete_json(prompt, PLANNING_PROMPT, planner_model, priority, plan_json_schema())
+        zones = _plan_zones(plan, int(os.getenv("GENERATION_MAX_ZONES", "8")))
+        if not zones:
+            logger.warning("Planning call returned no zones, falling back to single-shot generation")
+            return await self._generate_architecture(prompt, schema_type, model, priority)
+        logger.info(f"Chunked generation with {len(zones)} zones: {[z['name'] for z in zones]}")
+
+        system_prompt = TOGAF_SYSTEM_PROMPTS.get(schema_type, TOGAF_SYSTEM_PROMPTS["default"])
+        results = await asyncio.gather(
+            *(self._complete_json(build_zone_prompt(prompt, zone, zones), system_prompt, model, priority, graph_json_schema())
+              for zone in zones),
+            return_exceptions=True
+        )
+        failures = [r for r in results if isinstance(r, BaseException)]
+        if len(failures) == len(results):
+            raise failures[0]
+
+        with timed("graph_build"):
+            assembler = _GraphAssembler(merge=True)
+            zone_ids = {zone["name"]: assembler.add_element("Grouping", zone["name"], zone["description"]) for zone in zones}
+            placed = set(zone_ids.values())
+            relationships = []
+            for zone, data in zip(zones, results):
+                if isinstance(data, BaseException):
+                    logger.warning(f"Zone {zone['name']} failed and is left empty: {data}")
+                    continue
+                for element_id in assembler.add_layers(data):
+                    if element_id not in placed:
+                        # Nest in the zone that defined it first
+                        assembler.relate(zone_ids[zone["name"]], element_id, RelationshipType.COMPOSITION)
+                        placed.add(element_id)
+                relationships.extend(data.get("relationships", []))
+
+            for rel in relationships:
+                assembler.add_relationship(rel)
+
+        return assembler.to_dict()
+
+    async def extend_architecture(
+        self,
+        graph_dict: Dict[str, Any],
+        instruction: str,
+        schema_type: str = "application",
+        model: str = "openai/gpt-3.5-turbo",
+        priority: Priority = Priority.INTERACTIVE,
+        selected_ids: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Extend an existing graph from an instruction. The LLM only sees a compact
+        summary of the model (optionally restricted to the selected subgraph) and
+        answers with additions, which are merged into the graph: existing elements
+        keep their ids, returned elements with an existing name are reused.
+
+        Returns {"graph": merged graph dict, "added_node_ids": [...], "dropped": {"node_ids": [...],
+        "edges": [...]}}, `dropped` listing what of the input graph could not be loaded.
+        """
+        key = graph_content_hash(["extend", graph_dict, instruction, schema_type, model, sorted(selected_ids or [])])
+        with TRACER.span("extend_architecture", model=model, schema_type=schema_type):
+            return await _cached_flight(
+                key, lambda: self._extend_architecture(graph_dict, instruction, schema_type, model, priority, selected_ids),
+                priority
+            )
+
+    async def _extend_architecture(
+        self, graph_dict: Dict[str, Any], instruction: str, schema_type: str, model: str,
+        priority: Priority, selected_ids: Optional[List[str]]
+    ) -> Dict[str, Any]:
+        summary = summarize_graph(
+            graph_dict, selected_ids, max_relationships=int(os.getenv("GENERATION_SUMMARY_MAX_RELATIONSHIPS", "200"))
+        )
+        system_prompt = TOGAF_SYSTEM_PROMPTS.get(schema_type, TOGAF_SYSTEM_PROMPTS["default"])
+        data = await self._complete_json(
+            build_extend_prompt(instruction, summary), system_prompt, model, priority, graph_json_schema()
         )
+
+        with timed("graph_build"):
+            assembler = _GraphAssembler(merge=True)
+            assembler.load(graph_dict)
+            existing = set(assembler.graph.graph.nodes)
+            added = [element_id for element_id in assembler.add_layers(data) if element_id not in existing]
+            for rel in data.get("relationships", []):
+                assembler.add_relationship(rel)
+
+        return {
+            "graph": assembler.to_dict(),
+            "added_node_ids": list(dict.fromkeys(added)),
+            "dropped": assembler.dropped,
+        }
+
+    async def _complete_json(
+        self, prompt: str, system_prompt: str, model: str, priority: Priority, json_schema: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        One LLM call, parsed into the JSON object it contains. With LLM_HEDGE_MODELS
+        set, a call without a parseable answer after the hedge delay is also sent to
+        a backup model (see _hedged).
+        """
+        complete = lambda m: self._complete_json_once(prompt, system_prompt, m, priority, json_schema)
+        backup = self.hedge_policy.backup_for(model)
+        if backup is None:
+            return await complete(model)
+        return await self._hedged(complete, model, backup)
+
+    async def _hedged(self, complete, model: str, backup: str) -> Dict[str, Any]:
+        """
+        Run `complete(model)`; if it has not returned after the hedge delay (a
+        percentile of the model's recent latencies), or has already failed, also
+        run `complete(backup)`. The first call to return parsed JSON wins and the other one is cancelled,
+        which aborts its upstream HTTP request. Fails only if both calls fail.
+        """
+        delay = self.hedge_policy.delay(model, _latencies)
+        label = model_label(model)
+        LLM_HEDGE_DELAY.set(delay, model=label)
+        primary = asyncio.create_task(complete(model))
+        roles = {primary: "primary"}
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done and primary.exception() is None:
+                LLM_HEDGES.inc(model=label, outcome="unhedged")
+                return primary.result()
+
+            if done:
+                logger.info(f"{model} failed before the hedge delay, hedging with {backup}")
+            else:
+                logger.info(f"{model} has no answer after {delay:.1f}s, hedging with {backup}")
+            with TRACER.span("hedge", model=model, backup=backup, delay_s=round(delay, 3)) as span:
+                roles[asyncio.create_task(complete(backup))] = "backup"
+                pending = set(roles)
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        if task.exception() is None:
+                            LLM_HEDGES.inc(model=label, outcome=roles[task])
+                            span.set_attribute("hedge.winner", roles[task])
+                            return task.result()
+                LLM_HEDGES.inc(model=label, outcome="failed")
+                return primary.result()  # Both failed: raise the primary's error
+        finally:
+            # Latencies are recorded by completed calls only (_complete_json_once): a cancelled
+            # call's elapsed time is not its latency, just a lower bound on it
+            losers = [task for task in roles if not task.done()]
+            for task in losers:
+                task.cancel()
+            if losers:
+                await asyncio.gather(*losers, return_exceptions=True)
+
+    async def _complete_json_once(
+        self, prompt: str, system_prompt: str, model: str, priority: Priority, json_schema: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        started = time.perf_counter()
+        with timed("llm_call", model=model):
+            response_json = await self.llm_service.generate_response(
+                prompt=prompt,
+                system_prompt=system_prompt,
+                model=model,
+                priority=priority,
+                json_schema=json_schema
+            )
         
-        # 2. Parse Content
         # OpenRouter usually returns standard OpenAI format: choices[0].message.content
         if "choices" in response_json and len(response_json["choices"]) > 0:
             message = response_json["choices"][0]["message"]
             content_str = message.get("content", "") or ""
             finish_reason = response_json["choices"][0].get("finish_reason")
+            if finish_reason == "length":
+                logger.warning("LLM output was truncated (finish_reason=length); consider mode=chunked")
             
             # Fallback: Check 'reasoning' field if content is empty (common with some DeepSeek models)
             if not content_str:
@@ -53,59 +398,22 @@ class GenerationService:
             content_str = str(response_json)
 
         try:
-             data = extract_json_from_text(content_str)
+            with timed("parse"):
+                data = extract_json_from_text(content_str)
         except ValueError as e:
             logger.error(f"Failed to parse JSON from LLM response. Content snippet: {content_str[:200]}... Full response keys: {response_json.keys() if isinstance(response_json, dict) else 'Not a dict'}")
             raise ValueError(str(e))
+        _latencies.observe(model, time.perf_counter() - started)
+        return data
 
-        # 3. Build Graph
-        graph = EnterpriseArchitectureGraph()
-        name_to_id = {}
-
-        # Helper to process layers
-        def process_elements(elements, layer_key):
-            for el in elements:
-                el_type = el.get("type", "")
-                name = el.get("name", "Unknown")
-                desc = el.get("description", "")
-                
-                # Use Factory to create element
-                obj = ElementFactory.create_element(el_type, name, desc)
-                
-                if obj:
-                    graph.add_element(obj)
-                    name_to_id[name.lower()] = obj.id
-                else:
-                    logger.warning(f"Unknown element type: {el_type} for element {name}")
-
-        # Process all layers in data
-        process_elements(data.get("strategy_layer", []), "strategy")
-        process_elements(data.get("business_layer", []), "business")
-        process_elements(data.get("application_layer", []), "application")
-        process_elements(data.get("technology_layer", []), "technology")
-        process_elements(data.get("physical_layer", []), "physical")
-        process_elements(data.get("motivation_layer", []), "motivation")
-        process_elements(data.get("implementation_layer", []), "implementation")
-
-        # 4. Process Relationships
-        for rel in data.get("relationships", []):
-            src_name = rel.get("source", "").lower()
-            tgt_name = rel.get("target", "").lower()
-            rel_type_str = rel.get("type", "Association")
-            
-            if src_name in name_to_id and tgt_name in name_to_id:
-                # Map string to Enum
-                try:
-                    rel_enum = RelationshipType(rel_type_str)
-                except ValueError:
-                    rel_enum = RelationshipType.ASSOCIATION
-                
-                relation = Relation(
-                    source_id=name_to_id[src_name],
-                    target_id=name_to_id[tgt_name],
-                    type=rel_enum,
-                    description=rel.get("description", "")
-                )
-                graph.add_relation(relation)
-
-        return graph.to_dict()
+
+def _plan_zones(plan: Dict[str, Any], max_zones: int) -> List[Dict[str, str]]:
+    """Zones from the planning output: named, unique (case-insensitive), at most `max_zones`."""
+    zones, seen = [], set()
+    for zone in plan.get("zones", []):
+        name = str(zone.get("name", "")).strip() if isinstance(zone, dict) else ""
+        if not name or name.lower() in seen:
+            continue
+        seen.add(name.lower())
+        zones.append({"name": name, "description": str(zone.get("description", ""))})
+    return zones[:max_zones]
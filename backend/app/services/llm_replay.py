@@ -0,0 +1,277 @@
+import asyncio
+import codecs
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import httpx
+from app.core.utils import graph_content_hash
+
+logger = logging.getLogger(__name__)
+
+RECORD_MODES = ("off", "record", "replay", "replay_or_record")
+
+# Response headers that no longer apply once the body is stored decoded
+_DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+
+class RecordingNotFound(LookupError):
+    """Replay mode and no recording matches the request."""
+
+
+def request_fingerprint(request: httpx.Request) -> str:
+    """
+    Method, path and canonical JSON body. Host, query-less base URL and headers
+    (API key) are left out so recordings are portable between environments.
+    """
+    try:
+        body: Any = json.loads(request.content) if request.content else None
+    except ValueError:
+        body = request.content.decode("utf-8", "replace")
+    return graph_content_hash([request.method, request.url.path, body])
+
+
+class RecordingStore:
+    """
+    Recorded LLM exchanges in a directory: one JSON file per fingerprint and an
+    append-only `index.jsonl` (fingerprint, model, status, timing) loaded into
+    memory, so a lookup never scans the directory. A re-recorded fingerprint
+    replaces the previous one.
+
+    Responses are stored as chunks with their offset (seconds since the request
+    was sent), which is enough to replay streamed answers with their pacing.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._index: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    @property
+    def index_path(self) -> str:
+        return os.path.join(self.directory, "index.jsonl")
+
+    def _load_index(self) -> None:
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._index[entry["fingerprint"]] = entry
+        except FileNotFoundError:
+            pass
+
+    def __contains__(self, fingerprint: str) -> bool:
+        return fingerprint in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def entries(self) -> List[Dict[str, Any]]:
+        return list(self._index.values())
+
+    def get(self, fingerprint: str) -> Optional[Dict[str, Any]]:
+        entry = self._index.get(fingerprint)
+        if entry is None:
+            return None
+        with open(os.path.join(self.directory, entry["file"]), encoding="utf-8") as f:
+            return json.load(f)
+
+    def save(self, fingerprint: str, recording: Dict[str, Any]) -> None:
+        file_name = f"{fingerprint}.json"
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(recording, f, ensure_ascii=False)
+        os.replace(tmp_path, os.path.join(self.directory, file_name))
+
+        chunks = recording["chunks"]
+        request = recording.get("request") if isinstance(recording.get("request"), dict) else {}
+        entry = {
+            "fingerprint": fingerprint,
+            "file": file_name,
+            "method": recording["method"],
+            "path": recording["path"],
+            "model": request.get("model"),
+            "stream": bool(request.get("stream")),
+            "status": recording["status"],
+            "chunks": len(chunks),
+            "first_chunk_s": chunks[0][0] if chunks else None,
+            "elapsed_s": recording["elapsed_s"],
+            "recorded_at": recording["recorded_at"],
+        }
+        with self._lock:
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+            self._index[fingerprint] = entry
+
+
+def _network_transport() -> httpx.AsyncHTTPTransport:
+    from app.services.llm_service import _ssl_context  # Shared CA bundle, loaded once
+    return httpx.AsyncHTTPTransport(verify=_ssl_context())
+
+
+class _RecordingStream(httpx.AsyncByteStream):
+    """Passes the live body through while noting each chunk and its timing; saved once fully read."""
+
+    def __init__(self, response: httpx.Response, started: float, on_complete, transport=None):
+        self._response = response
+        self._started = started
+        self._on_complete = on_complete
+        self._transport = transport
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        decoder = codecs.getincrementaldecoder("utf-8")("replace")
+        chunks: List[Tuple[float, str]] = []
+        async for data in self._response.aiter_bytes():
+            text = decoder.decode(data)
+            if text:
+                chunks.append((round(time.perf_counter() - self._started, 6), text))
+            yield data
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            chunks.append((round(time.perf_counter() - self._started, 6), tail))
+        self._on_complete(chunks, round(time.perf_counter() - self._started, 6))
+
+    async def aclose(self) -> None:
+        await self._response.aclose()
+        if self._transport is not None:
+            await self._transport.aclose()
+
+
+class _ReplayStream(httpx.AsyncByteStream):
+    def __init__(self, chunks: List[List[Any]], time_scale: float):
+        self._chunks = chunks
+        self._time_scale = time_scale
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        started = time.perf_counter()
+        for offset, text in self._chunks:
+            if self._time_scale > 0:
+                delay = offset * self._time_scale - (time.perf_counter() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            yield text.encode("utf-8")
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """
+    Forwards to the network (or `transport`) and records every completed exchange.
+
+    The response is streamed to the caller as it arrives (streaming clients keep
+    their time to first token); the recording is written once the body has been
+    read entirely, so exchanges abandoned midway are not stored. Without an
+    explicit transport each request gets its own connection, closed with the
+    response, so concurrent clients sharing this transport never close each
+    other's connections.
+    """
+
+    def __init__(self, store: RecordingStore, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.store = store
+        self.transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        fingerprint = request_fingerprint(request)
+        transport = self.transport or _network_transport()
+        started = time.perf_counter()
+        try:
+            response = await transport.handle_async_request(request)
+        except BaseException:
+            if self.transport is None:
+                await transport.aclose()
+            raise
+        live = httpx.Response(response.status_code, headers=response.headers, stream=response.stream, request=request)
+
+        def on_complete(chunks: List[Tuple[float, str]], elapsed: float) -> None:
+            try:
+                request_body = json.loads(request.content) if request.content else None
+            except ValueError:
+                request_body = None
+            self.store.save(fingerprint, {
+                "method": request.method,
+                "path": request.url.path,
+                "request": request_body,
+                "status": response.status_code,
+                "headers": {k: v for k, v in response.headers.items() if k.lower() not in _DROPPED_HEADERS},
+                "chunks": chunks,
+                "elapsed_s": elapsed,
+                "recorded_at": time.time(),
+            })
+
+        owned = transport if self.transport is None else None
+        headers = [(k, v) for k, v in response.headers.items() if k.lower() not in _DROPPED_HEADERS]
+        return httpx.Response(
+            response.status_code, headers=headers, request=request,
+            stream=_RecordingStream(live, started, on_complete, owned),
+        )
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """
+    Answers from a RecordingStore, without network.
+
+    Chunks are released at their recorded offsets times `time_scale` (1.0 = real
+    pacing, 0 = as fast as possible, 0.1 = ten times faster). Unknown requests
+    raise RecordingNotFound, or go to `fallback` (e.g. a RecordingTransport) when
+    one is given.
+    """
+
+    def __init__(self, store: RecordingStore, time_scale: float = 1.0, fallback: Optional[httpx.AsyncBaseTransport] = None):
+        self.store = store
+        self.time_scale = time_scale
+        self.fallback = fallback
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        fingerprint = request_fingerprint(request)
+        recording = self.store.get(fingerprint)
+        if recording is None:
+            if self.fallback is not None:
+                return await self.fallback.handle_async_request(request)
+            raise RecordingNotFound(f"No recording for {request.method} {request.url.path} (fingerprint {fingerprint})")
+        return httpx.Response(
+            recording["status"],
+            headers=list(recording["headers"].items()),
+            stream=_ReplayStream(recording["chunks"], self.time_scale),
+            request=request,
+        )
+
+
+
+_stores: Dict[str, RecordingStore] = {}
+
+
+def get_store(directory: str) -> RecordingStore:
+    """One store (and in-memory index) per directory and process."""
+    directory = os.path.abspath(directory)
+    store = _stores.get(directory)
+    if store is None:
+        store = _stores[directory] = RecordingStore(directory)
+    return store
+
+
+def transport_from_env() -> Optional[httpx.AsyncBaseTransport]:
+    """
+    LLM_RECORD_MODE:
+    - off (default)      network as usual
+    - record             network, every exchange saved to LLM_RECORD_DIR
+    - replay             answers from LLM_RECORD_DIR only (unknown request = error)
+    - replay_or_record   recorded answers, live calls (recorded) for the others
+    LLM_REPLAY_TIME_SCALE scales the recorded pacing (default 1.0, 0 = no delays).
+    """
+    mode = os.getenv("LLM_RECORD_MODE", "off").lower()
+    if mode == "off":
+        return None
+    if mode not in RECORD_MODES:
+        logger.warning(f"Unknown LLM_RECORD_MODE {mode!r}, recording disabled")
+        return None
+
+    store = get_store(os.getenv("LLM_RECORD_DIR", "llm_recordings"))
+    if mode == "record":
+        return RecordingTransport(store)
+    time_scale = float(os.getenv("LLM_REPLAY_TIME_SCALE", "1.0"))
+    fallback = RecordingTransport(store) if mode == "replay_or_record" else None
+    return ReplayTransport(store, time_scale=time_scale, fallback=fallback)
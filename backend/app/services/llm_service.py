@@ -1,47 +1,326 @@
 import os
+import asyncio
+import functools
+import hashlib
+import logging
 import httpx
 import json
-from typing import Dict, Any, AsyncGenerator
+import ssl
+import time
+from typing import Dict, Any, AsyncGenerator, List, Optional
+from app.core.resilience import (
+    CircuitBreakerRegistry, Deadline, LatencyTracker, RetryPolicy, parse_retry_after
+)
+from app.core.rate_limit import Priority, RateLimitRejected, UpstreamScheduler
+from app.core.tokens import count_message_tokens
+from app.services.model_capabilities import ModelCapabilityRegistry
+from app.services.llm_replay import transport_from_env
+from app.core.tracing import current_span
+from app.core.metrics import (
+    REGISTRY, CIRCUIT_OPEN, UPSTREAM_CANCELLED, UPSTREAM_IN_FLIGHT, UPSTREAM_QUEUE_DEPTH, UPSTREAM_REQUESTS,
+    UPSTREAM_SAVED_SECONDS, UPSTREAM_TOKENS, timed
+)
+
+logger = logging.getLogger(__name__)
+
+
+class LLMServiceError(Exception):
+    """Upstream failure that the API layer maps to a specific HTTP status."""
+    status_code = 502
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class UpstreamRateLimitedError(LLMServiceError):
+    status_code = 429
+
+
+class UpstreamUnavailableError(LLMServiceError):
+    status_code = 502
+
+
+class CircuitOpenError(LLMServiceError):
+    status_code = 503
+
+
+class DeadlineExceededError(LLMServiceError):
+    status_code = 504
+
+
+class UpstreamBusyError(LLMServiceError):
+    """Rejected locally by the upstream scheduler (budget exhausted or queue wait too long)."""
+    status_code = 429
+
+
+class UpstreamQueueFullError(UpstreamBusyError):
+    status_code = 503
+
+
+# Shared by every LLMService instance so model health and rate budgets survive across requests
+_breakers = CircuitBreakerRegistry.from_env()
+_scheduler = UpstreamScheduler.from_env()
+# Successful upstream HTTP call durations per model, to estimate what an aborted call would have cost
+_upstream_latencies = LatencyTracker()
+
+
+def _catalogue_entry(model: str) -> Optional[Dict[str, Any]]:
+    from app.services.model_catalogue import get_model_catalogue
+    return get_model_catalogue().peek_model(model)
+
+
+def _loaded_catalogue_entry(model: str) -> Optional[Dict[str, Any]]:
+    from app.services.model_catalogue import loaded_model
+    return loaded_model(model)
+
+
+_capabilities = ModelCapabilityRegistry(lookup=_catalogue_entry)
+
+
+def model_label(model: str) -> str:
+    """
+    Metric label for a model id. Ids come from request bodies: only those in the
+    model catalogue get their own series, anything else is counted as "other".
+    Only the catalogue already in memory is consulted, so labelling never fetches.
+    """
+    return model if _loaded_catalogue_entry(model) is not None else "other"
+
+
+def _collect_upstream_metrics() -> None:
+    for priority, depth in _scheduler.queue_depth().items():
+        UPSTREAM_QUEUE_DEPTH.set(depth, priority=priority)
+    circuits: Dict[str, int] = {}
+    for model, state in _breakers.states().items():
+        label = model_label(model)
+        # "other" is open when any of the models it stands for is
+        circuits[label] = max(circuits.get(label, 0), 0 if state == "closed" else 1)
+    for label, is_open in circuits.items():
+        CIRCUIT_OPEN.set(is_open, model=label)
+
+
+REGISTRY.add_collector(_collect_upstream_metrics)
+
+
+def _fallback_models_from_env() -> List[str]:
+    return [m.strip() for m in os.getenv("LLM_FALLBACK_MODELS", "").split(",") if m.strip()]
+
+
+def upstream_status() -> Dict[str, Any]:
+    """Queue depth, scheduler counters and circuit states for this worker."""
+    return {
+        "queue_depth": _scheduler.queue_depth(),
+        "scheduler": dict(_scheduler.stats),
+        "circuits": _breakers.states(),
+    }
+
+
+def _estimate_request_tokens(data: Dict[str, Any]) -> int:
+    """Budget reservation: input tokens plus the expected output."""
+    input_tokens = sum(count_message_tokens(m.get("content")) for m in data.get("messages", []))
+    return input_tokens + int(os.getenv("LLM_EXPECTED_OUTPUT_TOKENS", "2000"))
+
+
+# Providers that only cache prompts at explicit cache_control breakpoints (via OpenRouter).
+# OpenAI, DeepSeek, Grok... cache identical prefixes automatically and need no marker.
+PROMPT_CACHE_MARKER_PREFIXES = ("anthropic/", "google/gemini")
+
+
+def build_messages(system_prompt: str, prompt: str, model: str) -> List[Dict[str, Any]]:
+    """
+    Chat messages for one call. The system prompt is the stable prefix: on providers
+    that need it, it is marked as a prompt-cache breakpoint so repeated calls only
+    pay full price for the user prompt.
+    """
+    system_content: Any = system_prompt
+    cache_enabled = os.getenv("LLM_PROMPT_CACHE", "true").lower() != "false"
+    if cache_enabled and model.startswith(PROMPT_CACHE_MARKER_PREFIXES):
+        system_content = [{"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}]
+    return [
+        {"role": "system", "content": system_content},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def _count_tokens(model: str, usage: Dict[str, Any]) -> None:
+    for kind in ("prompt_tokens", "completion_tokens"):
+        if usage.get(kind):
+            UPSTREAM_TOKENS.inc(usage[kind], model=model_label(model), kind=kind.split("_")[0])
+
+
+def _record_cancelled(model: str, elapsed: float) -> None:
+    UPSTREAM_CANCELLED.inc(model=model_label(model))
+    median = _upstream_latencies.percentile(model, 50)
+    if median is not None:
+        UPSTREAM_SAVED_SECONDS.inc(max(0.0, median - elapsed), model=model_label(model))
+
+
+@functools.lru_cache(maxsize=1)
+def _ssl_context() -> ssl.SSLContext:
+    # Loading the CA bundle takes tens of milliseconds of blocking work; do it once per process
+    return httpx.create_ssl_context()
+
 
 class LLMService:
-    def __init__(self):
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None):
         self.api_key = os.getenv("OPENROUTER_API_KEY")
-        self.base_url = "https://openrouter.ai/api/v1"
+        self.base_url = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
         if not self.api_key:
             raise ValueError("OPENROUTER_API_KEY environment variable is not set")
+        # Injected by tests; otherwise LLM_RECORD_MODE may record or replay traffic (None = network)
+        self.transport = transport if transport is not None else transport_from_env()
+        self.retry_policy = RetryPolicy.from_env()
+        self.breakers = _breakers
+        self.scheduler = _scheduler
+        self.capabilities = _capabilities
+        # Budgets are tracked per key without keeping the key itself around
+        self.key_id = hashlib.sha256(self.api_key.encode()).hexdigest()[:12]
+
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "HTTP-Referer": "https://drawtogaf.app",
+            "X-Title": "DrawTogaf"
+        }
 
     async def generate_response(
         self, 
         prompt: str, 
         system_prompt: str,
-        model: str = "tngtech/deepseek-r1t2-chimera:free"
+        model: str = "tngtech/deepseek-r1t2-chimera:free",
+        deadline: Optional[Deadline] = None,
+        fallback_models: Optional[List[str]] = None,
+        priority: Priority = Priority.INTERACTIVE,
+        json_schema: Optional[Dict[str, Any]] = None,
     ) -> Dict[str, Any]:
         """
         Generate a complete response from the LLM.
+
+        Transient failures (429, 5xx, network errors) are retried with jittered
+        exponential backoff honoring Retry-After, within a single deadline budget.
+        A model whose circuit breaker is open is skipped, and the fallback models
+        (LLM_FALLBACK_MODELS by default) are tried in order.
+        Every attempt first waits for rate budget in the shared UpstreamScheduler,
+        queued by `priority`.
+        With `json_schema`, models that support it are asked for structured output
+        (strict schema or plain JSON mode); a model that rejects response_format is
+        retried once in free-text mode and remembered as unsupported.
         """
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "HTTP-Referer": "https://drawtogaf.app",
-            "X-Title": "DrawTogaf"
-        }
-        
-        data = {
-            "model": model,
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": prompt}
-            ],
-            # "response_format": {"type": "json_object"} # Removed to avoid 400 on unsupported models
-        }
+        deadline = deadline or Deadline(self.retry_policy.deadline)
+        if fallback_models is None:
+            fallback_models = _fallback_models_from_env()
+        candidates = [model] + [m for m in fallback_models if m != model]
 
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(
-                f"{self.base_url}/chat/completions",
-                headers=headers,
-                json=data
+        last_error: Optional[LLMServiceError] = None
+        for candidate in candidates:
+            breaker = self.breakers.get(candidate)
+            if not breaker.allow():
+                last_error = CircuitOpenError(
+                    f"Model {candidate} is temporarily disabled after repeated failures",
+                    retry_after=breaker.retry_after()
+                )
+                continue
+
+            data = {
+                "model": candidate,
+                "messages": build_messages(system_prompt, prompt, candidate),
+            }
+            response_format = self.capabilities.response_format(candidate, json_schema) if json_schema else None
+            if response_format:
+                data["response_format"] = response_format
+                # Route only to providers of this model that honour response_format
+                data["provider"] = {"require_parameters": True}
+            try:
+                result = await self._post_structured(data, deadline, priority)
+            except (UpstreamRateLimitedError, UpstreamUnavailableError) as e:
+                breaker.record_failure()
+                logger.warning(f"Model {candidate} failed: {e}")
+                last_error = e
+                continue
+            except BaseException:
+                # Deadline, cancellation or a non-retryable error: no verdict on model health
+                breaker.release()
+                raise
+            breaker.record_success()
+            return result
+
+        raise last_error
+
+    async def _post_structured(self, data: Dict[str, Any], deadline: Deadline, priority: Priority) -> Dict[str, Any]:
+        """_post_with_retries, dropping response_format if the upstream refuses it with a 400."""
+        try:
+            return await self._post_with_retries(data, deadline, priority)
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code != 400 or "response_format" not in data:
+                raise
+            self.capabilities.mark_unsupported(data["model"])
+            data = {k: v for k, v in data.items() if k not in ("response_format", "provider")}
+            return await self._post_with_retries(data, deadline, priority)
+
+    async def _acquire_budget(self, data: Dict[str, Any], deadline: Deadline, priority: Priority):
+        try:
+            return await self.scheduler.acquire(
+                self.key_id, data["model"], _estimate_request_tokens(data),
+                priority=priority, timeout=deadline.remaining()
             )
-            response.raise_for_status()
-            return response.json()
+        except RateLimitRejected as e:
+            error_cls = UpstreamQueueFullError if e.reason == "queue_full" else UpstreamBusyError
+            raise error_cls(str(e), retry_after=e.retry_after)
+
+    async def _post_with_retries(self, data: Dict[str, Any], deadline: Deadline, priority: Priority = Priority.INTERACTIVE) -> Dict[str, Any]:
+        policy = self.retry_policy
+        attempt = 0
+        async with httpx.AsyncClient(transport=self.transport, verify=_ssl_context()) as client:
+            while True:
+                if deadline.expired():
+                    raise DeadlineExceededError("LLM request deadline exceeded")
+                grant = await self._acquire_budget(data, deadline, priority)
+                retry_after = None
+                try:
+                    started = time.perf_counter()
+                    try:
+                        with UPSTREAM_IN_FLIGHT.track_inprogress(), timed("upstream_http", model=data["model"], attempt=attempt):
+                            response = await client.post(
+                                f"{self.base_url}/chat/completions",
+                                headers=self._headers(),
+                                json=data,
+                                timeout=deadline.timeout(policy.attempt_timeout)
+                            )
+                            current_span().set_attribute("http.status_code", response.status_code)
+                    except httpx.TransportError:
+                        UPSTREAM_REQUESTS.inc(model=model_label(data["model"]), status="error")
+                        raise
+                    except asyncio.CancelledError:
+                        # Client gone or hedge lost: leaving the client block closes the connection
+                        _record_cancelled(data["model"], time.perf_counter() - started)
+                        raise
+                    UPSTREAM_REQUESTS.inc(model=model_label(data["model"]), status=str(response.status_code))
+                    if response.status_code not in policy.RETRYABLE_STATUS:
+                        response.raise_for_status()
+                        _upstream_latencies.observe(data["model"], time.perf_counter() - started)
+                        result = response.json()
+                        usage = result.get("usage") or {}
+                        _count_tokens(data["model"], usage)
+                        grant.settle(usage.get("total_tokens"))
+                        return result
+                    retry_after = parse_retry_after(response.headers.get("retry-after"))
+                    error_cls = UpstreamRateLimitedError if response.status_code == 429 else UpstreamUnavailableError
+                    error = error_cls(f"Upstream returned {response.status_code} for {data['model']}", retry_after)
+                except httpx.TimeoutException:
+                    if deadline.expired():
+                        raise DeadlineExceededError("LLM request deadline exceeded")
+                    error = UpstreamUnavailableError(f"Upstream timed out for {data['model']}")
+                except httpx.TransportError as e:
+                    error = UpstreamUnavailableError(f"Upstream connection failed for {data['model']}: {e}")
+
+                if attempt >= policy.max_retries:
+                    raise error
+                delay = max(retry_after or 0.0, policy.backoff(attempt))
+                if delay >= deadline.remaining():
+                    # Waiting would blow the budget: give the fallback models a chance instead
+                    raise error
+                attempt += 1
+                await asyncio.sleep(delay)
 
     async def stream_response(
         self,
@@ -52,26 +331,17 @@ class LLMService:
         """
         Stream the response from the LLM.
         """
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "HTTP-Referer": "https://drawtogaf.app",
-            "X-Title": "DrawTogaf"
-        }
-        
         data = {
             "model": model,
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": prompt}
-            ],
+            "messages": build_messages(system_prompt, prompt, model),
             "stream": True
         }
 
-        async with httpx.AsyncClient(timeout=60.0) as client:
+        async with httpx.AsyncClient(timeout=60.0, transport=self.transport, verify=_ssl_context()) as client:
             async with client.stream(
                 "POST", 
                 f"{self.base_url}/chat/completions", 
-                headers=headers, 
+                headers=self._headers(), 
                 json=data
             ) as response:
                 response.raise_for_status()
@@ -84,16 +354,10 @@ class LLMService:
         """
         Fetch available models from OpenRouter.
         """
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "HTTP-Referer": "https://drawtogaf.app",
-            "X-Title": "DrawTogaf"
-        }
-        
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with httpx.AsyncClient(timeout=10.0, transport=self.transport, verify=_ssl_context()) as client:
             response = await client.get(
                 f"{self.base_url}/models",
-                headers=headers
+                headers=self._headers()
             )
             response.raise_for_status()
             return response.json()
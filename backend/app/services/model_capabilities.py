@@ -0,0 +1,71 @@
+import logging
+import os
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+JSON_SCHEMA = "json_schema"
+JSON_OBJECT = "json_object"
+TEXT = "text"
+
+# Known good defaults, used until the OpenRouter catalogue has been loaded
+KNOWN_JSON_SCHEMA_PREFIXES = (
+    "openai/gpt-4o", "openai/gpt-4.1", "openai/gpt-5", "openai/o3", "openai/o4",
+    "google/gemini-2", "google/gemini-1.5",
+)
+KNOWN_JSON_OBJECT_PREFIXES = ("openai/gpt-3.5-turbo", "deepseek/deepseek-chat")
+
+
+class ModelCapabilityRegistry:
+    """
+    Decides which structured-output mode a model gets:
+    "json_schema" (constrained decoding), "json_object" (valid JSON only) or "text".
+
+    Sources, in order: models that already rejected response_format at runtime,
+    the OpenRouter catalogue's `supported_parameters`, then a static prefix list.
+    LLM_STRUCTURED_OUTPUT=off disables structured output entirely.
+    """
+
+    # Model ids come from clients: the oldest rejections are forgotten past this many
+    MAX_REJECTED = 256
+
+    def __init__(self, lookup: Optional[Callable[[str], Optional[Dict[str, Any]]]] = None):
+        self._lookup = lookup
+        self._rejected: "OrderedDict[str, None]" = OrderedDict()
+
+    def output_mode(self, model: str) -> str:
+        if os.getenv("LLM_STRUCTURED_OUTPUT", "auto").lower() == "off" or model in self._rejected:
+            return TEXT
+
+        entry = self._lookup(model) if self._lookup else None
+        if entry is not None:
+            params = set(entry.get("supported_parameters") or [])
+            if "structured_outputs" in params:
+                return JSON_SCHEMA
+            if "response_format" in params:
+                return JSON_OBJECT
+            return TEXT
+
+        if model.startswith(KNOWN_JSON_SCHEMA_PREFIXES):
+            return JSON_SCHEMA
+        if model.startswith(KNOWN_JSON_OBJECT_PREFIXES):
+            return JSON_OBJECT
+        return TEXT
+
+    def mark_unsupported(self, model: str) -> None:
+        """Remember that a model answered 400 to response_format; use free text from now on."""
+        if model not in self._rejected:
+            logger.warning(f"Model {model} rejected response_format, falling back to free-text output")
+            if len(self._rejected) >= self.MAX_REJECTED:
+                self._rejected.popitem(last=False)
+            self._rejected[model] = None
+
+    def response_format(self, model: str, schema: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """The `response_format` request field for this model, or None for free text."""
+        mode = self.output_mode(model)
+        if mode == JSON_SCHEMA:
+            return {"type": "json_schema", "json_schema": {"name": "togaf_graph", "strict": True, "schema": schema}}
+        if mode == JSON_OBJECT:
+            return {"type": "json_object"}
+        return None
@@ -0,0 +1,194 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from app.core.utils import graph_content_hash
+
+logger = logging.getLogger(__name__)
+
+# Fields the model picker actually renders (see frontend SettingsModal)
+DEFAULT_FIELDS = ("id", "name")
+# Projections kept per snapshot; further ones are served uncached
+MAX_VIEWS = 32
+
+
+class CatalogueView:
+    """A serialized, ETagged projection of the catalogue."""
+
+    def __init__(self, models: List[Dict[str, Any]]):
+        self.count = len(models)
+        self.body = json.dumps({"data": models}, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self.etag = f'"{graph_content_hash(models)}"'
+
+
+class _Snapshot:
+    def __init__(self, models: List[Dict[str, Any]], fetched_at: float):
+        self.models = models
+        self.fetched_at = fetched_at
+        self.by_id = {m.get("id"): m for m in models}
+        # Every key found on a model, in first-seen order
+        self.columns = tuple(dict.fromkeys(f for m in models for f in m))
+        self.views: Dict[Tuple, CatalogueView] = {}
+
+    def normalize(self, fields: Optional[Tuple[str, ...]]) -> Optional[Tuple[str, ...]]:
+        """Known columns among `fields`, in catalogue order: "name,id,bogus" and "id,name" share a view."""
+        if not fields:
+            return None
+        wanted = set(fields)
+        return tuple(f for f in self.columns if f in wanted)
+
+
+def _is_free(model: Dict[str, Any]) -> bool:
+    if str(model.get("id", "")).endswith(":free"):
+        return True
+    pricing = model.get("pricing") or {}
+    return str(pricing.get("prompt")) == "0" and str(pricing.get("completion")) == "0"
+
+
+class ModelCatalogue:
+    """
+    In-process cache of the OpenRouter model list (stale-while-revalidate).
+
+    - younger than `ttl`: served from memory
+    - between `ttl` and `ttl + stale_ttl`: served from memory, refreshed in the background
+    - older, or never loaded: fetched before answering
+    Upstream failures keep serving the last good snapshot when there is one.
+    Projections are serialized once per snapshot, so warm reads are a dict lookup.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[], Awaitable[Dict[str, Any]]],
+        ttl: float = 300.0,
+        stale_ttl: float = 3600.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._fetch = fetch
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._clock = clock
+        self._snapshot: Optional[_Snapshot] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.stats: Dict[str, int] = {"hits": 0, "stale_hits": 0, "misses": 0, "refresh_errors": 0}
+
+    async def view(self, fields: Optional[Tuple[str, ...]] = None, free_only: bool = False) -> CatalogueView:
+        """
+        Return the catalogue projected on `fields` (all fields when None),
+        optionally keeping only free models. Unknown fields are ignored and the
+        known ones come out in catalogue order.
+        """
+        snapshot = await self._current()
+        fields = snapshot.normalize(fields)
+        key = (fields, free_only)
+        view = snapshot.views.get(key)
+        if view is None:
+            models = [m for m in snapshot.models if _is_free(m)] if free_only else snapshot.models
+            if fields is not None:
+                models = [{f: m[f] for f in fields if f in m} for m in models]
+            view = CatalogueView(models)
+            if len(snapshot.views) < MAX_VIEWS:
+                snapshot.views[key] = view
+        return view
+
+    async def get_model(self, model_id: str) -> Optional[Dict[str, Any]]:
+        """Full catalogue entry for one model, or None if unknown."""
+        snapshot = await self._current()
+        return snapshot.by_id.get(model_id)
+
+    def peek_model(self, model_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Catalogue entry from whatever snapshot is in memory, without waiting on the
+        network. A cold or expired catalogue is refreshed in the background.
+        """
+        snapshot = self._snapshot
+        if snapshot is None or self._clock() - snapshot.fetched_at >= self.ttl:
+            try:
+                self._start_refresh()
+            except RuntimeError:
+                pass  # No running event loop: nothing to schedule on
+        return snapshot.by_id.get(model_id) if snapshot else None
+
+    def loaded_model(self, model_id: str) -> Optional[Dict[str, Any]]:
+        """Catalogue entry from the snapshot in memory, however old; never schedules a refresh."""
+        snapshot = self._snapshot
+        return snapshot.by_id.get(model_id) if snapshot else None
+
+    async def _current(self) -> _Snapshot:
+        snapshot = self._snapshot
+        if snapshot is not None:
+            age = self._clock() - snapshot.fetched_at
+            if age < self.ttl:
+                self.stats["hits"] += 1
+                return snapshot
+            if age < self.ttl + self.stale_ttl:
+                self.stats["stale_hits"] += 1
+                self._start_refresh()
+                return snapshot
+
+        self.stats["misses"] += 1
+        try:
+            return await asyncio.shield(self._start_refresh())
+        except Exception:
+            if snapshot is None:
+                raise
+            logger.warning("Model catalogue refresh failed, serving expired snapshot", exc_info=True)
+            return snapshot
+
+    def _start_refresh(self) -> asyncio.Task:
+        """Start a refresh unless one is already running on this loop."""
+        task = self._refresh_task
+        if task is None or task.done() or task.get_loop() is not asyncio.get_running_loop():
+            task = self._refresh_task = asyncio.ensure_future(self._refresh())
+            task.add_done_callback(self._log_refresh_failure)
+        return task
+
+    async def _refresh(self) -> _Snapshot:
+        raw = await self._fetch()
+        snapshot = _Snapshot(list(raw.get("data", [])), self._clock())
+        self._snapshot = snapshot
+        return snapshot
+
+    def _log_refresh_failure(self, task: asyncio.Task) -> None:
+        if task.cancelled() or task.exception() is None:
+            return
+        self.stats["refresh_errors"] += 1
+        logger.warning(f"Model catalogue refresh failed: {task.exception()}")
+
+
+_catalogue: Optional[ModelCatalogue] = None
+
+
+def get_model_catalogue() -> ModelCatalogue:
+    """
+    Process-wide catalogue backed by LLMService.get_available_models, through the
+    shared cache so one upstream fetch serves every worker.
+    """
+    global _catalogue
+    if _catalogue is None:
+        from app.core.shared_cache import get_shared_cache
+        from app.services.llm_service import LLMService
+
+        ttl = float(os.getenv("MODEL_CATALOGUE_TTL", "300"))
+        shared = get_shared_cache().namespace("catalogue")
+
+        async def fetch() -> Dict[str, Any]:
+            # Another worker may already have fetched a fresh copy
+            raw = await shared.aget_json("openrouter")
+            if raw is None:
+                raw = await LLMService().get_available_models()
+                await shared.aset_json("openrouter", raw, ttl)
+            return raw
+
+        _catalogue = ModelCatalogue(
+            fetch,
+            ttl=ttl,
+            stale_ttl=float(os.getenv("MODEL_CATALOGUE_STALE_TTL", "3600")),
+        )
+    return _catalogue
+
+
+def loaded_model(model_id: str) -> Optional[Dict[str, Any]]:
+    """Entry of the process-wide catalogue if it is already loaded; no catalogue is created or fetched."""
+    return _catalogue.loaded_model(model_id) if _catalogue is not None else None
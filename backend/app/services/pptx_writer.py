@@ -0,0 +1,226 @@
+import re
+import zipfile
+from functools import lru_cache
+from io import BytesIO
+from typing import Any, Dict, Iterator, List, Tuple
+from app.core.profiling import profiled
+from app.services.export_service import SlideLayout, colors_by_type, node_label, node_type_of
+
+# python-pptx units: Pt() truncates to whole EMUs, font sizes are whole centipoints
+EMU_PER_PT = 12700
+EMU_PER_CENTIPOINT = 127
+NODE_LINE_WIDTH = 19050  # Pt(1.5)
+EDGE_LINE_WIDTH = 12700  # Pt(1)
+EDGE_COLOR = "646464"  # RGBColor(100, 100, 100)
+
+SLIDE_PART = "ppt/slides/slide1.xml"
+# Shapes are serialized this many at a time into the slide part
+BATCH_SIZE = 500
+
+# DrawingML exactly as python-pptx writes it for add_shape(ROUNDED_RECTANGLE) and add_connector(STRAIGHT)
+_SHAPE = (
+    '<p:sp><p:nvSpPr><p:cNvPr id="{id}" name="Rounded Rectangle {n}"/><p:cNvSpPr/><p:nvPr/></p:nvSpPr>'
+    '<p:spPr><a:xfrm><a:off x="{x}" y="{y}"/><a:ext cx="{cx}" cy="{cy}"/></a:xfrm>'
+    '<a:prstGeom prst="roundRect"><a:avLst/></a:prstGeom><a:solidFill><a:srgbClr val="{fill}"/></a:solidFill>'
+    '<a:ln w="{line_width}"><a:solidFill><a:srgbClr val="{line}"/></a:solidFill></a:ln></p:spPr>'
+    '<p:style><a:lnRef idx="1"><a:schemeClr val="accent1"/></a:lnRef><a:fillRef idx="3"><a:schemeClr val="accent1"/>'
+    '</a:fillRef><a:effectRef idx="2"><a:schemeClr val="accent1"/></a:effectRef><a:fontRef idx="minor">'
+    '<a:schemeClr val="lt1"/></a:fontRef></p:style>'
+    '<p:txBody><a:bodyPr rtlCol="0" anchor="ctr"/><a:lstStyle/>{paragraphs}</p:txBody></p:sp>'
+)
+_CONNECTOR = (
+    '<p:cxnSp><p:nvCxnSpPr><p:cNvPr id="{id}" name="Connector {n}"/><p:cNvCxnSpPr>'
+    '<a:stCxn id="{source}" idx="2"/><a:endCxn id="{target}" idx="0"/></p:cNvCxnSpPr><p:nvPr/></p:nvCxnSpPr>'
+    '<p:spPr><a:xfrm{flips}><a:off x="{x}" y="{y}"/><a:ext cx="{cx}" cy="{cy}"/></a:xfrm>'
+    '<a:prstGeom prst="line"><a:avLst/></a:prstGeom>'
+    f'<a:ln w="{EDGE_LINE_WIDTH}"><a:solidFill><a:srgbClr val="{EDGE_COLOR}"/></a:solidFill></a:ln></p:spPr>'
+    '<p:style><a:lnRef idx="2"><a:schemeClr val="accent1"/></a:lnRef><a:fillRef idx="0"><a:schemeClr val="accent1"/>'
+    '</a:fillRef><a:effectRef idx="1"><a:schemeClr val="accent1"/></a:effectRef><a:fontRef idx="minor">'
+    '<a:schemeClr val="tx1"/></a:fontRef></p:style></p:cxnSp>'
+)
+
+# python-pptx writes control characters (tab and line feed aside) as "_xHHHH_" escapes
+_CONTROL_CHARS = re.compile(r"([\x00-\x08\x0B-\x1F])")
+# Not representable in XML at all
+_NON_XML_CHARS = re.compile("[￾￿\ud800-\udfff]")
+
+
+class _Template:
+    """The parts of an empty one-slide deck, the slide XML split where shapes go."""
+
+    def __init__(self, parts: List[Tuple[str, bytes]], slide_width_pt: float, slide_height_pt: float):
+        self.parts = parts
+        self.slide_width_pt = slide_width_pt
+        self.slide_height_pt = slide_height_pt
+        slide = dict(parts)[SLIDE_PART].decode("utf-8")
+        cut = slide.index("</p:spTree>")
+        self.slide_head, self.slide_tail = slide[:cut], slide[cut:]
+
+
+@lru_cache(maxsize=1)
+def _template() -> _Template:
+    # Built once per process by python-pptx itself: same package as the shape-by-shape path
+    from pptx import Presentation
+
+    prs = Presentation()
+    prs.slides.add_slide(prs.slide_layouts[6])
+    package = BytesIO()
+    prs.save(package)
+    with zipfile.ZipFile(package) as zf:
+        parts = [(name, zf.read(name)) for name in zf.namelist()]
+    return _Template(parts, prs.slide_width.pt, prs.slide_height.pt)
+
+
+def _run_text(text: str) -> str:
+    text = _CONTROL_CHARS.sub(lambda m: "_x%04X_" % ord(m.group(1)), _NON_XML_CHARS.sub("", text))
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def _paragraphs(label: str, size: int) -> str:
+    """TextFrame.text = label: a paragraph per line, vertical tabs as line breaks, empty runs dropped."""
+    paragraphs = []
+    for line in label.split("\n"):
+        content = []
+        for i, run in enumerate(line.split("\v")):
+            if i:
+                content.append("<a:br/>")
+            if run:
+                content.append(f'<a:r><a:rPr sz="{size}"/><a:t>{_run_text(run)}</a:t></a:r>')
+        paragraphs.append(f"<a:p>{''.join(content)}</a:p>" if content else "<a:p/>")
+    return "".join(paragraphs)
+
+
+class _Connector:
+    """
+    The xfrm python-pptx ends up with for begin_connect + end_connect on a
+    zero-sized connector: its Connector.begin_x/begin_y/end_x/end_y setters
+    replayed on integers, flip attributes kept in the order lxml would write them.
+    """
+
+    def __init__(self):
+        self.x = self.y = self.cx = self.cy = 0
+        self.flips: List[str] = []
+
+    def _flip(self, attr: str, value: bool) -> None:
+        if value and attr not in self.flips:
+            self.flips.append(attr)
+        elif not value and attr in self.flips:
+            self.flips.remove(attr)
+
+    def _set_begin(self, pos: int, size: int, attr: str, new: int) -> Tuple[int, int]:
+        if attr in self.flips:
+            old = pos + size
+            delta = abs(new - old)
+            if new >= old:
+                return pos, size + delta
+            if delta <= size:
+                return pos, size - delta
+            self._flip(attr, False)
+            return new, delta - size
+        delta = abs(new - pos)
+        if new <= pos:
+            return new, size + delta
+        if delta <= size:
+            return new, size - delta
+        self._flip(attr, True)
+        return pos + size, delta - size
+
+    def _set_end(self, pos: int, size: int, attr: str, new: int) -> Tuple[int, int]:
+        if attr in self.flips:
+            delta = abs(new - pos)
+            if new <= pos:
+                return new, size + delta
+            if delta <= size:
+                return new, size - delta
+            self._flip(attr, False)
+            return pos + size, delta - size
+        old = pos + size
+        delta = abs(new - old)
+        if new >= old:
+            return pos, size + delta
+        if delta <= size:
+            return pos, size - delta
+        self._flip(attr, True)
+        return new, delta - size
+
+    def connect(self, begin: Tuple[int, int], end: Tuple[int, int]) -> "_Connector":
+        self.x, self.cx = self._set_begin(self.x, self.cx, "flipH", begin[0])
+        self.y, self.cy = self._set_begin(self.y, self.cy, "flipV", begin[1])
+        self.x, self.cx = self._set_end(self.x, self.cx, "flipH", end[0])
+        self.y, self.cy = self._set_end(self.y, self.cy, "flipV", end[1])
+        return self
+
+
+def _shapes(graph_data: Dict[str, Any], template: _Template) -> Iterator[str]:
+    """spTree children, a batch of shapes at a time: the nodes, then their connectors."""
+    nodes = graph_data.get("nodes", [])
+    edges = graph_data.get("edges", [])
+    layout = SlideLayout(nodes, template.slide_width_pt, template.slide_height_pt)
+    size = int(layout.font_size_pt * EMU_PER_PT) // EMU_PER_CENTIPOINT
+
+    # Shape ids follow python-pptx: 1 is the spTree itself, then one per shape in order
+    shape_id = 1
+    boxes: Dict[Any, Tuple[int, int, int, int, int]] = {}
+    batch: List[str] = []
+    for node in nodes:
+        shape_id += 1
+        left_pt, top_pt, width_pt, height_pt = layout.box(node)
+        x, y = int(left_pt * EMU_PER_PT), int(top_pt * EMU_PER_PT)
+        cx, cy = int(width_pt * EMU_PER_PT), int(height_pt * EMU_PER_PT)
+        fill, line = colors_by_type(node_type_of(node))
+        batch.append(_SHAPE.format(
+            id=shape_id, n=shape_id - 1, x=x, y=y, cx=cx, cy=cy,
+            fill="%02X%02X%02X" % fill, line="%02X%02X%02X" % line, line_width=NODE_LINE_WIDTH,
+            paragraphs=_paragraphs(str(node_label(node)), size),
+        ))
+        boxes[node.get("id")] = (shape_id, x, y, cx, cy)
+        if len(batch) >= BATCH_SIZE:
+            yield "".join(batch)
+            batch = []
+
+    for edge in edges:
+        source = boxes.get(edge.get("source_id") or edge.get("source"))
+        target = boxes.get(edge.get("target_id") or edge.get("target"))
+        if source is None or target is None:
+            continue
+        shape_id += 1
+        source_id, sx, sy, scx, scy = source
+        target_id, tx, ty, tcx, _ = target
+        # Connection point 2 (bottom middle) of the source to 0 (top middle) of the target
+        connector = _Connector().connect((int(sx + scx / 2), sy + scy), (int(tx + tcx / 2), ty))
+        batch.append(_CONNECTOR.format(
+            id=shape_id, n=shape_id - 1, source=source_id, target=target_id,
+            flips="".join(f' {flip}="1"' for flip in connector.flips),
+            x=connector.x, y=connector.y, cx=connector.cx, cy=connector.cy,
+        ))
+        if len(batch) >= BATCH_SIZE:
+            yield "".join(batch)
+            batch = []
+    if batch:
+        yield "".join(batch)
+
+
+@profiled
+def write_pptx(graph_data: Dict[str, Any]) -> BytesIO:
+    """
+    Same deck as ExportService.create_pptx_python_pptx, without python-pptx's
+    object model: the slide's shape tree is generated as DrawingML text (ids
+    precomputed) and written with the other parts of a prebuilt package.
+    python-pptx walks the slide XML for every shape it adds, which makes large
+    diagrams quadratic; here each shape costs one string format.
+    """
+    template = _template()
+    output = BytesIO()
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, data in template.parts:
+            if name != SLIDE_PART:
+                zf.writestr(name, data)
+                continue
+            with zf.open(name, "w") as slide:
+                slide.write(template.slide_head.encode("utf-8"))
+                if graph_data.get("nodes"):
+                    for chunk in _shapes(graph_data, template):
+                        slide.write(chunk.encode("utf-8"))
+                slide.write(template.slide_tail.encode("utf-8"))
+    output.seek(0)
+    return output
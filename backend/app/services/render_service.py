@@ -0,0 +1,326 @@
+import math
+import re
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from app.services.export_service import RGB, colors_by_type
+
+# Same defaults and styling as the PPTX export
+DEFAULT_WIDTH, DEFAULT_HEIGHT = 150.0, 80.0
+NODE_LINE_WIDTH = 1.5
+EDGE_COLOR: RGB = (100, 100, 100)
+EDGE_LINE_WIDTH = 1.0
+TEXT_COLOR: RGB = (33, 33, 33)
+FONT_SIZE = 12.0
+LINE_HEIGHT = 1.2
+TEXT_PADDING = 6.0
+MARGIN = 20.0
+# Corner radius of PowerPoint's rounded rectangle: 1/6 of the shorter side
+CORNER_RATIO = 1 / 6
+
+# Largest page PDF viewers accept (200 inches); bigger diagrams are scaled down to fit
+PDF_MAX_PAGE = 14400.0
+
+# Helvetica advance widths (1/1000 em) for ASCII 32-126, from the standard AFM metrics.
+# Used to wrap and center labels identically in SVG and PDF.
+_HELVETICA_WIDTHS = (
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+)
+_DEFAULT_CHAR_WIDTH = 556
+
+_SVG_ESCAPES = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;"})
+# Characters XML 1.0 cannot carry, even escaped
+_INVALID_XML_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+_PDF_ESCAPES = str.maketrans({"\\": "\\\\", "(": "\\(", ")": "\\)"})
+
+Box = Tuple[float, float, float, float]
+
+
+def text_width(text: str, font_size: float) -> float:
+    units = 0
+    for char in text:
+        code = ord(char) - 32
+        units += _HELVETICA_WIDTHS[code] if 0 <= code < len(_HELVETICA_WIDTHS) else _DEFAULT_CHAR_WIDTH
+    return units * font_size / 1000
+
+
+def wrap_label(label: str, width: float, height: float, font_size: float = FONT_SIZE) -> List[str]:
+    """Greedy word wrap inside a node, long words broken, extra lines dropped with an ellipsis."""
+    max_width = max(width - 2 * TEXT_PADDING, font_size)
+    max_lines = max(1, int((height - 2 * TEXT_PADDING) // (font_size * LINE_HEIGHT)))
+    lines: List[str] = []
+    current = ""
+    for word in label.split():
+        candidate = f"{current} {word}" if current else word
+        if text_width(candidate, font_size) <= max_width:
+            current = candidate
+            continue
+        if current:
+            lines.append(current)
+        while text_width(word, font_size) > max_width and len(word) > 1:
+            cut = len(word) - 1
+            while cut > 1 and text_width(word[:cut], font_size) > max_width:
+                cut -= 1
+            lines.append(word[:cut])
+            word = word[cut:]
+        current = word
+    if current:
+        lines.append(current)
+    if len(lines) > max_lines:
+        lines = lines[:max_lines]
+        last = lines[-1].rstrip(".")
+        while last and text_width(last + "...", font_size) > max_width:
+            last = last[:-1]
+        lines[-1] = last.rstrip() + "..."
+    return lines
+
+
+class RenderInputError(ValueError):
+    """A node or edge the renderers cannot place (non-numeric position or size, malformed entry)."""
+
+
+class _Layout:
+    """
+    Node boxes and diagram bounds of a frontend graph dict, read once before
+    rendering: bad input raises RenderInputError here, before any output.
+    """
+
+    def __init__(self, graph_data: Dict[str, Any]):
+        self.nodes: List[Tuple[str, str, str, Box]] = []
+        self.boxes: Dict[str, Box] = {}
+        for i, node in enumerate(graph_data.get("nodes", [])):
+            try:
+                # Same field fallbacks as ExportService.create_pptx
+                position = node.get("position") or {}
+                box = (
+                    float(position.get("x", 0) or 0), float(position.get("y", 0) or 0),
+                    float(node.get("width", DEFAULT_WIDTH) or DEFAULT_WIDTH),
+                    float(node.get("height", DEFAULT_HEIGHT) or DEFAULT_HEIGHT),
+                )
+                data = node.get("data") or {}
+                label = str(node.get("name") or data.get("label") or node.get("label", "Node"))
+                node_type = str(node.get("type") or data.get("type") or "Unknown")
+                self.boxes[node.get("id")] = box
+            except (AttributeError, TypeError, ValueError) as e:
+                raise RenderInputError(f"Node {i}: {e}") from e
+            if not all(math.isfinite(v) for v in box):
+                raise RenderInputError(f"Node {i}: position and size must be finite numbers")
+            self.nodes.append((node.get("id"), label, node_type, box))
+        self.edges: List[Tuple[Box, Box]] = []
+        for i, edge in enumerate(graph_data.get("edges", [])):
+            try:
+                source = self.boxes.get(edge.get("source_id") or edge.get("source"))
+                target = self.boxes.get(edge.get("target_id") or edge.get("target"))
+            except (AttributeError, TypeError) as e:
+                raise RenderInputError(f"Edge {i}: {e}") from e
+            if source is not None and target is not None:
+                self.edges.append((source, target))
+
+        if self.nodes:
+            self.min_x = min(x for x, _, _, _ in self.boxes.values()) - MARGIN
+            self.min_y = min(y for _, y, _, _ in self.boxes.values()) - MARGIN
+            self.width = max(x + w for x, _, w, _ in self.boxes.values()) + MARGIN - self.min_x
+            self.height = max(y + h for _, y, _, h in self.boxes.values()) + MARGIN - self.min_y
+        else:
+            self.min_x = self.min_y = 0.0
+            self.width = self.height = 2 * MARGIN
+
+    @staticmethod
+    def connector(source: Box, target: Box) -> Tuple[float, float, float, float]:
+        # Bottom of the source to the top of the target, like the PPTX connectors
+        sx, sy, sw, sh = source
+        tx, ty, tw, _ = target
+        return sx + sw / 2, sy + sh, tx + tw / 2, ty
+
+
+def _number(value: float) -> str:
+    return f"{value:.2f}".rstrip("0").rstrip(".")
+
+
+def _svg_text(text: str) -> str:
+    return _INVALID_XML_CHARS.sub("", text).translate(_SVG_ESCAPES)
+
+
+def _hex(color: RGB) -> str:
+    return "#%02X%02X%02X" % color
+
+
+def render_svg(graph_data: Dict[str, Any], width: Optional[float] = None, batch_size: int = 200) -> Iterator[bytes]:
+    """
+    The diagram as SVG, yielded `batch_size` elements at a time: nodes (rounded
+    boxes colored by type, wrapped labels) then connectors, as in the PPTX export.
+    `width` scales the whole picture for thumbnails. The layout is read before
+    the first chunk: invalid input raises RenderInputError from this call.
+    """
+    return _svg_chunks(_Layout(graph_data), width, batch_size)
+
+
+def _svg_chunks(layout: _Layout, width: Optional[float], batch_size: int) -> Iterator[bytes]:
+    scale = width / layout.width if width else 1.0
+    yield (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{_number(layout.width * scale)}" '
+        f'height="{_number(layout.height * scale)}" viewBox="{_number(layout.min_x)} {_number(layout.min_y)} '
+        f'{_number(layout.width)} {_number(layout.height)}" font-family="Helvetica, Arial, sans-serif" '
+        f'font-size="{_number(FONT_SIZE)}">\n'
+        f'<rect x="{_number(layout.min_x)}" y="{_number(layout.min_y)}" width="{_number(layout.width)}" '
+        f'height="{_number(layout.height)}" fill="#FFFFFF"/>\n'
+    ).encode()
+
+    text_color = _hex(TEXT_COLOR)
+    buffer: List[str] = []
+    for _, label, node_type, (x, y, w, h) in layout.nodes:
+        fill, border = colors_by_type(node_type)
+        radius = min(w, h) * CORNER_RATIO
+        entry = (
+            f'<g><rect x="{_number(x)}" y="{_number(y)}" width="{_number(w)}" height="{_number(h)}" '
+            f'rx="{_number(radius)}" fill="{_hex(fill)}" stroke="{_hex(border)}" stroke-width="{NODE_LINE_WIDTH}"/>'
+        )
+        lines = wrap_label(label, w, h)
+        if lines:
+            line_height = FONT_SIZE * LINE_HEIGHT
+            # Vertically centered block; baseline about 0.8 em below the top of each line
+            top = y + (h - line_height * len(lines)) / 2 + FONT_SIZE * 0.8 + (line_height - FONT_SIZE) / 2
+            entry += f'<text x="{_number(x + w / 2)}" text-anchor="middle" fill="{text_color}">'
+            entry += "".join(
+                f'<tspan x="{_number(x + w / 2)}" y="{_number(top + i * line_height)}">{_svg_text(line)}</tspan>'
+                for i, line in enumerate(lines)
+            )
+            entry += "</text>"
+        buffer.append(entry + "</g>\n")
+        if len(buffer) >= batch_size:
+            yield "".join(buffer).encode()
+            buffer = []
+
+    edge_color = _hex(EDGE_COLOR)
+    for source, target in layout.edges:
+        x1, y1, x2, y2 = layout.connector(source, target)
+        buffer.append(
+            f'<line x1="{_number(x1)}" y1="{_number(y1)}" x2="{_number(x2)}" y2="{_number(y2)}" '
+            f'stroke="{edge_color}" stroke-width="{_number(EDGE_LINE_WIDTH)}"/>\n'
+        )
+        if len(buffer) >= batch_size:
+            yield "".join(buffer).encode()
+            buffer = []
+    buffer.append("</svg>\n")
+    yield "".join(buffer).encode()
+
+
+def _pdf_color(color: RGB, operator: str) -> str:
+    return " ".join(_number(c / 255) for c in color) + f" {operator}"
+
+
+def _pdf_text(text: str) -> str:
+    # Standard Helvetica with WinAnsiEncoding: characters outside cp1252 become "?"
+    return text.encode("cp1252", "replace").decode("latin-1").translate(_PDF_ESCAPES)
+
+
+def _rounded_rect(x: float, y: float, w: float, h: float, r: float) -> str:
+    """Path of a rounded rectangle at (x, y) with corners of radius r (Bezier quarter circles)."""
+    k = r * 0.5523  # Control point offset approximating a quarter circle
+    n = _number
+    return (
+        f"{n(x + r)} {n(y)} m {n(x + w - r)} {n(y)} l "
+        f"{n(x + w - r + k)} {n(y)} {n(x + w)} {n(y + r - k)} {n(x + w)} {n(y + r)} c "
+        f"{n(x + w)} {n(y + h - r)} l "
+        f"{n(x + w)} {n(y + h - r + k)} {n(x + w - r + k)} {n(y + h)} {n(x + w - r)} {n(y + h)} c "
+        f"{n(x + r)} {n(y + h)} l "
+        f"{n(x + r - k)} {n(y + h)} {n(x)} {n(y + h - r + k)} {n(x)} {n(y + h - r)} c "
+        f"{n(x)} {n(y + r)} l "
+        f"{n(x)} {n(y + r - k)} {n(x + r - k)} {n(y)} {n(x + r)} {n(y)} c h"
+    )
+
+
+def render_pdf(graph_data: Dict[str, Any], batch_size: int = 200) -> Iterator[bytes]:
+    """
+    The diagram as a one-page PDF sized to it, written without any PDF library:
+    the page content is compressed and yielded `batch_size` elements at a time,
+    its length going into an object written after the stream, and the xref
+    table uses the offsets counted on the way. As with render_svg, invalid input
+    raises RenderInputError from this call, not from the iteration.
+    """
+    return _pdf_chunks(_Layout(graph_data), batch_size)
+
+
+def _pdf_chunks(layout: _Layout, batch_size: int) -> Iterator[bytes]:
+    scale = min(1.0, PDF_MAX_PAGE / layout.width, PDF_MAX_PAGE / layout.height)
+    page_w, page_h = layout.width * scale, layout.height * scale
+
+    offsets: List[int] = []
+    written = 0
+
+    def emit(data: bytes) -> bytes:
+        nonlocal written
+        written += len(data)
+        return data
+
+    def start_object(body: str = "") -> bytes:
+        offsets.append(written)
+        return emit(f"{len(offsets)} 0 obj\n{body}".encode("latin-1"))
+
+    yield emit(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    yield start_object("<< /Type /Catalog /Pages 2 0 R >>\nendobj\n")
+    yield start_object("<< /Type /Pages /Kids [3 0 R] /Count 1 >>\nendobj\n")
+    yield start_object(
+        f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {_number(page_w)} {_number(page_h)}] "
+        "/Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>\nendobj\n"
+    )
+    yield start_object("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>\nendobj\n")
+    yield start_object("<< /Length 6 0 R /Filter /FlateDecode >>\nstream\n")
+
+    compressor = zlib.compressobj(6)
+    stream_length = 0
+    # Diagram coordinates (y down) to PDF user space (y up), scaled to the page
+    ops: List[str] = [
+        f"{_number(scale)} 0 0 {_number(-scale)} {_number(-layout.min_x * scale)} {_number(page_h + layout.min_y * scale)} cm",
+    ]
+
+    def flush() -> Iterator[bytes]:
+        nonlocal ops, stream_length
+        data = compressor.compress(("\n".join(ops) + "\n").encode("latin-1"))
+        ops = []
+        if data:
+            stream_length += len(data)
+            yield emit(data)
+
+    line_height = FONT_SIZE * LINE_HEIGHT
+    for count, (_, label, node_type, (x, y, w, h)) in enumerate(layout.nodes, 1):
+        fill, border = colors_by_type(node_type)
+        ops.append(
+            f"{_pdf_color(fill, 'rg')} {_pdf_color(border, 'RG')} {NODE_LINE_WIDTH} w "
+            f"{_rounded_rect(x, y, w, h, min(w, h) * CORNER_RATIO)} B"
+        )
+        lines = wrap_label(label, w, h)
+        if lines:
+            top = y + (h - line_height * len(lines)) / 2 + FONT_SIZE * 0.8 + (line_height - FONT_SIZE) / 2
+            # Text is drawn upright again inside the flipped coordinate system
+            ops.append(f"BT /F1 {_number(FONT_SIZE)} Tf {_pdf_color(TEXT_COLOR, 'rg')}")
+            for i, line in enumerate(lines):
+                left = x + (w - text_width(line, FONT_SIZE)) / 2
+                ops.append(f"1 0 0 -1 {_number(left)} {_number(top + i * line_height)} Tm ({_pdf_text(line)}) Tj")
+            ops.append("ET")
+        if count % batch_size == 0:
+            yield from flush()
+
+    ops.append(f"{_pdf_color(EDGE_COLOR, 'RG')} {_number(EDGE_LINE_WIDTH)} w")
+    for count, (source, target) in enumerate(layout.edges, 1):
+        x1, y1, x2, y2 = layout.connector(source, target)
+        ops.append(f"{_number(x1)} {_number(y1)} m {_number(x2)} {_number(y2)} l S")
+        if count % batch_size == 0:
+            yield from flush()
+    yield from flush()
+    tail = compressor.flush()
+    stream_length += len(tail)
+    yield emit(tail + b"\nendstream\nendobj\n")
+    yield start_object(f"{stream_length}\nendobj\n")
+
+    xref = written
+    entries = "".join(f"{offset:010d} 00000 n \n" for offset in offsets)
+    yield emit(
+        f"xref\n0 {len(offsets) + 1}\n0000000000 65535 f \n{entries}"
+        f"trailer\n<< /Size {len(offsets) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    )
+
@@ -0,0 +1,64 @@
+"""
+Throughput and memory of the streaming ArchiMate exchange import on a large
+file: a synthetic model is written to a temporary file (streamed, never held
+in memory), then imported chunk by chunk like an upload.
+
+Peak RSS is reported before and after the import; the difference is the graph
+itself (elements and relations) plus the parser's bounded working set, not the
+file size.
+
+Usage (from backend/):
+    python -m benchmarks.bench_archimate_import                 # 100k elements, about 90 MB
+    python -m benchmarks.bench_archimate_import --elements 200000 --chunk-kb 256
+"""
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+from app.services.archimate_exchange import ExchangeImporter, read_chunks
+from benchmarks.synthetic import iter_exchange_xml
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--elements", type=int, default=100_000)
+    parser.add_argument("--chunk-kb", type=int, default=64)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "model.xml")
+        with open(path, "wb") as f:
+            for chunk in iter_exchange_xml(args.elements):
+                f.write(chunk)
+        size_mb = os.path.getsize(path) / (1024 * 1024)
+
+        rss_before = peak_rss_mb()
+        start = time.perf_counter()
+        importer = ExchangeImporter(batch_size=args.batch_size)
+        for chunk in read_chunks(path, args.chunk_kb * 1024):
+            importer.feed(chunk)
+        importer.close()
+        elapsed = time.perf_counter() - start
+
+    report = importer.report
+    print(f"file            {size_mb:10.1f} MB")
+    print(f"elements        {report.elements:10d}")
+    print(f"relationships   {report.relationships:10d}")
+    print(f"time            {elapsed:10.2f} s")
+    print(f"throughput      {size_mb / elapsed:10.1f} MB/s")
+    print(f"                {(report.elements + report.relationships) / elapsed:10.0f} entries/s")
+    print(f"peak RSS        {rss_before:10.1f} MB before, {peak_rss_mb():.1f} MB after")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
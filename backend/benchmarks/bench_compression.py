@@ -0,0 +1,43 @@
+"""
+Bytes on the wire for /api/generate-shaped payloads, with and without compression.
+
+Usage (from backend/):
+    python -m benchmarks.bench_compression
+"""
+import gzip
+import json
+import time
+from app.api.middleware import brotli
+from benchmarks.synthetic import make_graph_dict
+
+SIZES = [20, 100, 500, 2000]
+
+
+def measure(n_elements: int) -> dict:
+    payload = {"graph": make_graph_dict(n_elements), "compliance": {"score": 87, "issues": [], "compliant": True}}
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    row = {"elements": n_elements, "identity": len(raw)}
+
+    start = time.perf_counter()
+    row["gzip"] = len(gzip.compress(raw, compresslevel=6, mtime=0))
+    row["gzip_ms"] = (time.perf_counter() - start) * 1000
+
+    if brotli is not None:
+        start = time.perf_counter()
+        row["br"] = len(brotli.compress(raw, quality=4))
+        row["br_ms"] = (time.perf_counter() - start) * 1000
+    return row
+
+
+def main():
+    print(f"{'elements':>8} {'identity':>10} {'gzip':>9} {'ratio':>6} {'ms':>6} {'br':>9} {'ratio':>6} {'ms':>6}")
+    for n in SIZES:
+        row = measure(n)
+        line = f"{row['elements']:>8} {row['identity']:>10} {row['gzip']:>9} {row['identity'] / row['gzip']:>6.1f} {row['gzip_ms']:>6.2f}"
+        if "br" in row:
+            line += f" {row['br']:>9} {row['identity'] / row['br']:>6.1f} {row['br_ms']:>6.2f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Elements/second for ElementFactory: one validated create_element call per row
+(the historical path) versus the batch create_elements API, with
+model_construct as a reference.
+
+Usage (from backend/):
+    python -m benchmarks.bench_factory
+"""
+import time
+from app.core.factory import ElementFactory
+from benchmarks.synthetic import make_graph_dict
+
+SIZES = [1_000, 10_000, 50_000]
+
+
+def per_row(rows):
+    elements = []
+    for row in rows:
+        obj = ElementFactory.create_element(row["type"], row["name"], row["description"])
+        obj.id = row["id"]
+        elements.append(obj)
+    return elements
+
+
+def batch_validated(rows):
+    return ElementFactory.create_elements(rows)
+
+
+def model_construct(rows):
+    # Reference point: skipping validation entirely
+    return [
+        ElementFactory.resolve_type(row["type"]).model_construct(id=row["id"], name=row["name"], description=row["description"])
+        for row in rows
+    ]
+
+
+def rate(fn, rows, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(rows)
+        best = min(best, time.perf_counter() - start)
+    return len(rows) / best
+
+
+def main():
+    print(f"{'elements':>8} {'create_element/s':>17} {'batch/s':>10} {'speedup':>8} {'model_construct/s':>18}")
+    for n in SIZES:
+        rows = make_graph_dict(n, edges_per_element=0)["nodes"]
+        legacy, batch, construct = rate(per_row, rows), rate(batch_validated, rows), rate(model_construct, rows)
+        print(f"{n:>8} {legacy:>17,.0f} {batch:>10,.0f} {batch / legacy:>7.1f}x {construct:>18,.0f}")
+
+
+if __name__ == "__main__":
+    main()
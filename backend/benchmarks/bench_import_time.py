@@ -0,0 +1,56 @@
+"""
+Cold-start import profile of the API (`python -X importtime -c "import app.main"`).
+
+Usage (from backend/):
+    python -m benchmarks.bench_import_time [module] [top_n]
+"""
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded lazily on first use; importing app.main must not pull them in
+LAZY_MODULES = ("pptx", "networkx", "lxml", "tiktoken")
+
+
+def import_profile(module: str = "app.main") -> List[Tuple[str, int, int]]:
+    """(module, self_us, cumulative_us) for every module imported by a fresh interpreter."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def summarize(rows: List[Tuple[str, int, int]]) -> Dict[str, float]:
+    """Total wall time, time spent in app.* modules themselves, and top-level package set."""
+    return {
+        "total_ms": sum(r[1] for r in rows) / 1000,
+        "app_self_ms": sum(r[1] for r in rows if r[0] == "app" or r[0].startswith("app.")) / 1000,
+    }
+
+
+def main():
+    module = sys.argv[1] if len(sys.argv) > 1 else "app.main"
+    top_n = int(sys.argv[2]) if len(sys.argv) > 2 else 15
+    rows = import_profile(module)
+    summary = summarize(rows)
+    print(f"import {module}: {summary['total_ms']:.1f} ms total, {summary['app_self_ms']:.1f} ms in app.* modules")
+    loaded = {r[0].split(".")[0] for r in rows}
+    print("lazy modules loaded at import:", sorted(loaded & set(LAZY_MODULES)) or "none")
+    print(f"\n{'cumulative ms':>14} {'self ms':>8}  module")
+    for name, self_us, cumulative_us in sorted(rows, key=lambda r: r[2], reverse=True)[:top_n]:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>8.1f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+PowerPoint export throughput, in shapes (nodes and connectors) per second, of
+the two writers: python-pptx shape by shape, and the bulk writer that fills a
+prebuilt package with generated slide XML.
+
+python-pptx gets slower with every shape it adds to a slide, so it is only
+run up to --max-python-pptx elements.
+
+Usage (from backend/):
+    python -m benchmarks.bench_pptx
+    python -m benchmarks.bench_pptx --sizes 100,1000,10000,50000 --max-python-pptx 1000
+"""
+import argparse
+import sys
+import time
+from app.services.export_service import ExportService
+from app.services.pptx_writer import write_pptx
+from benchmarks.synthetic import make_graph_dict
+
+
+def shapes_per_second(write, graph_dict) -> float:
+    start = time.perf_counter()
+    write(graph_dict)
+    return (len(graph_dict["nodes"]) + len(graph_dict["edges"])) / (time.perf_counter() - start)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100,1000,10000")
+    parser.add_argument("--max-python-pptx", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    writers = {"python-pptx": ExportService().create_pptx_python_pptx, "fast": write_pptx}
+    # Imports and the fast writer's template are paid once, not in the first measurement
+    for write in writers.values():
+        write(make_graph_dict(10))
+
+    print(f"{'elements':>10} {'shapes':>10} {'python-pptx':>14} {'fast':>14} {'speedup':>9}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        graph_dict = make_graph_dict(size)
+        shapes = len(graph_dict["nodes"]) + len(graph_dict["edges"])
+        fast = shapes_per_second(writers["fast"], graph_dict)
+        if size <= args.max_python_pptx:
+            slow = shapes_per_second(writers["python-pptx"], graph_dict)
+            print(f"{size:10d} {shapes:10d} {slow:12.0f}/s {fast:12.0f}/s {fast / slow:8.1f}x")
+        else:
+            print(f"{size:10d} {shapes:10d} {'-':>14} {fast:12.0f}/s {'-':>9}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,36 @@
+"""
+Input-token cost of each viewpoint system prompt.
+
+Usage (from backend/):
+    python -m benchmarks.bench_prompt_tokens
+"""
+import time
+from app.core.prompts import OUTPUT_RULE, SHARED_PREFIX, TOGAF_SYSTEM_PROMPTS
+from app.core.tokens import count_tokens, _get_encoding
+
+
+def prompt_token_report():
+    """Tokens per viewpoint, split into the shared (cacheable) prefix and the specific part."""
+    shared = count_tokens(SHARED_PREFIX) + count_tokens(OUTPUT_RULE)
+    rows = []
+    for schema_type, prompt in TOGAF_SYSTEM_PROMPTS.items():
+        total = count_tokens(prompt)
+        rows.append({"schema_type": schema_type, "chars": len(prompt), "tokens": total, "specific_tokens": total - shared})
+    return shared, rows
+
+
+def main():
+    counter = "tiktoken cl100k_base" if _get_encoding() is not None else "heuristic estimate"
+    start = time.perf_counter()
+    shared, rows = prompt_token_report()
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    print(f"token counter: {counter}; shared prefix + output rule: {shared} tokens")
+    print(f"{'schema_type':<26} {'chars':>6} {'tokens':>7} {'specific':>9}")
+    for row in rows:
+        print(f"{row['schema_type']:<26} {row['chars']:>6} {row['tokens']:>7} {row['specific_tokens']:>9}")
+    print(f"total: {sum(r['tokens'] for r in rows)} tokens over {len(rows)} prompts ({elapsed_ms:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""
+Load test of one worker: throughput, latency percentiles and event-loop lag
+per endpoint, at a given concurrency.
+
+The app runs in this process (httpx ASGITransport) with OpenRouter replaced by
+a local server replaying recorded completions (benchmarks.openrouter_stub), so
+a monitor task on the same event loop sees exactly the stalls a uvicorn worker
+would: handler code doing synchronous work blocks every other request.
+
+Scenarios:
+    generate         /api/generate, a new prompt per request (upstream call each time)
+    generate_cached  /api/generate, one prompt (shared cache / single-flight hits)
+    export_pptx      /api/export/pptx, a distinct graph per request (no export cache hits)
+    models           /api/models (catalogue served from memory)
+
+Usage (from backend/):
+    python -m benchmarks.loadtest
+    python -m benchmarks.loadtest --scenarios generate,export_pptx --concurrency 32 --requests 200
+    python -m benchmarks.loadtest --latency-ms 500 --export-elements 100 --output loadtest.json
+"""
+import argparse
+import asyncio
+import copy
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from benchmarks.synthetic import make_graph_dict
+
+SCENARIOS = ("generate", "generate_cached", "export_pptx", "models")
+
+# Lag above this is reported as blocking: the loop could not serve anything else meanwhile
+BLOCKING_THRESHOLD_MS = 50.0
+
+# Known synchronous work on the request path, named in the report when a scenario blocks
+BLOCKING_SUSPECTS = {
+    "generate": "graph building, compliance and JSON encoding run on the loop between upstream calls",
+    "generate_cached": "compliance and JSON encoding of the cached graph run on the loop",
+}
+
+
+class LoopLagMonitor:
+    """
+    Measures event-loop lag: how late a task scheduled every `interval` seconds
+    actually wakes up. On a healthy loop this stays around a millisecond; a
+    handler running synchronous code shows up as lag of the same duration.
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.perf_counter() - start - self.interval))
+
+    def start(self) -> None:
+        self.samples = []
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> List[float]:
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        return self.samples
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def _scenario_requests(name: str, model: str, export_elements: int) -> Callable[[Any, int], Awaitable[Any]]:
+    """`request(client, i)` coroutine factory for one scenario."""
+    if name == "generate":
+        return lambda client, i: client.post("/api/generate", json={"prompt": f"Load test architecture #{i} {time.time_ns()}", "model": model})
+    if name == "generate_cached":
+        return lambda client, i: client.post("/api/generate", json={"prompt": "Load test architecture (cached)", "model": model})
+    if name == "export_pptx":
+        graph = make_graph_dict(export_elements)
+
+        def export(client, i):
+            # A distinct graph per request: the export cache would otherwise answer from memory
+            body = copy.deepcopy(graph)
+            body["nodes"][0]["name"] = f"Load test {i} {time.time_ns()}"
+            return client.post("/api/export/pptx", json=body)
+        return export
+    if name == "models":
+        return lambda client, i: client.get("/api/models")
+    raise ValueError(f"Unknown scenario {name!r} (expected one of {', '.join(SCENARIOS)})")
+
+
+async def run_scenario(
+    client, name: str, request: Callable[[Any, int], Awaitable[Any]], concurrency: int,
+    requests: int, duration: Optional[float] = None
+) -> Dict[str, Any]:
+    """`concurrency` clients send requests back to back until `requests` are done (or `duration` elapsed)."""
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    next_index = 0
+    monitor = LoopLagMonitor()
+    started = time.perf_counter()
+    deadline = started + duration if duration else None
+
+    async def worker() -> None:
+        nonlocal next_index
+        while next_index < requests and (deadline is None or time.perf_counter() < deadline):
+            i = next_index
+            next_index += 1
+            start = time.perf_counter()
+            try:
+                response = await request(client, i)
+                if response.status_code >= 400:
+                    errors[str(response.status_code)] = errors.get(str(response.status_code), 0) + 1
+            except Exception as e:
+                errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+            latencies.append(time.perf_counter() - start)
+
+    monitor.start()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    lag = await monitor.stop()
+
+    result = {
+        "scenario": name,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "elapsed_s": elapsed,
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+        "latency_ms": {
+            "p50": percentile(latencies, 50) * 1000,
+            "p95": percentile(latencies, 95) * 1000,
+            "p99": percentile(latencies, 99) * 1000,
+            "max": max(latencies, default=0.0) * 1000,
+            "mean": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        },
+        "loop_lag_ms": {
+            "p50": percentile(lag, 50) * 1000,
+            "p99": percentile(lag, 99) * 1000,
+            "max": max(lag, default=0.0) * 1000,
+            # Share of the run during which the loop was stalled beyond the threshold
+            "blocked_ratio": sum(s for s in lag if s * 1000 > BLOCKING_THRESHOLD_MS) / elapsed if elapsed else 0.0,
+        },
+    }
+    result["blocking"] = result["loop_lag_ms"]["max"] > BLOCKING_THRESHOLD_MS
+    return result
+
+
+async def run_load_test(
+    scenarios: List[str], concurrency: int, requests: int, duration: Optional[float], latency_ms: Optional[float],
+    latency_scale: float, export_elements: int
+) -> Dict[str, Any]:
+    import httpx
+    from benchmarks.openrouter_stub import ReplayOpenRouter, load_recordings
+
+    recordings = load_recordings()
+    model = recordings[0]["model"]
+    with ReplayOpenRouter(recordings, latency_ms=latency_ms, latency_scale=latency_scale) as stub:
+        os.environ["OPENROUTER_BASE_URL"] = stub.base_url
+        os.environ.setdefault("OPENROUTER_API_KEY", "loadtest")
+        # generate_cached measures cache hits: the result cache is off by default
+        os.environ.setdefault("GENERATION_CACHE_TTL", "300")
+        from app.main import app
+
+        transport = httpx.ASGITransport(app=app)
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=None, limits=limits) as client:
+            # Warm-up: lazy imports, catalogue fetch, first cached generation
+            for name in scenarios:
+                await _scenario_requests(name, model, export_elements)(client, -1)
+
+            results = []
+            for name in scenarios:
+                results.append(await run_scenario(
+                    client, name, _scenario_requests(name, model, export_elements), concurrency, requests, duration
+                ))
+                print_result(results[-1])
+        upstream_ms = stub.delay(recordings[0]) * 1000
+
+    return {
+        "parameters": {"concurrency": concurrency, "requests": requests, "duration_s": duration,
+                       "upstream_latency_ms": upstream_ms, "export_elements": export_elements},
+        "results": results,
+    }
+
+
+def print_header() -> None:
+    print(f"{'scenario':<16} {'req':>5} {'err':>4} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'lag p99':>8} {'lag max':>8}")
+
+
+def print_result(r: Dict[str, Any]) -> None:
+    lat, lag = r["latency_ms"], r["loop_lag_ms"]
+    print(f"{r['scenario']:<16} {r['requests']:>5} {sum(r['errors'].values()):>4} {r['throughput_rps']:>8.1f} "
+          f"{lat['p50']:>9.1f} {lat['p95']:>9.1f} {lat['p99']:>9.1f} {lag['p99']:>8.1f} {lag['max']:>8.1f}"
+          + ("  <- event loop blocked" if r["blocking"] else ""), flush=True)
+
+
+def print_findings(report: Dict[str, Any]) -> None:
+    for r in report["results"]:
+        if not r["blocking"]:
+            continue
+        lag = r["loop_lag_ms"]
+        print(
+            f"\n{r['scenario']}: the event loop stalled for up to {lag['max']:.0f} ms "
+            f"({lag['blocked_ratio']:.0%} of the run), delaying every concurrent request on this worker."
+        )
+        if r["scenario"] in BLOCKING_SUSPECTS:
+            print(f"  likely cause: {BLOCKING_SUSPECTS[r['scenario']]}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=100, help="requests per scenario")
+    parser.add_argument("--duration", type=float, help="stop a scenario after this many seconds")
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="simulated upstream latency")
+    parser.add_argument("--recorded-latency", action="store_true", help="replay the recorded latency instead")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="multiplier of the recorded latency")
+    parser.add_argument("--export-elements", type=int, default=50, help="elements per exported graph")
+    parser.add_argument("--output", help="write the report as JSON")
+    args = parser.parse_args(argv)
+
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    latency_ms = None if args.recorded_latency else args.latency_ms
+    print_header()
+    report = asyncio.run(run_load_test(
+        scenarios, args.concurrency, args.requests, args.duration, latency_ms, args.latency_scale, args.export_elements
+    ))
+    print_findings(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
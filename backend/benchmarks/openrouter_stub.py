@@ -0,0 +1,116 @@
+"""
+Local OpenRouter stand-in replaying recorded chat completions.
+
+Recordings are JSON files of the form
+    {"recordings": [{"model": ..., "latency_ms": ..., "response": {...}}]}
+where `response` is an OpenRouter /chat/completions body. Successive calls
+cycle through the recordings; the request's model is echoed back. Requests with
+"stream": true get the recorded content back as server-sent events, spread
+over the same latency.
+"""
+import itertools
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+RECORDINGS_DIR = os.path.join(os.path.dirname(__file__), "recordings")
+
+
+def load_recordings(path: str = os.path.join(RECORDINGS_DIR, "openrouter_generate.json")) -> List[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["recordings"]
+
+
+class ReplayOpenRouter:
+    """
+    Threaded HTTP server answering POST /chat/completions from recordings.
+
+    Each answer is delayed by `latency_ms` when given, otherwise by the recorded
+    latency times `latency_scale` (0 = as fast as possible). GET /models returns
+    the recorded models so the catalogue refresh succeeds.
+    """
+
+    def __init__(
+        self, recordings: List[Dict[str, Any]], latency_ms: Optional[float] = None, latency_scale: float = 1.0,
+        chunk_chars: int = 64
+    ):
+        self.recordings = recordings
+        self.chunk_chars = chunk_chars
+        self.latency_ms = latency_ms
+        self.latency_scale = latency_scale
+        self.calls = 0
+        stub = self
+        cycle = itertools.cycle(recordings)
+        lock = threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with lock:
+                    recording = next(cycle)
+                    stub.calls += 1
+                model = payload.get("model", recording["model"])
+                if payload.get("stream"):
+                    self._stream(recording, model)
+                    return
+                time.sleep(stub.delay(recording))
+                self._send({**recording["response"], "model": model})
+
+            def do_GET(self):
+                models = sorted({r["model"] for r in stub.recordings})
+                self._send({"data": [{"id": m, "name": m, "supported_parameters": []} for m in models]})
+
+            def _send(self, body: Dict[str, Any]) -> None:
+                raw = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def _stream(self, recording: Dict[str, Any], model: str) -> None:
+                content = recording["response"]["choices"][0]["message"]["content"]
+                pieces = [content[i:i + stub.chunk_chars] for i in range(0, len(content), stub.chunk_chars)] or [""]
+                # Time to first token is a third of the latency, the rest is spread over the chunks
+                delay = stub.delay(recording)
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+                time.sleep(delay / 3)
+                try:
+                    for piece in pieces:
+                        chunk = {"id": recording["response"].get("id"), "model": model,
+                                 "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]}
+                        self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                        self.wfile.flush()
+                        time.sleep(delay * 2 / 3 / len(pieces))
+                    self.wfile.write(b"data: [DONE]\n\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # Client disconnected mid-stream
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def delay(self, recording: Dict[str, Any]) -> float:
+        if self.latency_ms is not None:
+            return self.latency_ms / 1000
+        return recording.get("latency_ms", 0) / 1000 * self.latency_scale
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
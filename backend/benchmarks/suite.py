@@ -0,0 +1,320 @@
+"""
+Benchmark suite of the generation/export pipeline, with JSON results that can
+be compared between commits.
+
+Micro benchmarks run on synthetic models (benchmarks.synthetic) of 100 to 100k
+elements; `generate_e2e` sends /api/generate requests through the ASGI app to a
+local server replaying recorded OpenRouter responses (benchmarks.openrouter_stub).
+
+Usage (from backend/):
+    python -m benchmarks.suite run                          # all, default sizes
+    python -m benchmarks.suite run --quick                  # 100 and 1000 elements
+    python -m benchmarks.suite run --only extract_json,to_dict --sizes 1000,10000
+    python -m benchmarks.suite run --latency-ms 50 --requests 20
+    python -m benchmarks.suite compare results/a1b2c3d.json results/e4f5a6b.json
+
+Results go to benchmarks/results/<commit>.json unless --output is given;
+`compare` exits with status 1 when a median got slower than --threshold.
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from benchmarks.synthetic import iter_exchange_xml, make_graph_dict, make_llm_output
+
+DEFAULT_SIZES = [100, 1_000, 10_000, 100_000]
+QUICK_SIZES = [100, 1_000]
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+class Benchmark:
+    """`setup(size)` prepares inputs and returns the zero-argument callable that is timed."""
+
+    def __init__(self, name: str, setup: Callable[[int], Callable[[], Any]], max_size: Optional[int] = None):
+        self.name = name
+        self.setup = setup
+        self.max_size = max_size
+
+
+def _setup_extract_json(size: int):
+    from app.core.utils import extract_json_from_text
+    # Shaped like a model answer: prose, then a fenced JSON block
+    text = "Here is the architecture you asked for.\n```json\n" + json.dumps(make_llm_output(size), indent=2) + "\n```\n"
+    return lambda: extract_json_from_text(text)
+
+
+def _setup_graph_build(size: int):
+    from app.services.generation_service import _GraphAssembler
+    data = make_llm_output(size)
+
+    def build():
+        # Steps 3-4 of GenerationService._generate_architecture
+        assembler = _GraphAssembler()
+        assembler.add_layers(data)
+        for rel in data["relationships"]:
+            assembler.add_relationship(rel)
+        return assembler
+    return build
+
+
+def _setup_validate_graph_dict(size: int):
+    from app.services.compliance_service import ComplianceService
+    graph_dict, service = make_graph_dict(size), ComplianceService()
+    return lambda: service.validate_graph_dict(graph_dict)
+
+
+def _setup_to_dict(size: int):
+    graph = _setup_graph_build(size)().graph
+    return graph.to_dict
+
+
+def _setup_create_pptx(size: int):
+    from app.services.export_service import ExportService
+    graph_dict, service = make_graph_dict(size), ExportService()
+    return lambda: service.create_pptx(graph_dict)
+
+
+def _setup_create_pptx_python_pptx(size: int):
+    from app.services.export_service import ExportService
+    graph_dict, service = make_graph_dict(size), ExportService()
+    return lambda: service.create_pptx_python_pptx(graph_dict)
+
+
+def _setup_archimate_import(size: int):
+    from app.services.archimate_exchange import import_exchange
+    data = b"".join(iter_exchange_xml(size))
+    chunks = [data[i:i + 65536] for i in range(0, len(data), 65536)]
+    return lambda: import_exchange(chunks)
+
+
+def _setup_archimate_export(size: int):
+    from app.services.archimate_exchange import export_exchange, load_graph_dict
+    graph, positions = load_graph_dict(make_graph_dict(size))
+    return lambda: sum(len(chunk) for chunk in export_exchange(graph, positions))
+
+
+def _setup_render(render_name: str):
+    def setup(size: int):
+        from app.services import render_service
+        render, graph_dict = getattr(render_service, render_name), make_graph_dict(size)
+        return lambda: sum(len(chunk) for chunk in render(graph_dict))
+    return setup
+
+
+BENCHMARKS = [
+    Benchmark("extract_json", _setup_extract_json),
+    Benchmark("graph_build", _setup_graph_build),
+    Benchmark("validate_graph_dict", _setup_validate_graph_dict),
+    Benchmark("to_dict", _setup_to_dict),
+    Benchmark("create_pptx", _setup_create_pptx),
+    # python-pptx adds shapes in quadratic time: 1000 elements already take 30-60s
+    Benchmark("create_pptx_python_pptx", _setup_create_pptx_python_pptx, max_size=1_000),
+    Benchmark("archimate_import", _setup_archimate_import),
+    Benchmark("archimate_export", _setup_archimate_export),
+    Benchmark("render_svg", _setup_render("render_svg")),
+    Benchmark("render_pdf", _setup_render("render_pdf")),
+]
+
+
+def measure(fn: Callable[[], Any], repeat: int, max_time: float) -> List[float]:
+    """Durations of up to `repeat` runs, stopping early once `max_time` seconds are spent (at least one run)."""
+    durations: List[float] = []
+    spent = 0.0
+    while len(durations) < repeat and (not durations or spent < max_time):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+        spent += durations[-1]
+    return durations
+
+
+def _percentile(sorted_values: Sequence[float], q: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def summarize(durations: List[float]) -> Dict[str, Any]:
+    ordered = sorted(durations)
+    return {
+        "runs": len(ordered),
+        "min_s": ordered[0],
+        "median_s": statistics.median(ordered),
+        "mean_s": statistics.fmean(ordered),
+        "max_s": ordered[-1],
+        "stdev_s": statistics.stdev(ordered) if len(ordered) > 1 else 0.0,
+        "p95_s": _percentile(ordered, 95),
+        "p99_s": _percentile(ordered, 99),
+    }
+
+
+def run_micro(benchmarks: List[Benchmark], sizes: List[int], repeat: int, max_time: float) -> List[Dict[str, Any]]:
+    rows = []
+    for bench in benchmarks:
+        for size in sizes:
+            if bench.max_size is not None and size > bench.max_size:
+                continue
+            fn = bench.setup(size)
+            stats = summarize(measure(fn, repeat, max_time))
+            rows.append({"benchmark": bench.name, "size": size, **stats, "elements_per_s": size / stats["median_s"]})
+            _print_row(rows[-1])
+    return rows
+
+
+def run_generate_e2e(requests: int, latency_ms: Optional[float], latency_scale: float) -> Dict[str, Any]:
+    """Sequential /api/generate calls, each a distinct prompt (no cache or single-flight hits)."""
+    import httpx
+    from benchmarks.openrouter_stub import ReplayOpenRouter, load_recordings
+
+    recordings = load_recordings()
+    with ReplayOpenRouter(recordings, latency_ms=latency_ms, latency_scale=latency_scale) as stub:
+        os.environ["OPENROUTER_BASE_URL"] = stub.base_url
+        os.environ.setdefault("OPENROUTER_API_KEY", "benchmark")
+        os.environ["GENERATION_CACHE_TTL"] = "0"
+        from app.main import app
+
+        async def main():
+            durations = []
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+                # Warm-up (lazy imports, catalogue fetch), not measured
+                await client.post("/api/generate", json={"prompt": "warm-up", "model": recordings[0]["model"]})
+                for i in range(requests):
+                    start = time.perf_counter()
+                    response = await client.post("/api/generate", json={
+                        "prompt": f"Online retail order-to-delivery architecture #{i}",
+                        "model": recordings[0]["model"],
+                    })
+                    durations.append(time.perf_counter() - start)
+                    response.raise_for_status()
+                    elements = len(response.json()["graph"]["nodes"])
+            return durations, elements
+
+        durations, elements = asyncio.run(main())
+        upstream_ms = stub.delay(recordings[0]) * 1000
+
+    row = {"benchmark": "generate_e2e", "size": elements, **summarize(durations), "upstream_latency_ms": upstream_ms}
+    row["overhead_median_ms"] = (row["median_s"] * 1000) - upstream_ms
+    _print_row(row)
+    return row
+
+
+def _print_row(row: Dict[str, Any]) -> None:
+    print(
+        f"{row['benchmark']:<20} {row['size']:>8} {row['runs']:>5} "
+        f"{row['min_s'] * 1000:>11.2f} {row['median_s'] * 1000:>11.2f} {row['p95_s'] * 1000:>11.2f}",
+        flush=True,
+    )
+
+
+def _git(*args: str) -> Optional[str]:
+    try:
+        return subprocess.run(["git", *args], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(__file__)).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment() -> Dict[str, Any]:
+    commit = _git("rev-parse", "--short", "HEAD")
+    return {
+        "commit": commit,
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    sizes = QUICK_SIZES if args.quick else [int(s) for s in args.sizes.split(",")]
+    only = set(args.only.split(",")) if args.only else None
+    benchmarks = [b for b in BENCHMARKS if only is None or b.name in only]
+
+    print(f"{'benchmark':<20} {'size':>8} {'runs':>5} {'min ms':>11} {'median ms':>11} {'p95 ms':>11}")
+    results = run_micro(benchmarks, sizes, args.repeat, args.max_time)
+    if only is None or "generate_e2e" in only:
+        results.append(run_generate_e2e(args.requests, args.latency_ms, args.latency_scale))
+
+    report = {
+        "environment": environment(),
+        "parameters": {"sizes": sizes, "repeat": args.repeat, "max_time": args.max_time, "requests": args.requests,
+                       "latency_ms": args.latency_ms, "latency_scale": args.latency_scale},
+        "results": results,
+    }
+    output = args.output
+    if output is None:
+        env = report["environment"]
+        name = (env["commit"] or "unknown") + ("-dirty" if env["dirty"] else "")
+        output = os.path.join(RESULTS_DIR, f"{name}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+    return report
+
+
+def compare(base: Dict[str, Any], head: Dict[str, Any], threshold: float = 1.10) -> List[Dict[str, Any]]:
+    """Median ratio head/base per (benchmark, size) present in both reports."""
+    base_rows = {(r["benchmark"], r["size"]): r for r in base["results"]}
+    rows = []
+    for r in head["results"]:
+        before = base_rows.get((r["benchmark"], r["size"]))
+        if before is None:
+            continue
+        ratio = r["median_s"] / before["median_s"]
+        status = "slower" if ratio > threshold else "faster" if ratio < 1 / threshold else "same"
+        rows.append({"benchmark": r["benchmark"], "size": r["size"], "base_s": before["median_s"],
+                     "head_s": r["median_s"], "ratio": ratio, "status": status})
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run", help="run the suite and write JSON results")
+    run_parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="comma-separated element counts")
+    run_parser.add_argument("--quick", action="store_true", help=f"sizes {QUICK_SIZES}")
+    run_parser.add_argument("--only", help="comma-separated benchmark names (generate_e2e included)")
+    run_parser.add_argument("--repeat", type=int, default=5, help="runs per benchmark and size")
+    run_parser.add_argument("--max-time", type=float, default=10.0, help="stop repeating after this many seconds")
+    run_parser.add_argument("--requests", type=int, default=10, help="generate_e2e requests")
+    run_parser.add_argument("--latency-ms", type=float, help="replayed upstream latency (default: recorded latency)")
+    run_parser.add_argument("--latency-scale", type=float, default=1.0, help="multiplier of the recorded latency")
+    run_parser.add_argument("--output", help="results file (default: benchmarks/results/<commit>.json)")
+
+    compare_parser = sub.add_parser("compare", help="compare two results files")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("head")
+    compare_parser.add_argument("--threshold", type=float, default=1.10, help="slowdown ratio reported as a regression")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        run(args)
+        return 0
+
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.head, encoding="utf-8") as f:
+        head = json.load(f)
+    rows = compare(base, head, args.threshold)
+    print(f"{'benchmark':<20} {'size':>8} {'base ms':>11} {'head ms':>11} {'ratio':>7}")
+    for row in rows:
+        print(f"{row['benchmark']:<20} {row['size']:>8} {row['base_s'] * 1000:>11.2f} {row['head_s'] * 1000:>11.2f} "
+              f"{row['ratio']:>6.2f}x {row['status']}")
+    return 1 if any(row["status"] == "slower" for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+import random
+from typing import Any, Dict, Iterator, List
+from xml.sax.saxutils import escape
+from app.core.metamodel import ElementType
+from app.core.relationships import RelationshipType
+
+# Element types the generation prompts produce most often
+COMMON_TYPES = [
+    ElementType.GROUPING, ElementType.BUSINESS_ACTOR, ElementType.BUSINESS_PROCESS,
+    ElementType.APPLICATION_COMPONENT, ElementType.APPLICATION_SERVICE, ElementType.DATA_OBJECT,
+    ElementType.NODE, ElementType.SYSTEM_SOFTWARE,
+]
+
+LAYER_BY_TYPE = {
+    ElementType.GROUPING: "Composite",
+    ElementType.BUSINESS_ACTOR: "Business",
+    ElementType.BUSINESS_PROCESS: "Business",
+    ElementType.APPLICATION_COMPONENT: "Application",
+    ElementType.APPLICATION_SERVICE: "Application",
+    ElementType.DATA_OBJECT: "Application",
+    ElementType.NODE: "Technology",
+    ElementType.SYSTEM_SOFTWARE: "Technology",
+}
+
+
+def make_graph_dict(n_elements: int, edges_per_element: float = 1.5, seed: int = 42) -> Dict[str, Any]:
+    """
+    Build a graph dict shaped like GenerationService output (nodes/edges with ids,
+    descriptions and positions) with a deterministic layout.
+    """
+    rng = random.Random(seed)
+    nodes: List[Dict[str, Any]] = []
+    for i in range(n_elements):
+        el_type = COMMON_TYPES[i % len(COMMON_TYPES)]
+        nodes.append({
+            "id": f"00000000-0000-4000-8000-{i:012d}",
+            "name": f"{el_type.value} {i}",
+            "description": f"Synthetic {el_type.value} number {i} used for benchmarking the pipeline.",
+            "layer": LAYER_BY_TYPE[el_type],
+            "type": el_type.value,
+            "attributes": {},
+            "tags": [],
+            "position": {"x": (i % 40) * 180, "y": (i // 40) * 120},
+            "width": 150,
+            "height": 80,
+        })
+
+    rel_types = [RelationshipType.SERVING, RelationshipType.FLOW, RelationshipType.COMPOSITION, RelationshipType.ACCESS]
+    edges: List[Dict[str, Any]] = []
+    for _ in range(int(n_elements * edges_per_element)):
+        source, target = rng.randrange(n_elements), rng.randrange(n_elements)
+        if source == target:
+            continue
+        edges.append({
+            "source_id": nodes[source]["id"],
+            "target_id": nodes[target]["id"],
+            "type": rng.choice(rel_types).value,
+            "description": "exchanges synthetic payloads",
+            "bidirectional": False,
+        })
+    return {"nodes": nodes, "edges": edges}
+
+
+LAYER_KEY_BY_LAYER = {
+    "Composite": "application_layer",
+    "Business": "business_layer",
+    "Application": "application_layer",
+    "Technology": "technology_layer",
+}
+
+
+def make_llm_output(n_elements: int, edges_per_element: float = 1.5, seed: int = 42) -> Dict[str, Any]:
+    """
+    The same synthetic model as the JSON object the LLM is asked for: elements
+    grouped by layer key, relationships referencing element names.
+    """
+    graph = make_graph_dict(n_elements, edges_per_element, seed)
+    names = {node["id"]: node["name"] for node in graph["nodes"]}
+    data: Dict[str, Any] = {}
+    for node in graph["nodes"]:
+        data.setdefault(LAYER_KEY_BY_LAYER[node["layer"]], []).append(
+            {"type": node["type"], "name": node["name"], "description": node["description"]}
+        )
+    data["relationships"] = [
+        {"source": names[e["source_id"]], "target": names[e["target_id"]], "type": e["type"], "description": e["description"]}
+        for e in graph["edges"]
+    ]
+    return data
+
+
+def iter_exchange_xml(n_elements: int, edges_per_element: float = 1.5, seed: int = 42, batch: int = 1000) -> Iterator[bytes]:
+    """
+    The synthetic model as an ArchiMate Model Exchange file, in chunks of `batch`
+    entries: documented elements with a property, relationships, the folder
+    tree modelling tools write (an organizations item per element and
+    relationship, one folder per layer) and one view placing every element. Lets import benchmarks reach file sizes that would
+    not fit in memory as a single string.
+    """
+    graph = make_graph_dict(n_elements, edges_per_element, seed)
+    yield (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<model xmlns="http://www.opengroup.org/xsd/archimate/3.0/" '
+        'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" identifier="id-synthetic">\n'
+        '  <name xml:lang="en">Synthetic model</name>\n  <elements>\n'
+    ).encode()
+    nodes = graph["nodes"]
+    for start in range(0, len(nodes), batch):
+        yield "".join(
+            f'    <element identifier="id-{n["id"]}" xsi:type="{n["type"]}">'
+            f'<name xml:lang="en">{escape(n["name"])}</name>'
+            f'<documentation xml:lang="en">{escape(n["description"])}</documentation>'
+            f'<properties><property propertyDefinitionRef="propid-owner"><value xml:lang="en">Team {i % 7}</value>'
+            f'</property></properties></element>\n'
+            for i, n in enumerate(nodes[start:start + batch], start)
+        ).encode()
+    yield b"  </elements>\n  <relationships>\n"
+    edges = graph["edges"]
+    for start in range(0, len(edges), batch):
+        yield "".join(
+            f'    <relationship identifier="id-rel-{i}" source="id-{e["source_id"]}" target="id-{e["target_id"]}" '
+            f'xsi:type="{e["type"]}"><name xml:lang="en">{escape(e["description"])}</name></relationship>\n'
+            for i, e in enumerate(edges[start:start + batch], start)
+        ).encode()
+    yield b"  </relationships>\n  <organizations>\n"
+    folders: Dict[str, List[str]] = {}
+    for node in nodes:
+        folders.setdefault(node["layer"], []).append(f'id-{node["id"]}')
+    folders["Relations"] = [f"id-rel-{i}" for i in range(len(edges))]
+    for label, refs in folders.items():
+        yield f'    <item>\n      <label xml:lang="en">{label}</label>\n'.encode()
+        for start in range(0, len(refs), batch):
+            yield "".join(f'      <item identifierRef="{ref}"/>\n' for ref in refs[start:start + batch]).encode()
+        yield b"    </item>\n"
+    yield (
+        '  </organizations>\n  <propertyDefinitions>\n'
+        '    <propertyDefinition identifier="propid-owner" type="string"><name xml:lang="en">Owner</name></propertyDefinition>\n'
+        '  </propertyDefinitions>\n  <views>\n    <diagrams>\n'
+        '      <view identifier="id-view" xsi:type="Diagram"><name xml:lang="en">Everything</name>\n'
+    ).encode()
+    for start in range(0, len(nodes), batch):
+        yield "".join(
+            f'        <node identifier="id-node-{i}" elementRef="id-{n["id"]}" xsi:type="Element" '
+            f'x="{n["position"]["x"]}" y="{n["position"]["y"]}" w="{n["width"]}" h="{n["height"]}"/>\n'
+            for i, n in enumerate(nodes[start:start + batch], start)
+        ).encode()
+    yield b"      </view>\n    </diagrams>\n  </views>\n</model>\n"
@@ -0,0 +1,13 @@
+import os
+import pytest
+
+# Services refuse to start without a key; tests never reach OpenRouter
+os.environ.setdefault("OPENROUTER_API_KEY", "test-key")
+
+
+@pytest.fixture(autouse=True)
+def fresh_shared_cache(monkeypatch):
+    """Each test starts with an empty per-process cache (results must not leak between tests)."""
+    from app.core import shared_cache
+    monkeypatch.setenv("SHARED_CACHE_URL", "memory://")
+    monkeypatch.setattr(shared_cache, "_cache", None)
@@ -0,0 +1,66 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+
+
+def completion(content: str, model: str = "stub/model") -> Dict:
+    return {
+        "id": "gen-stub",
+        "model": model,
+        "choices": [{"message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 20, "total_tokens": 30},
+    }
+
+
+class StubOpenRouter:
+    """
+    Local HTTP stand-in for OpenRouter's /chat/completions.
+
+    `script` maps a model id to the list of responses returned for successive
+    calls to that model: (status, headers, body, delay_seconds). The last entry
+    repeats once the list is exhausted.
+    """
+
+    def __init__(self, script: Dict[str, List[Tuple[int, Dict[str, str], Dict, float]]]):
+        self.script = script
+        self.requests: List[Dict] = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                stub.requests.append(payload)
+                responses = stub.script[payload["model"]]
+                calls = sum(1 for r in stub.requests if r["model"] == payload["model"])
+                status, headers, body, delay = responses[min(calls, len(responses)) - 1]
+                time.sleep(delay)
+                raw = json.dumps(body).encode()
+                try:
+                    self.send_response(status)
+                    for key, value in headers.items():
+                        self.send_header(key, value)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(raw)))
+                    self.end_headers()
+                    self.wfile.write(raw)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # client gave up (timeout tests)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def calls_for(self, model: str) -> int:
+        return sum(1 for r in self.requests if r["model"] == model)
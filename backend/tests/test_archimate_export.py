@@ -0,0 +1,104 @@
+import re
+from fastapi.testclient import TestClient
+from lxml import etree
+from app.main import app
+from app.services.archimate_exchange import EXCHANGE_NS, export_exchange, import_exchange, load_graph_dict
+from benchmarks.synthetic import make_graph_dict
+
+client = TestClient(app)
+NS = {"a": EXCHANGE_NS}
+XSI_TYPE = "{http://www.w3.org/2001/XMLSchema-instance}type"
+
+GRAPH = {
+    "nodes": [
+        {"id": "group", "type": "Grouping", "name": "Sales & Marketing", "position": {"x": 0, "y": 0},
+         "width": 500, "height": 300},
+        {"id": "1-actor", "type": "BusinessActor", "name": "Customer <VIP>", "description": "Buys",
+         "attributes": {"Owner": "Sales"}, "position": {"x": 40, "y": 60}},
+        {"id": "crm", "type": "ApplicationComponent", "name": "CRM", "position": {"x": 240.4, "y": 60}},
+        {"id": "erp", "type": "ApplicationComponent", "name": "ERP"},
+    ],
+    "edges": [
+        {"source_id": "group", "target_id": "1-actor", "type": "Composition"},
+        {"source_id": "group", "target_id": "crm", "type": "Aggregation"},
+        {"source_id": "1-actor", "target_id": "crm", "type": "Serving", "description": "uses"},
+        {"source_id": "crm", "target_id": "erp", "type": "Association", "bidirectional": False},
+        {"source_id": "crm", "target_id": "missing", "type": "Flow"},
+    ],
+}
+
+
+def export(graph_dict, **kwargs):
+    graph, positions = load_graph_dict(graph_dict)
+    return list(export_exchange(graph, positions, **kwargs))
+
+
+def test_export_nests_groupings_and_keeps_positions():
+    xml = b"".join(export(GRAPH, name="Retail"))
+    root = etree.fromstring(xml)
+
+    assert root.findtext("a:name", namespaces=NS) == "Retail"
+    types = {e.get("identifier"): e.get(XSI_TYPE) for e in root.iterfind("a:elements/a:element", NS)}
+    # Identifiers are xs:ID: one starting with a digit gets a prefix
+    assert types == {"group": "Grouping", "id-1-actor": "BusinessActor", "crm": "ApplicationComponent",
+                     "erp": "ApplicationComponent"}
+    assert root.find("a:elements/a:element[@identifier='id-1-actor']/a:name", NS).text == "Customer <VIP>"
+    (association,) = root.iterfind("a:relationships/a:relationship[@xsi:type='Association']",
+                                   {**NS, "xsi": "http://www.w3.org/2001/XMLSchema-instance"})
+    assert association.get("isDirected") == "true"
+    assert root.find("a:propertyDefinitions/a:propertyDefinition/a:name", NS).text == "Owner"
+
+    view = root.find("a:views/a:diagrams/a:view", NS)
+    group = view.find("a:node[@elementRef='group']", NS)
+    assert [n.get("elementRef") for n in group.iterfind("a:node", NS)] == ["id-1-actor", "crm"]
+    crm = group.find("a:node[@elementRef='crm']", NS)
+    assert (crm.get("x"), crm.get("y"), crm.get("w"), crm.get("h")) == ("240", "60", "150", "80")
+    assert view.find("a:node[@elementRef='erp']", NS) is not None  # No position: placed on a grid
+    # Nesting shows composition/aggregation: only the two other relationships are drawn
+    assert len(view.findall("a:connection", NS)) == 2
+
+
+def test_identifiers_are_valid_and_unique():
+    ids = ["1-a", "id-1-a", "has space", "ns:local", "n-1", "rel-0", "ok"]
+    graph = {"nodes": [{"id": i, "type": "BusinessActor", "name": i} for i in ids],
+             "edges": [{"source_id": "has space", "target_id": "ns:local", "type": "Serving"}]}
+    root = etree.fromstring(b"".join(export(graph)))
+
+    identifiers = [e.get("identifier") for e in root.iter() if e.get("identifier") is not None]
+    assert len(identifiers) == len(set(identifiers))
+    assert all(re.match(r"^[A-Za-z_][\w.\-]*$", i) for i in identifiers)
+    names = {e.findtext("a:name", namespaces=NS): e.get("identifier") for e in root.iterfind("a:elements/a:element", NS)}
+    assert names["ok"] == "ok" and names["id-1-a"] == "id-1-a" and names["1-a"] == "id-1-a-2"
+    assert names["has space"] == "has_space" and names["ns:local"] == "ns_local"
+    assert names["n-1"] == "id-n-1" and names["rel-0"] == "id-rel-0"  # Would clash with view nodes, relationships
+    (relationship,) = root.iterfind("a:relationships/a:relationship", NS)
+    assert (relationship.get("source"), relationship.get("target")) == ("has_space", "ns_local")
+
+
+def test_export_round_trips_through_the_importer():
+    chunks = export(GRAPH)
+    importer = import_exchange(chunks)
+    assert importer.report.to_dict()["skipped_elements"] == {}
+    assert importer.report.relationships == 4
+    assert importer.graph.get_element("id-1-actor").attributes == {"Owner": "Sales"}
+    assert importer.positions["crm"] == {"x": 240.0, "y": 60.0, "w": 150.0, "h": 80.0}
+
+
+def test_export_is_streamed():
+    chunks = export(make_graph_dict(300), batch_size=50)
+    # The header goes out before any element is written, then bounded chunks
+    assert b"<model" in chunks[0] and b"<element" not in chunks[0]
+    assert len(chunks) > 10
+    assert max(len(c) for c in chunks) < 50 * 1024
+
+
+def test_export_endpoint():
+    response = client.post("/api/export/archimate?name=Synthetic", json=make_graph_dict(40))
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/xml")
+    assert "architecture.xml" in response.headers["content-disposition"]
+    importer = import_exchange([response.content])
+    assert importer.report.model_name == "Synthetic" and importer.report.elements == 40
+
+    empty = client.post("/api/export/archimate", json={"nodes": [], "edges": []})
+    assert etree.fromstring(empty.content).findtext("a:name", namespaces=NS) == "DrawTogaf model"
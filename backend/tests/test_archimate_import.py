@@ -0,0 +1,135 @@
+from fastapi.testclient import TestClient
+from app.core.relationships import RelationshipType
+from app.main import app
+from app.services.archimate_exchange import ExchangeImporter, import_exchange
+from benchmarks.synthetic import iter_exchange_xml
+
+client = TestClient(app)
+
+EXCHANGE = b"""<?xml version="1.0" encoding="UTF-8"?>
+<model xmlns="http://www.opengroup.org/xsd/archimate/3.0/"
+       xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" identifier="id-model">
+  <name xml:lang="en">Retail</name>
+  <elements>
+    <element identifier="id-actor" xsi:type="BusinessActor">
+      <name xml:lang="en">Customer</name>
+      <documentation xml:lang="en">Buys things</documentation>
+      <properties>
+        <property propertyDefinitionRef="propid-owner"><value xml:lang="en">Sales</value></property>
+      </properties>
+    </element>
+    <element identifier="id-app" xsi:type="ApplicationComponent"><name>Shop</name></element>
+    <element identifier="id-crm" xsi:type="ApplicationComponent"><name>CRM</name></element>
+    <element identifier="id-junction" xsi:type="AndJunction"/>
+    <element identifier="id-unknown" xsi:type="SomethingElse"><name>?</name></element>
+  </elements>
+  <relationships>
+    <relationship identifier="id-r1" source="id-actor" target="id-app" xsi:type="Serving"><name>uses</name></relationship>
+    <relationship identifier="id-r2" source="id-app" target="id-crm" xsi:type="Association"/>
+    <relationship identifier="id-r3" source="id-crm" target="id-app" xsi:type="Association" isDirected="true"/>
+    <relationship identifier="id-r4" source="id-app" target="id-junction" xsi:type="Flow"/>
+    <relationship identifier="id-r5" source="id-app" target="id-crm" xsi:type="Unheard"/>
+  </relationships>
+  <propertyDefinitions>
+    <propertyDefinition identifier="propid-owner" type="string"><name>Owner</name></propertyDefinition>
+  </propertyDefinitions>
+  <views>
+    <diagrams>
+      <view identifier="id-v1" xsi:type="Diagram">
+        <name>Main</name>
+        <node identifier="n1" elementRef="id-actor" xsi:type="Element" x="10" y="20" w="120" h="55"/>
+        <node identifier="n2" xsi:type="Container" x="200" y="0" w="400" h="300">
+          <node identifier="n3" elementRef="id-app" xsi:type="Element" x="220" y="40" w="120" h="55"/>
+        </node>
+      </view>
+      <view identifier="id-v2" xsi:type="Diagram">
+        <node identifier="n4" elementRef="id-actor" xsi:type="Element" x="999" y="999" w="1" h="1"/>
+      </view>
+    </diagrams>
+  </views>
+</model>
+"""
+
+
+def test_second_relationship_between_the_same_pair_is_reported():
+    duplicated = EXCHANGE.replace(
+        b'<relationship identifier="id-r5"',
+        b'<relationship identifier="id-r6" source="id-actor" target="id-app" xsi:type="Flow"/>\n'
+        b'    <relationship identifier="id-r5"',
+    )
+    # In the same batch as the first one, and after it was added to the graph
+    for batch_size in (1000, 1):
+        importer = ExchangeImporter(batch_size=batch_size)
+        importer.feed(duplicated)
+        importer.close()
+        assert importer.report.relationships == 3
+        assert importer.report.skipped_relationships["duplicate_pair"] == 1
+        # The first relationship is kept
+        assert importer.graph.graph.edges["id-actor", "id-app"]["data"].type == RelationshipType.SERVING
+
+
+def test_import_in_small_chunks():
+    # Byte-sized chunks: entries are split anywhere, including inside tags and UTF-8 text
+    importer = import_exchange(EXCHANGE[i:i + 7] for i in range(0, len(EXCHANGE), 7))
+    graph = importer.graph
+
+    assert importer.report.to_dict() == {
+        "model_name": "Retail", "elements": 3, "relationships": 3, "views": 2,
+        "skipped_elements": {"AndJunction": 1, "SomethingElse": 1},
+        "skipped_relationships": {"dangling": 1, "Unheard": 1},
+    }
+    actor = graph.get_element("id-actor")
+    assert actor.name == "Customer" and actor.description == "Buys things"
+    assert actor.attributes == {"Owner": "Sales"}
+
+    edges = {(u, v): data["data"] for u, v, data in graph.graph.edges(data=True)}
+    assert edges[("id-actor", "id-app")].type == RelationshipType.SERVING
+    assert edges[("id-actor", "id-app")].description == "uses"
+    assert edges[("id-app", "id-crm")].bidirectional
+    assert not edges[("id-crm", "id-app")].bidirectional
+
+    nodes = {n["id"]: n for n in importer.to_dict()["nodes"]}
+    assert nodes["id-actor"]["position"] == {"x": 10.0, "y": 20.0}  # First view wins
+    assert nodes["id-app"]["position"] == {"x": 220.0, "y": 40.0} and nodes["id-app"]["width"] == 120.0
+    assert "position" not in nodes["id-crm"]
+
+
+def test_processed_entries_are_dropped_from_the_tree():
+    importer = ExchangeImporter(batch_size=100)
+    tree_sizes = []
+
+    def spy(handler):
+        def measured(elem):
+            # Whole tree at this point: ancestors, the entry being read and its children
+            tree_sizes.append(sum(1 for _ in elem.getroottree().getroot().iter()))
+            handler(elem)
+        return measured
+
+    # View nodes come after the organizations folder tree, which must be gone by then too
+    importer._on_element = spy(importer._on_element)
+    importer._on_node = spy(importer._on_node)
+    data = b"".join(iter_exchange_xml(2_000))
+    for i in range(0, len(data), 4096):
+        importer.feed(data[i:i + 4096])
+    importer.close()
+
+    assert b"<item identifierRef=" in data
+    assert importer.report.elements == 2_000 and len(tree_sizes) == 4_000
+    # Bounded by what one 4 KB chunk holds, not by the size of the file
+    assert max(tree_sizes) < 100
+
+
+def test_import_endpoint():
+    response = client.post("/api/import/archimate", content=EXCHANGE, headers={"Content-Type": "application/xml"})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["report"]["elements"] == 3
+    assert {n["name"] for n in body["graph"]["nodes"]} == {"Customer", "Shop", "CRM"}
+
+    broken = client.post("/api/import/archimate", content=EXCHANGE[:-20])
+    assert broken.status_code == 400
+
+
+def test_import_size_limit(monkeypatch):
+    monkeypatch.setenv("IMPORT_MAX_BYTES", "100")
+    assert client.post("/api/import/archimate", content=EXCHANGE).status_code == 413
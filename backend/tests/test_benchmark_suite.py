@@ -0,0 +1,28 @@
+import json
+from benchmarks import suite
+
+
+def test_suite_writes_comparable_results(tmp_path, monkeypatch):
+    # run_generate_e2e points the app at the replay server; restore the environment afterwards
+    monkeypatch.setenv("OPENROUTER_BASE_URL", "http://unused")
+    monkeypatch.setenv("GENERATION_CACHE_TTL", "0")
+    output = tmp_path / "head.json"
+    assert suite.main([
+        "run", "--sizes", "20", "--only", "extract_json,graph_build,to_dict,generate_e2e",
+        "--repeat", "2", "--requests", "2", "--latency-ms", "0", "--output", str(output),
+    ]) == 0
+
+    report = json.loads(output.read_text())
+    rows = {r["benchmark"]: r for r in report["results"]}
+    assert set(rows) == {"extract_json", "graph_build", "to_dict", "generate_e2e"}
+    assert rows["graph_build"]["size"] == 20 and rows["graph_build"]["runs"] == 2
+    assert rows["generate_e2e"]["size"] == 21  # elements in the recorded answer
+    assert report["environment"]["python"]
+
+    # A base twice as fast as head is a regression
+    base = {"results": [{**r, "median_s": r["median_s"] / 2} for r in report["results"]]}
+    base_path = tmp_path / "base.json"
+    base_path.write_text(json.dumps(base))
+    assert {r["status"] for r in suite.compare(base, report)} == {"slower"}
+    assert suite.main(["compare", str(base_path), str(output)]) == 1
+    assert suite.main(["compare", str(output), str(output)]) == 0
@@ -0,0 +1,82 @@
+import asyncio
+import json
+from unittest.mock import patch
+from app.core.prompts import PLANNING_PROMPT
+from app.services.generation_service import GenerationService
+
+
+def reply(data):
+    return {"choices": [{"message": {"content": json.dumps(data)}, "finish_reason": "stop"}]}
+
+
+PLAN = {"zones": [
+    {"name": "Payment Domain", "description": "payments"},
+    {"name": "Customer Domain", "description": "customers"},
+    {"name": "payment domain", "description": "duplicate"},
+]}
+
+ZONES = {
+    "Payment Domain": {
+        "application_layer": [
+            {"type": "ApplicationComponent", "name": "Payment API", "description": ""},
+            {"type": "ApplicationComponent", "name": "Shared Ledger", "description": ""},
+        ],
+        "relationships": [
+            # Cross-zone: target is defined by the other zone
+            {"source": "Payment API", "target": "CRM", "type": "Flow", "description": "reads customer"},
+        ],
+    },
+    "Customer Domain": {
+        "application_layer": [
+            {"type": "ApplicationComponent", "name": "CRM", "description": ""},
+            {"type": "ApplicationComponent", "name": "shared ledger", "description": "duplicate"},
+        ],
+        "relationships": [
+            {"source": "CRM", "target": "Shared Ledger", "type": "Flow", "description": "writes"},
+            {"source": "CRM", "target": "Nowhere", "type": "Flow", "description": "unknown"},
+        ],
+    },
+}
+
+
+def fake_llm(active=None):
+    async def generate_response(self, prompt, system_prompt, model, priority, json_schema):
+        if system_prompt == PLANNING_PROMPT:
+            return reply(PLAN)
+        zone = next(name for name in ZONES if f'ZONE: model ONLY the zone "{name}"' in prompt)
+        if active is not None:
+            active["now"] += 1
+            active["max"] = max(active["max"], active["now"])
+            await asyncio.sleep(0.02)
+            active["now"] -= 1
+        return reply(ZONES[zone])
+    return generate_response
+
+
+def run(service, **kwargs):
+    return asyncio.run(service.generate_architecture("Whole enterprise", mode="chunked", **kwargs))
+
+
+def test_chunked_generation_merges_zones():
+    with patch("app.services.llm_service.LLMService.generate_response", fake_llm()):
+        result = run(GenerationService())
+
+    names = sorted(n["name"] for n in result["nodes"])
+    assert names == ["CRM", "Customer Domain", "Payment API", "Payment Domain", "Shared Ledger"]
+    ids = {n["name"]: n["id"] for n in result["nodes"]}
+    edges = {(e["source_id"], e["target_id"], e["type"]) for e in result["edges"]}
+    assert (ids["Payment Domain"], ids["Payment API"], "Composition") in edges
+    # The deduplicated element stays in the zone that defined it first
+    assert (ids["Payment Domain"], ids["Shared Ledger"], "Composition") in edges
+    assert (ids["Customer Domain"], ids["Shared Ledger"], "Composition") not in edges
+    # Cross-zone relationships are reconciled after the merge
+    assert (ids["Payment API"], ids["CRM"], "Flow") in edges
+    assert (ids["CRM"], ids["Shared Ledger"], "Flow") in edges
+    assert len(result["edges"]) == 5
+
+
+def test_zones_are_generated_concurrently():
+    active = {"now": 0, "max": 0}
+    with patch("app.services.llm_service.LLMService.generate_response", fake_llm(active)):
+        run(GenerationService(), model="concurrency/test")
+    assert active["max"] == 2
@@ -0,0 +1,95 @@
+import gzip
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from app.api.conditional import conditional_json_response, etag_matches, make_etag
+from app.api.middleware import CompressionMiddleware
+
+PAYLOAD = {
+    "graph": {
+        "nodes": [{"id": str(i), "name": f"Component {i}", "type": "ApplicationComponent"} for i in range(100)],
+        "edges": []
+    }
+}
+
+
+def build_app(**options):
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, **options)
+
+    @app.get("/graph")
+    def graph(request: Request):
+        return conditional_json_response(request, PAYLOAD)
+
+    @app.post("/graph")
+    def post_graph(request: Request):
+        return conditional_json_response(request, PAYLOAD)
+
+    @app.get("/small")
+    def small():
+        return {"ok": True}
+
+    return app
+
+
+def test_gzip_above_threshold():
+    client = TestClient(build_app(encodings=("gzip",)))
+    response = client.get("/graph", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert int(response.headers["content-length"]) < len(response.content)
+    assert response.json() == PAYLOAD
+
+
+def test_small_response_not_compressed():
+    client = TestClient(build_app(encodings=("gzip",)))
+    response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+
+
+def test_identity_when_client_does_not_accept():
+    client = TestClient(build_app(encodings=("gzip",)))
+    response = client.get("/graph", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+
+
+def test_brotli_preferred_when_available():
+    pytest.importorskip("brotli")
+    client = TestClient(build_app())
+    response = client.get("/graph", headers={"Accept-Encoding": "gzip, br"})
+    assert response.headers["content-encoding"] == "br"
+
+
+def test_etag_and_304():
+    client = TestClient(build_app(encodings=("gzip",)))
+    first = client.get("/graph", headers={"Accept-Encoding": "gzip"})
+    etag = first.headers["etag"]
+    assert etag == make_etag(PAYLOAD)[:-1] + '-gzip"'
+
+    second = client.get("/graph", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.content == b""
+
+    # Same validator without the encoding suffix also matches
+    third = client.get("/graph", headers={"Accept-Encoding": "identity", "If-None-Match": make_etag(PAYLOAD)})
+    assert third.status_code == 304
+
+    # Not on POST: a match there would owe a 412, the body is sent instead
+    posted = client.post("/graph", headers={"Accept-Encoding": "identity", "If-None-Match": make_etag(PAYLOAD)})
+    assert posted.status_code == 200 and posted.headers["etag"] == make_etag(PAYLOAD)
+
+
+def test_etag_is_independent_of_key_order_and_sets():
+    a = {"nodes": [{"name": "A", "tags": {"x", "y", "z"}}], "edges": []}
+    b = {"edges": [], "nodes": [{"tags": {"z", "y", "x"}, "name": "A"}]}
+    assert make_etag(a) == make_etag(b)
+    assert etag_matches(f'"other", {make_etag(a)}', make_etag(b))
+    assert not etag_matches('"other"', make_etag(a))
+
+
+def test_gzip_roundtrip_matches_identity():
+    client = TestClient(build_app(encodings=("gzip",), minimum_size=0))
+    identity = client.get("/graph", headers={"Accept-Encoding": "identity"})
+    encoded = CompressionMiddleware(None, encodings=("gzip",)).compress(identity.content, "gzip")
+    assert gzip.decompress(encoded) == identity.content
@@ -0,0 +1,70 @@
+import asyncio
+import json
+import time
+from app.core.metrics import CLIENT_DISCONNECTS, UPSTREAM_CANCELLED, UPSTREAM_SAVED_SECONDS
+from app.core.resilience import LatencyTracker
+from app.main import app
+from app.services import llm_service
+from tests.stub_server import StubOpenRouter, completion
+
+SLOW = (200, {}, completion('{"business_layer": []}'), 3.0)
+
+
+async def call(path, payload, disconnect_after):
+    """Drive the ASGI app directly, with a client that hangs up after `disconnect_after` seconds."""
+    messages = [{"type": "http.request", "body": json.dumps(payload).encode(), "more_body": False}]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.sleep(disconnect_after)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"content-type", b"application/json"), (b"host", b"test")],
+        "client": ("127.0.0.1", 50000), "server": ("test", 80),
+    }
+    await app(scope, receive, send)
+    return sent
+
+
+def test_disconnect_aborts_the_upstream_call(monkeypatch):
+    latencies = LatencyTracker()
+    latencies.observe("slow/model", 3.0)
+    monkeypatch.setattr(llm_service, "_upstream_latencies", latencies)
+    monkeypatch.setenv("GENERATION_CACHE_TTL", "0")
+    disconnects = CLIENT_DISCONNECTS.value(endpoint="generate")
+    cancelled = UPSTREAM_CANCELLED.value(model="other")
+    saved = UPSTREAM_SAVED_SECONDS.value(model="other")
+
+    with StubOpenRouter({"slow/model": [SLOW]}) as stub:
+        monkeypatch.setenv("OPENROUTER_BASE_URL", stub.base_url)
+        start = time.perf_counter()
+        sent = asyncio.run(call("/api/generate", {"prompt": "Abandoned", "model": "slow/model"}, disconnect_after=0.3))
+        elapsed = time.perf_counter() - start
+
+    assert elapsed < 2.0
+    assert sent[0]["status"] == 499
+    assert CLIENT_DISCONNECTS.value(endpoint="generate") == disconnects + 1
+    assert UPSTREAM_CANCELLED.value(model="other") == cancelled + 1
+    # Median of 3s, about 0.3s already spent
+    assert 2.0 < UPSTREAM_SAVED_SECONDS.value(model="other") - saved < 2.9
+
+
+def test_connected_client_gets_the_result(monkeypatch):
+    monkeypatch.setenv("GENERATION_CACHE_TTL", "0")
+    quick = (200, {}, completion(json.dumps({
+        "business_layer": [{"type": "BusinessActor", "name": "Customer", "description": ""}], "relationships": []
+    })), 0.05)
+    with StubOpenRouter({"quick/model": [quick]}) as stub:
+        monkeypatch.setenv("OPENROUTER_BASE_URL", stub.base_url)
+        sent = asyncio.run(call("/api/generate", {"prompt": "Kept", "model": "quick/model"}, disconnect_after=5))
+
+    assert sent[0]["status"] == 200
+    assert json.loads(sent[1]["body"])["graph"]["nodes"][0]["name"] == "Customer"
@@ -0,0 +1,89 @@
+import asyncio
+import json
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from app.core.graph_summary import summarize_graph
+from app.main import app
+
+GRAPH = {
+    "nodes": [
+        {"id": "n1", "name": "Customer", "type": "BusinessActor", "layer": "Business", "description": ""},
+        {"id": "n2", "name": "Web Shop", "type": "ApplicationComponent", "layer": "Application", "description": ""},
+        {"id": "n3", "name": "Warehouse", "type": "Location", "layer": "Composite", "description": ""},
+    ],
+    "edges": [
+        {"source_id": "n2", "target_id": "n1", "type": "Serving", "description": "sells"},
+    ],
+}
+
+ADDITIONS = {
+    "application_layer": [
+        {"type": "ApplicationComponent", "name": "Payment API", "description": "new"},
+        {"type": "ApplicationComponent", "name": "web shop", "description": "repeated"},
+    ],
+    "relationships": [
+        {"source": "Web Shop", "target": "Payment API", "type": "Flow", "description": "charges card"},
+    ],
+}
+
+
+def test_summary_is_compact_and_scoped():
+    summary = summarize_graph(GRAPH)
+    assert "ApplicationComponent: Web Shop" in summary
+    assert "Web Shop -Serving-> Customer" in summary
+
+    scoped = summarize_graph(GRAPH, selected_ids=["n1"])
+    assert "Web Shop" in scoped  # neighbour of the selection
+    assert "Warehouse" not in scoped
+    assert "(+1 other elements not shown)" in scoped
+
+    capped = summarize_graph(GRAPH, max_relationships=0)
+    assert "(+1 more: Serving 1)" in capped
+
+
+def test_extend_merges_additions_preserving_ids():
+    prompts = []
+
+    async def generate_response(self, prompt, system_prompt, model, priority, json_schema):
+        prompts.append(prompt)
+        return {"choices": [{"message": {"content": json.dumps(ADDITIONS)}, "finish_reason": "stop"}]}
+
+    with patch("app.services.llm_service.LLMService.generate_response", generate_response):
+        response = TestClient(app).post("/api/extend", json={"graph": GRAPH, "instruction": "Add payments"})
+
+    assert response.status_code == 200
+    body = response.json()
+    nodes = {n["name"]: n["id"] for n in body["graph"]["nodes"]}
+    assert {nodes["Customer"], nodes["Web Shop"], nodes["Warehouse"]} == {"n1", "n2", "n3"}
+    assert len(nodes) == 4
+    assert body["added_node_ids"] == [nodes["Payment API"]]
+    edges = {(e["source_id"], e["target_id"], e["type"]) for e in body["graph"]["edges"]}
+    assert edges == {("n2", "n1", "Serving"), ("n2", nodes["Payment API"], "Flow")}
+    assert "INSTRUCTION: Add payments" in prompts[0]
+    assert "Customer" in prompts[0]
+
+
+def test_extend_reports_what_it_could_not_load():
+    graph = {
+        "nodes": GRAPH["nodes"] + [{"id": "n4", "name": "Legacy", "type": "Mainframe"}],
+        "edges": GRAPH["edges"] + [
+            {"source_id": "n1", "target_id": "n3", "type": "Teleports"},
+            {"source_id": "n4", "target_id": "n1", "type": "Serving"},
+        ],
+    }
+
+    async def generate_response(self, prompt, system_prompt, model, priority, json_schema):
+        return {"choices": [{"message": {"content": json.dumps(ADDITIONS)}, "finish_reason": "stop"}]}
+
+    with patch("app.services.llm_service.LLMService.generate_response", generate_response):
+        response = TestClient(app).post("/api/extend", json={"graph": graph, "instruction": "Add payments"})
+
+    # One bad edge from the canvas no longer fails the whole request
+    assert response.status_code == 200
+    assert response.json()["dropped"] == {
+        "node_ids": ["n4"],
+        "edges": [
+            {"source_id": "n1", "target_id": "n3", "type": "Teleports"},
+            {"source_id": "n4", "target_id": "n1", "type": "Serving"},
+        ],
+    }
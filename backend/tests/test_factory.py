@@ -0,0 +1,45 @@
+import pytest
+from app.core.factory import ElementFactory
+from app.core.metamodel import ApplicationComponent, BusinessActor, ElementType
+
+
+@pytest.mark.parametrize("spelling", [
+    "ApplicationComponent", "Application Component", "application-component",
+    "APPLICATION_COMPONENT", " applicationcomponent ", ElementType.APPLICATION_COMPONENT,
+])
+def test_type_dispatch_is_case_and_format_insensitive(spelling):
+    assert ElementFactory.resolve_type(spelling) is ApplicationComponent
+
+
+def test_every_element_type_is_mapped():
+    for member in ElementType:
+        assert ElementFactory.resolve_type(member.value).model_fields["type"].default == member
+
+
+def test_unknown_types():
+    assert ElementFactory.resolve_type("Spaceship") is None
+    assert ElementFactory.resolve_type(None) is None
+    assert ElementFactory.create_element("Spaceship", "x") is None
+
+
+def test_spelling_memo_is_bounded(monkeypatch):
+    monkeypatch.setattr(ElementFactory, "_resolved", dict(ElementFactory._mapping))
+    monkeypatch.setattr(ElementFactory, "RESOLVED_MAX_SIZE", len(ElementFactory._mapping) + 10)
+    for i in range(100):
+        spelling = "application" + " " * i + "component"
+        assert ElementFactory.resolve_type(spelling) is ApplicationComponent
+    assert len(ElementFactory._resolved) == ElementFactory.RESOLVED_MAX_SIZE
+
+
+def test_create_elements_batch():
+    rows = [
+        {"id": "a1", "type": "Business Actor", "name": "Customer", "tags": ["external"]},
+        {"type": "Spaceship", "name": "Unknown"},
+        {"type": "ApplicationComponent", "name": "CRM", "description": "desc", "attributes": {"vendor": "X"}},
+    ]
+    actor, unknown, crm = ElementFactory.create_elements(rows)
+
+    assert isinstance(actor, BusinessActor) and actor.id == "a1" and actor.tags == {"external"}
+    assert unknown is None
+    assert crm.id and crm.attributes == {"vendor": "X"}
+    assert crm.model_dump(exclude={"id"}) == ApplicationComponent(name="CRM", description="desc", attributes={"vendor": "X"}).model_dump(exclude={"id"})
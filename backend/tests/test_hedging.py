@@ -0,0 +1,100 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import patch
+from app.core.metrics import LLM_HEDGES
+from app.core.resilience import HedgePolicy, LatencyTracker
+from app.services import generation_service
+from app.services.generation_service import GenerationService
+
+GRAPH = {"business_layer": [{"type": "BusinessActor", "name": "Customer", "description": ""}], "relationships": []}
+
+
+def reply(data):
+    return {"choices": [{"message": {"content": json.dumps(data)}, "finish_reason": "stop"}]}
+
+
+@pytest.fixture(autouse=True)
+def no_cache(monkeypatch):
+    monkeypatch.setenv("GENERATION_CACHE_TTL", "0")
+    monkeypatch.setattr(generation_service, "_latencies", LatencyTracker())
+
+
+def scripted(delays, cancelled, failing=()):
+    """generate_response stand-in: answers after delays[model] seconds, notes cancellations."""
+    async def generate_response(prompt, system_prompt, model, **kwargs):
+        try:
+            await asyncio.sleep(delays[model])
+        except asyncio.CancelledError:
+            cancelled.append(model)
+            raise
+        if model in failing:
+            return {"choices": [{"message": {"content": "no json here"}, "finish_reason": "stop"}]}
+        return reply({**GRAPH, "business_layer": [{**GRAPH["business_layer"][0], "name": f"Customer ({model})"}]})
+    return generate_response
+
+
+def generate(delays, failing=(), prompt="Hedge me"):
+    cancelled = []
+    service = GenerationService()
+    service.hedge_policy = HedgePolicy(["backup"], default_delay=0.05, min_delay=0.0)
+    with patch.object(service.llm_service, "generate_response", side_effect=scripted(delays, cancelled, failing)):
+        result = asyncio.run(service.generate_architecture(prompt, model="primary"))
+    return result["nodes"][0]["name"], cancelled
+
+
+def test_slow_primary_is_hedged_and_cancelled():
+    before = LLM_HEDGES.value(model="other", outcome="backup")
+    winner, cancelled = generate({"primary": 5.0, "backup": 0.01})
+    assert winner == "Customer (backup)"
+    assert cancelled == ["primary"]
+    assert LLM_HEDGES.value(model="other", outcome="backup") == before + 1
+    # The cancelled primary's time is not a latency
+    assert (generation_service._latencies.count("primary"), generation_service._latencies.count("backup")) == (0, 1)
+
+
+def test_fast_primary_is_not_hedged():
+    before = LLM_HEDGES.value(model="other", outcome="unhedged")
+    winner, cancelled = generate({"primary": 0.0, "backup": 0.0})
+    assert winner == "Customer (primary)" and cancelled == []
+    assert LLM_HEDGES.value(model="other", outcome="unhedged") == before + 1
+
+
+def test_unparseable_answer_does_not_win():
+    winner, cancelled = generate({"primary": 0.1, "backup": 0.15}, failing=("primary",))
+    assert winner == "Customer (backup)" and cancelled == []
+
+    with pytest.raises(ValueError):
+        generate({"primary": 0.1, "backup": 0.15}, failing=("primary", "backup"), prompt="Both fail")
+
+
+def test_early_failure_is_hedged_at_once():
+    before = LLM_HEDGES.value(model="other", outcome="backup")
+    winner, cancelled = generate({"primary": 0.0, "backup": 0.0}, failing=("primary",), prompt="Fails fast")
+    assert winner == "Customer (backup)" and cancelled == []
+    assert LLM_HEDGES.value(model="other", outcome="backup") == before + 1
+
+
+def test_percentile_is_nearest_rank():
+    latencies = LatencyTracker()
+    for seconds in range(1, 11):
+        latencies.observe("m", float(seconds))
+    assert latencies.percentile("m", 90) == 9.0
+    assert latencies.percentile("m", 50) == 5.0
+    assert latencies.percentile("m", 100) == 10.0
+    assert latencies.percentile("m", 0) == 1.0
+
+
+def test_hedge_delay_follows_latency_percentile():
+    policy = HedgePolicy(["backup"], percentile=90, default_delay=20, min_delay=0.5, max_delay=30, min_samples=10)
+    latencies = LatencyTracker()
+    for i in range(5):
+        latencies.observe("primary", 1.0)
+    assert policy.delay("primary", latencies) == 20  # Not enough samples yet
+
+    for seconds in range(1, 11):
+        latencies.observe("primary", float(seconds))
+    assert policy.delay("primary", latencies) == 9.0
+    assert policy.delay("other", latencies) == 20
+    assert policy.backup_for("backup") is None and policy.backup_for("primary") == "backup"
+    assert HedgePolicy([], min_delay=0.5).delay("primary", LatencyTracker()) == 20
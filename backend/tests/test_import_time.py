@@ -0,0 +1,27 @@
+import os
+from fastapi.testclient import TestClient
+from benchmarks.bench_import_time import LAZY_MODULES, import_profile, summarize
+
+# Time spent in our own modules while importing app.main (framework imports excluded)
+APP_IMPORT_BUDGET_MS = float(os.getenv("APP_IMPORT_BUDGET_MS", "250"))
+
+
+def test_startup_does_not_import_heavy_subsystems():
+    rows = import_profile("app.main")
+    modules = {name for name, _, _ in rows}
+    # Routers, middleware and metrics load with the app (routes are registered at startup)...
+    assert {"app.api.endpoints.export", "app.api.endpoints.imports", "app.api.middleware", "app.core.metrics"} <= modules
+    # ...the libraries behind them only on first use
+    loaded = {name.split(".")[0] for name in modules}
+    assert not loaded & set(LAZY_MODULES)
+    assert summarize(rows)["app_self_ms"] < APP_IMPORT_BUDGET_MS
+
+
+def test_preload_on_startup(monkeypatch):
+    monkeypatch.setenv("PRELOAD_ON_STARTUP", "true")
+    from app.core.metamodel import ApplicationComponent
+    from app.main import app
+
+    with TestClient(app) as client:
+        assert client.get("/health").status_code == 200
+    assert ApplicationComponent.__pydantic_complete__
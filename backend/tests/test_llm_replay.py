@@ -0,0 +1,79 @@
+import asyncio
+import json
+import time
+import httpx
+import pytest
+from app.services.llm_replay import (
+    RecordingNotFound, RecordingStore, RecordingTransport, ReplayTransport, request_fingerprint
+)
+from app.services.llm_service import LLMService
+from benchmarks.openrouter_stub import ReplayOpenRouter, load_recordings
+from tests.stub_server import StubOpenRouter, completion
+
+
+def generate(prompt="prompt"):
+    return asyncio.run(LLMService().generate_response(prompt, "system", model="rec/model", fallback_models=[]))
+
+
+def test_record_then_replay_without_network(tmp_path, monkeypatch):
+    monkeypatch.setenv("LLM_RECORD_DIR", str(tmp_path))
+    monkeypatch.setenv("LLM_RECORD_MODE", "record")
+    with StubOpenRouter({"rec/model": [(200, {}, completion('{"business_layer": []}'), 0)]}) as stub:
+        monkeypatch.setenv("OPENROUTER_BASE_URL", stub.base_url)
+        recorded = generate()
+
+    (entry,) = RecordingStore(str(tmp_path)).entries()  # Index reloaded from disk
+    assert entry["model"] == "rec/model" and entry["status"] == 200 and entry["path"].endswith("/chat/completions")
+
+    # The stub is gone: only the recording can answer, whatever the base URL
+    monkeypatch.setenv("LLM_RECORD_MODE", "replay")
+    monkeypatch.setenv("OPENROUTER_BASE_URL", "http://127.0.0.1:9")
+    assert generate() == recorded
+
+    with pytest.raises(RecordingNotFound):
+        generate("a prompt never recorded")
+
+
+def test_replay_or_record_fills_the_gaps(tmp_path, monkeypatch):
+    monkeypatch.setenv("LLM_RECORD_DIR", str(tmp_path))
+    monkeypatch.setenv("LLM_RECORD_MODE", "replay_or_record")
+    with StubOpenRouter({"rec/model": [(200, {}, completion("{}"), 0)]}) as stub:
+        monkeypatch.setenv("OPENROUTER_BASE_URL", stub.base_url)
+        generate()
+        generate()
+        assert stub.calls_for("rec/model") == 1
+
+
+def test_fingerprint_ignores_host_and_headers():
+    body = {"model": "m", "messages": [{"role": "user", "content": "hi"}]}
+    a = httpx.Request("POST", "https://openrouter.ai/api/v1/chat/completions", json=body, headers={"Authorization": "Bearer a"})
+    b = httpx.Request("POST", "http://localhost:1/api/v1/chat/completions", json=dict(reversed(body.items())))
+    c = httpx.Request("POST", "http://localhost:1/api/v1/chat/completions", json={**body, "stream": True})
+    assert request_fingerprint(a) == request_fingerprint(b) != request_fingerprint(c)
+
+
+def test_streamed_chunks_replay_with_scaled_timing(tmp_path):
+    store = RecordingStore(str(tmp_path))
+    body = {"model": "stream/model", "stream": True, "messages": []}
+
+    async def consume(transport, base_url):
+        chunks, started = [], time.perf_counter()
+        async with httpx.AsyncClient(transport=transport) as client:
+            async with client.stream("POST", f"{base_url}/chat/completions", json=body) as response:
+                async for line in response.aiter_lines():
+                    if line.startswith("data: "):
+                        chunks.append(line[6:])
+        return chunks, time.perf_counter() - started
+
+    with ReplayOpenRouter(load_recordings(), latency_ms=300, chunk_chars=400) as stub:
+        live, live_s = asyncio.run(consume(RecordingTransport(store), stub.base_url))
+
+    (entry,) = store.entries()
+    assert entry["stream"] and entry["chunks"] > 2 and 0.05 < entry["first_chunk_s"] < entry["elapsed_s"]
+
+    replayed, replay_s = asyncio.run(consume(ReplayTransport(store, time_scale=1.0), "http://offline"))
+    fast, fast_s = asyncio.run(consume(ReplayTransport(store, time_scale=0), "http://offline"))
+    assert replayed == fast == live and live[-1] == "[DONE]"
+    assert json.loads(live[0])["choices"][0]["delta"]["content"]
+    assert replay_s >= 0.8 * entry["elapsed_s"]
+    assert fast_s < replay_s / 3
@@ -0,0 +1,48 @@
+import asyncio
+import json
+import time
+import httpx
+from benchmarks.loadtest import LoopLagMonitor, run_load_test
+from benchmarks.openrouter_stub import ReplayOpenRouter, load_recordings
+
+
+def test_lag_monitor_sees_blocking_code():
+    async def main():
+        monitor = LoopLagMonitor(interval=0.005)
+        monitor.start()
+        await asyncio.sleep(0.05)
+        time.sleep(0.2)  # Synchronous work on the loop
+        await asyncio.sleep(0.05)
+        return await monitor.stop()
+
+    lag = asyncio.run(main())
+    assert max(lag) >= 0.15
+    assert sorted(lag)[len(lag) // 2] < 0.05
+
+
+def test_export_does_not_block_the_loop(monkeypatch):
+    monkeypatch.setenv("OPENROUTER_BASE_URL", "http://unused")
+    # The slow writer, so the deck takes long enough that building it on the loop would show up
+    monkeypatch.setenv("PPTX_WRITER", "python-pptx")
+    report = asyncio.run(run_load_test(
+        ["models", "export_pptx"], concurrency=2, requests=4, duration=None,
+        latency_ms=0, latency_scale=1.0, export_elements=40,
+    ))
+    results = {r["scenario"]: r for r in report["results"]}
+    assert all(r["requests"] == 4 and not r["errors"] for r in results.values())
+    # Built in the threadpool
+    assert not results["export_pptx"]["blocking"]
+    assert not results["models"]["blocking"]
+    assert results["models"]["latency_ms"]["p50"] <= results["models"]["latency_ms"]["p99"]
+
+
+def test_replay_stub_streams_recorded_content():
+    recording = load_recordings()[0]
+    with ReplayOpenRouter([recording], latency_ms=30, chunk_chars=500) as stub:
+        with httpx.stream("POST", f"{stub.base_url}/chat/completions", json={"model": "m", "stream": True}) as response:
+            events = [line[6:] for line in response.iter_lines() if line.startswith("data: ")]
+
+    assert events[-1] == "[DONE]"
+    content = "".join(json.loads(e)["choices"][0]["delta"]["content"] for e in events[:-1])
+    assert content == recording["response"]["choices"][0]["message"]["content"]
+    assert len(events) > 2
@@ -0,0 +1,85 @@
+import asyncio
+import json
+import re
+from unittest.mock import AsyncMock, patch
+from fastapi.testclient import TestClient
+from app.core.metrics import Counter, Gauge, Histogram, Registry, STAGE_SECONDS
+from app.main import app
+
+
+def test_exposition_format():
+    registry = Registry()
+    requests = registry.counter("demo_requests_total", "Requests", ["status"])
+    in_flight = registry.gauge("demo_in_flight", "In flight")
+    latency = registry.histogram("demo_seconds", "Latency", buckets=(0.1, 1.0))
+
+    requests.inc(status="200")
+    requests.inc(2, status="200")
+    with in_flight.track_inprogress():
+        assert in_flight.value() == 1
+    latency.observe(0.1)
+    latency.observe(0.5)
+    latency.observe(3)
+
+    text = registry.exposition()
+    assert "# TYPE demo_requests_total counter" in text
+    assert 'demo_requests_total{status="200"} 3' in text
+    assert "demo_in_flight 0" in text
+    assert 'demo_seconds_bucket{le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{le="1"} 2' in text
+    assert 'demo_seconds_bucket{le="+Inf"} 3' in text
+    assert "demo_seconds_count 3" in text
+    assert "demo_seconds_sum 3.6" in text
+
+
+def test_labels_are_checked():
+    counter = Counter("c_total", "c", ["model"])
+    try:
+        counter.inc(stage="x")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("missing label accepted")
+
+
+def test_generate_request_records_stages(monkeypatch):
+    monkeypatch.setenv("GENERATION_CACHE_TTL", "300")
+    content = json.dumps({"business_layer": [{"type": "BusinessActor", "name": "Customer", "description": ""}], "relationships": []})
+    response = {"choices": [{"message": {"content": content}}], "usage": {"prompt_tokens": 10, "completion_tokens": 5}}
+    before = {stage: STAGE_SECONDS.count(stage=stage) for stage in ("llm_call", "parse", "graph_build", "compliance", "serialize")}
+
+    client = TestClient(app)
+    with patch("app.services.llm_service.LLMService.generate_response", new_callable=AsyncMock) as mock_generate:
+        mock_generate.return_value = response
+        assert client.post("/api/generate", json={"prompt": "metrics", "model": "metrics/test"}).status_code == 200
+
+    for stage, count in before.items():
+        assert STAGE_SECONDS.count(stage=stage) == count + 1, stage
+
+    text = client.get("/metrics").text
+    assert re.search(r'drawtogaf_stage_duration_seconds_count\{stage="llm_call"\} \d+', text)
+    assert 'drawtogaf_cache_lookups_total{namespace="generation",result="miss"} 1' in text
+    assert 'drawtogaf_in_flight_requests{endpoint="generate"} 0' in text
+    assert "# TYPE drawtogaf_cache_lookups_total counter" in text
+
+
+def test_upstream_calls_and_tokens_are_counted(monkeypatch):
+    from app.core.metrics import UPSTREAM_REQUESTS, UPSTREAM_TOKENS
+    from app.services import llm_service
+    from app.services.llm_service import LLMService
+    from tests.stub_server import StubOpenRouter, completion
+
+    # Only catalogue models get their own series
+    monkeypatch.setattr(llm_service, "_loaded_catalogue_entry", lambda model: {"id": model} if model == "metrics/tokens" else None)
+    other = UPSTREAM_REQUESTS.value(model="other", status="200")
+    with StubOpenRouter({"metrics/tokens": [(200, {}, completion("{}"), 0)],
+                         "metrics/unknown": [(200, {}, completion("{}"), 0)]}) as stub:
+        monkeypatch.setenv("OPENROUTER_BASE_URL", stub.base_url)
+        asyncio.run(LLMService().generate_response("p", "s", model="metrics/tokens", fallback_models=[]))
+        asyncio.run(LLMService().generate_response("p", "s", model="metrics/unknown", fallback_models=[]))
+
+    assert UPSTREAM_REQUESTS.value(model="other", status="200") == other + 1
+    assert UPSTREAM_REQUESTS.value(model="metrics/unknown", status="200") == 0
+    assert UPSTREAM_REQUESTS.value(model="metrics/tokens", status="200") == 1
+    assert UPSTREAM_TOKENS.value(model="metrics/tokens", kind="prompt") == 10
+    assert UPSTREAM_TOKENS.value(model="metrics/tokens", kind="completion") == 20
@@ -0,0 +1,160 @@
+import asyncio
+import time
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services import model_catalogue
+from app.services.model_catalogue import ModelCatalogue
+
+MODELS = {
+    "data": [
+        {"id": "openai/gpt-4o", "name": "GPT-4o", "context_length": 128000, "pricing": {"prompt": "0.000005", "completion": "0.000015"}},
+        {"id": "tngtech/deepseek-r1t2-chimera:free", "name": "DeepSeek R1T2 Chimera (free)", "context_length": 163840, "pricing": {"prompt": "0", "completion": "0"}},
+    ]
+}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_catalogue(clock, fail=False):
+    calls = {"n": 0}
+
+    async def fetch():
+        calls["n"] += 1
+        await asyncio.sleep(0)
+        if fail and calls["n"] > 1:
+            raise RuntimeError("OpenRouter down")
+        return MODELS
+
+    return ModelCatalogue(fetch, ttl=10, stale_ttl=100, clock=clock), calls
+
+
+def test_fresh_hits_do_not_refetch():
+    clock = FakeClock()
+    catalogue, calls = make_catalogue(clock)
+
+    async def scenario():
+        first = await catalogue.view()
+        second = await catalogue.view()
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert calls["n"] == 1
+    assert first is second
+    assert catalogue.stats["hits"] == 1
+
+
+def test_stale_served_while_refreshing_in_background():
+    clock = FakeClock()
+    catalogue, calls = make_catalogue(clock)
+
+    async def scenario():
+        await catalogue.view()
+        clock.now = 50  # past ttl, within stale window
+        stale = await catalogue.view()
+        await asyncio.sleep(0.01)  # let the background refresh run
+        return stale
+
+    stale = asyncio.run(scenario())
+    assert stale.count == 2
+    assert calls["n"] == 2
+    assert catalogue.stats["stale_hits"] == 1
+
+
+def test_expired_snapshot_served_when_refresh_fails():
+    clock = FakeClock()
+    catalogue, calls = make_catalogue(clock, fail=True)
+
+    async def scenario():
+        await catalogue.view()
+        clock.now = 1000
+        return await catalogue.view()
+
+    view = asyncio.run(scenario())
+    assert view.count == 2
+    assert calls["n"] == 2
+
+
+def test_loaded_model_never_fetches(monkeypatch):
+    from app.services.llm_service import model_label
+
+    monkeypatch.setattr(model_catalogue, "_catalogue", None)
+    assert model_label("openai/gpt-4o") == "other"
+    assert model_catalogue._catalogue is None  # Labelling does not even create the catalogue
+
+    clock = FakeClock()
+    catalogue, calls = make_catalogue(clock)
+
+    async def scenario():
+        cold = catalogue.loaded_model("openai/gpt-4o")
+        await catalogue.view()
+        clock.now = 500  # expired
+        expired = catalogue.loaded_model("openai/gpt-4o")
+        await asyncio.sleep(0)
+        return cold, expired
+
+    cold, expired = asyncio.run(scenario())
+    assert cold is None and expired["name"] == "GPT-4o"
+    assert calls["n"] == 1
+
+
+def test_projection_and_free_filter():
+    catalogue, _ = make_catalogue(FakeClock())
+
+    async def scenario():
+        return await catalogue.view(fields=("id", "name"), free_only=True), await catalogue.get_model("openai/gpt-4o")
+
+    view, model = asyncio.run(scenario())
+    assert view.count == 1
+    assert b"context_length" not in view.body
+    assert b"chimera:free" in view.body
+    assert model["context_length"] == 128000
+
+
+def test_arbitrary_fields_do_not_grow_the_views():
+    catalogue, _ = make_catalogue(FakeClock())
+
+    async def scenario():
+        first = await catalogue.view(fields=("name", "id", "bogus"))
+        second = await catalogue.view(fields=("id", "name"))
+        for i in range(100):
+            await catalogue.view(fields=("id", f"junk{i}"))
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first is second  # Unknown fields dropped, known ones in catalogue order
+    assert first.body.startswith(b'{"data":[{"id":')
+    assert len(catalogue._snapshot.views) == 2
+
+
+def test_warm_view_is_sub_millisecond():
+    catalogue, _ = make_catalogue(FakeClock())
+
+    async def scenario():
+        await catalogue.view(fields=("id", "name"))
+        start = time.perf_counter()
+        for _ in range(1000):
+            await catalogue.view(fields=("id", "name"))
+        return (time.perf_counter() - start) / 1000
+
+    assert asyncio.run(scenario()) < 0.001
+
+
+def test_models_endpoint_etag(monkeypatch):
+    catalogue, calls = make_catalogue(FakeClock())
+    monkeypatch.setattr(model_catalogue, "_catalogue", catalogue)
+    client = TestClient(app)
+
+    response = client.get("/api/models?fields=id,name")
+    assert response.status_code == 200
+    assert response.json()["data"][0] == {"id": "openai/gpt-4o", "name": "GPT-4o"}
+
+    revalidated = client.get("/api/models?fields=id,name", headers={"If-None-Match": response.headers["etag"]})
+    assert revalidated.status_code == 304
+    assert calls["n"] == 1
@@ -0,0 +1,58 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, patch
+from app.core.name_index import NameIndex, normalize_name
+from app.services.generation_service import GenerationService
+
+
+def test_normalize_folds_accents_case_and_punctuation():
+    assert normalize_name("  Gestion   des Clients ") == "gestion des clients"
+    assert normalize_name("Système de Facturation") == "systeme de facturation"
+    assert normalize_name("Order-Service_v2") == "order service v2"
+
+
+def test_resolution_order():
+    index = NameIndex()
+    index.add("Customer Portal", "a")
+    index.add("Billing Engine", "b")
+    index.add("Payment Service", "c")
+
+    assert index.resolve("customer  portal") == "a"
+    assert index.resolve("Portal Customer") == "a"
+    assert index.resolve("Biling Engine") == "b"
+    assert index.resolve("Shipping Gateway") is None
+    assert index.report["fuzzy"] == [{"name": "Biling Engine", "resolved_to": "Billing Engine", "score": 0.963}]
+    assert index.report["unresolved"] == ["Shipping Gateway"]
+
+
+def test_ambiguities_are_reported():
+    index = NameIndex()
+    index.add("CRM", "first")
+    index.add("crm", "second")
+    index.add("Order Service A", "x")
+    index.add("Order Service B", "y")
+
+    assert index.resolve("CRM") == "first"
+    assert index.resolve("Order Service") is None
+    names = [entry["name"] for entry in index.report["ambiguous"]]
+    assert names == ["CRM", "Order Service"]
+
+
+def test_generation_keeps_near_miss_relationships():
+    content = {
+        "application_layer": [
+            {"type": "ApplicationComponent", "name": "Système de Facturation", "description": ""},
+            {"type": "ApplicationComponent", "name": "Customer Portal", "description": ""},
+        ],
+        "relationships": [
+            {"source": "customer-portal", "target": "Systeme de facturation", "type": "Flow", "description": ""},
+            {"source": "Customer Portal", "target": "Unknown App", "type": "Flow", "description": ""},
+        ],
+    }
+    response = {"choices": [{"message": {"content": json.dumps(content)}}]}
+    with patch("app.services.llm_service.LLMService.generate_response", new_callable=AsyncMock) as mock_generate:
+        mock_generate.return_value = response
+        result = asyncio.run(GenerationService().generate_architecture("fuzzy names", model="fuzzy/test"))
+
+    assert len(result["edges"]) == 1
+    assert result["resolution"]["unresolved"] == ["Unknown App"]
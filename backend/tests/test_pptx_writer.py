@@ -0,0 +1,54 @@
+import zipfile
+from app.services.export_service import ExportService
+from app.services.pptx_writer import SLIDE_PART, write_pptx
+from benchmarks.synthetic import make_graph_dict
+
+GRAPH = {
+    "nodes": [
+        {"id": "a", "type": "BusinessActor", "name": "Customer & <Partner>", "position": {"x": 400, "y": 300}},
+        # Edges leaving upwards and to the left flip the connector
+        {"id": "b", "type": "DataObject", "name": "Order\nLine\vItem", "position": {"x": 100, "y": 50},
+         "width": 200},
+        {"id": "c", "data": {"type": "Goal", "label": "Grow\x07\t"}, "position": {"x": 420, "y": 600}},
+        {"id": "d", "label": "", "position": {"x": 400, "y": -100}, "height": 40},
+        {"id": "e", "type": "Mystery", "name": "\n\vSpare\n", "position": {"x": -50, "y": 300}},
+    ],
+    "edges": [
+        {"source_id": "a", "target_id": "b"},
+        {"source_id": "a", "target_id": "c"},
+        {"source_id": "a", "target_id": "d"},
+        {"source": "c", "target": "e"},
+        {"source_id": "e", "target_id": "a"},
+        {"source_id": "b", "target_id": "b"},
+        {"source_id": "a", "target_id": "missing"},
+    ],
+}
+
+
+def parts(package):
+    with zipfile.ZipFile(package) as zf:
+        return [(name, zf.read(name)) for name in zf.namelist()]
+
+
+def test_same_package_as_python_pptx():
+    for graph in (GRAPH, make_graph_dict(60), {"nodes": [], "edges": []}):
+        assert parts(write_pptx(graph)) == parts(ExportService().create_pptx_python_pptx(graph))
+
+
+def test_slide_is_written_in_batches(monkeypatch):
+    from app.services import pptx_writer
+    monkeypatch.setattr(pptx_writer, "BATCH_SIZE", 7)
+    graph = make_graph_dict(50)
+    slide = dict(parts(write_pptx(graph)))[SLIDE_PART]
+    assert slide == dict(parts(ExportService().create_pptx_python_pptx(graph)))[SLIDE_PART]
+    assert slide.count(b"<p:sp>") == 50
+
+
+def test_writer_is_selected_by_environment(monkeypatch):
+    calls = []
+    monkeypatch.setattr(ExportService, "create_pptx_python_pptx", lambda self, graph: calls.append(graph))
+    ExportService().create_pptx(GRAPH)
+    assert calls == []
+    monkeypatch.setenv("PPTX_WRITER", "python-pptx")
+    ExportService().create_pptx(GRAPH)
+    assert calls == [GRAPH]
@@ -0,0 +1,127 @@
+import asyncio
+import marshal
+import sys
+import threading
+import pytest
+from fastapi.testclient import TestClient
+from app.core import profiling
+from app.core.profiling import RequestProfile, StackSampler, profiled, request_stack
+from app.main import app
+from benchmarks.synthetic import make_graph_dict
+
+client = TestClient(app)
+ADMIN = {"X-Admin-Token": "s3cret"}
+
+
+@pytest.fixture(autouse=True)
+def fresh_store(monkeypatch):
+    monkeypatch.setattr(profiling, "_store", None)
+    monkeypatch.delenv("PROFILING_SLOW_MS", raising=False)
+    monkeypatch.setenv("PROFILING_ADMIN_TOKEN", "s3cret")
+
+
+def test_admin_token_required(monkeypatch):
+    assert client.get("/api/admin/profiles").status_code == 403
+    assert client.get("/api/admin/profiles", headers={"X-Admin-Token": "guess"}).status_code == 403
+
+    # A profiling flag without the token is ignored
+    response = client.get("/health?profile=1")
+    assert response.status_code == 200 and "X-Profile-Id" not in response.headers
+
+    monkeypatch.delenv("PROFILING_ADMIN_TOKEN")
+    assert client.get("/api/admin/profiles", headers=ADMIN).status_code == 404
+    assert "X-Profile-Id" not in client.get("/health", headers={"X-Profile": "1", **ADMIN}).headers
+
+
+def test_profiled_export_request():
+    response = client.post("/api/export/pptx", json=make_graph_dict(10), headers={"X-Profile": "1", **ADMIN})
+    assert response.status_code == 200
+    profile_id = response.headers["X-Profile-Id"]
+
+    (entry,) = client.get("/api/admin/profiles", headers=ADMIN).json()["profiles"]
+    assert entry["id"] == profile_id and entry["kind"] == "cprofile" and entry["path"] == "/api/export/pptx"
+    assert entry["request_id"] == response.headers["X-Request-ID"] != profile_id
+
+    report = client.get(f"/api/admin/profiles/{profile_id}", headers=ADMIN)
+    assert "create_pptx" in report.text
+    dump = client.get(f"/api/admin/profiles/{profile_id}?format=pstats", headers=ADMIN)
+    assert any(name == "create_pptx" for _, _, name in marshal.loads(dump.content))
+    assert client.get("/api/admin/profiles/unknown", headers=ADMIN).status_code == 404
+
+
+def test_reused_request_ids_do_not_overwrite_profiles():
+    headers = {"X-Profile": "1", "X-Request-ID": "same-id", **ADMIN}
+    first = client.get("/health", headers=headers).headers["X-Profile-Id"]
+    second = client.get("/health?again=1", headers=headers).headers["X-Profile-Id"]
+    assert first != second
+    entries = client.get("/api/admin/profiles", headers=ADMIN).json()["profiles"]
+    assert [(e["id"], e["request_id"]) for e in entries] == [(second, "same-id"), (first, "same-id")]
+    assert client.get(f"/api/admin/profiles/{first}", headers=ADMIN).status_code == 200
+
+
+def test_slow_requests_are_sampled(monkeypatch):
+    client.get("/health")  # The first request of a process pays one-time setup: not "fast"
+    monkeypatch.setenv("PROFILING_SLOW_MS", "1")
+    # The slow writer: the deck is built in a worker thread, long enough to be sampled there
+    monkeypatch.setenv("PPTX_WRITER", "python-pptx")
+    assert client.get("/health").status_code == 200  # Too fast to be sampled
+    response = client.post("/api/export/pptx", json=make_graph_dict(40))
+    assert response.status_code == 200 and "X-Profile-Id" not in response.headers
+
+    entries = client.get("/api/admin/profiles", headers=ADMIN).json()["profiles"]
+    assert [e["path"] for e in entries] == ["/api/export/pptx"]
+    folded = client.get(f"/api/admin/profiles/{entries[0]['id']}?format=folded", headers=ADMIN).text
+    assert "create_pptx" in folded
+    assert "create_pptx" in client.get(f"/api/admin/profiles/{entries[0]['id']}", headers=ADMIN).text
+
+
+def test_sampled_stacks_follow_awaits_and_worker_threads():
+    release = threading.Event()
+
+    @profiled
+    def blocking_section():
+        release.wait(5)
+
+    async def handler(ready):
+        profile = RequestProfile("req", "GET", "/", "sample")
+        with profiling.activate(profile):
+            ready.set_result(profile)
+            await asyncio.sleep(0.05)
+            await asyncio.to_thread(blocking_section)
+
+    async def main():
+        ready = asyncio.get_running_loop().create_future()
+        task = asyncio.create_task(handler(ready))
+        profile = await ready
+        await asyncio.sleep(0)
+        awaiting = request_stack(profile, sys._current_frames())
+        assert "handler" in awaiting and awaiting.endswith("(awaiting)")
+
+        sampler = StackSampler(interval=0.002)
+        sampler.register(profile)
+        while not profile.threads:
+            await asyncio.sleep(0.005)
+        await asyncio.sleep(0.05)
+        release.set()
+        await task
+        sampler.unregister(profile)
+        return profile
+
+    profile = asyncio.run(main())
+    assert any("blocking_section" in stack for stack in profile.samples)
+
+
+def test_profiled_section_in_worker_thread_merges_stats():
+    @profiled
+    def section():
+        return sum(range(1000))
+
+    profile = RequestProfile("req", "GET", "/", "cprofile")
+    with profiling.activate(profile):
+        worker = threading.Thread(target=section)  # Threads do not inherit contextvars
+        worker.start()
+        worker.join()
+        assert profile.stats is None
+        asyncio.run(asyncio.to_thread(section))
+    assert any(name == "section" for _, _, name in profile.stats.stats)
+    assert section() == 499500  # Unprofiled: plain call
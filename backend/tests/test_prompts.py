@@ -0,0 +1,40 @@
+import pytest
+from app.core.prompts import OUTPUT_RULE, SHARED_PREFIX, TOGAF_SYSTEM_PROMPTS, build_system_prompt
+from app.core.tokens import count_message_tokens, count_tokens
+from app.services.llm_service import build_messages
+
+# Per-prompt input budget; the original hand-written prompts went up to ~830 tokens
+MAX_PROMPT_TOKENS = 750
+
+
+@pytest.mark.parametrize("schema_type", sorted(TOGAF_SYSTEM_PROMPTS))
+def test_prompts_share_a_stable_prefix(schema_type):
+    prompt = TOGAF_SYSTEM_PROMPTS[schema_type]
+    assert prompt.startswith(SHARED_PREFIX)
+    assert prompt.endswith(OUTPUT_RULE)
+    assert count_tokens(prompt) <= MAX_PROMPT_TOKENS
+
+
+def test_unknown_schema_falls_back_to_default():
+    assert build_system_prompt("does-not-exist") == TOGAF_SYSTEM_PROMPTS["default"]
+
+
+def test_cache_breakpoint_only_for_marker_providers():
+    anthropic = build_messages("system", "user", "anthropic/claude-3.5-sonnet")
+    assert anthropic[0]["content"] == [{"type": "text", "text": "system", "cache_control": {"type": "ephemeral"}}]
+    assert anthropic[1] == {"role": "user", "content": "user"}
+
+    openai = build_messages("system", "user", "openai/gpt-4o")
+    assert openai[0]["content"] == "system"
+
+
+def test_cache_breakpoint_can_be_disabled(monkeypatch):
+    monkeypatch.setenv("LLM_PROMPT_CACHE", "false")
+    assert build_messages("system", "user", "anthropic/claude-3.5-sonnet")[0]["content"] == "system"
+
+
+def test_token_counting():
+    assert count_tokens("") == 0
+    assert count_tokens("Application Component") > 0
+    parts = [{"type": "text", "text": "hello world"}, {"type": "text", "text": "again"}]
+    assert count_message_tokens(parts) == count_tokens("hello world") + count_tokens("again")
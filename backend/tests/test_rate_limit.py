@@ -0,0 +1,145 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from app.core.rate_limit import Priority, RateLimitRejected, TokenBucket, UpstreamScheduler
+from app.core.resilience import CircuitBreakerRegistry, RetryPolicy
+from app.services.llm_service import LLMService, UpstreamBusyError
+from tests.stub_server import StubOpenRouter, completion
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_refills_over_time():
+    clock = FakeClock()
+    bucket = TokenBucket(60, clock)  # one unit per second
+    bucket.consume(60)
+    assert bucket.wait_time(2) == pytest.approx(2.0)
+    clock.now = 2
+    assert bucket.available() == pytest.approx(2.0)
+    assert bucket.wait_time(1000) == pytest.approx(58.0)  # clamped to capacity
+
+
+def test_grants_immediately_within_budget():
+    async def scenario():
+        scheduler = UpstreamScheduler(key_rpm=10)
+        grants = [await scheduler.acquire("key", "m", 100) for _ in range(10)]
+        return scheduler, grants
+
+    scheduler, grants = asyncio.run(scenario())
+    assert all(g.waited == 0 for g in grants)
+    assert scheduler.stats["granted"] == 10
+
+
+def test_rejects_when_wait_exceeds_budget():
+    async def scenario():
+        scheduler = UpstreamScheduler(key_rpm=1, max_wait=5)
+        await scheduler.acquire("key", "m", 1)
+        await scheduler.acquire("key", "m", 1)  # needs ~60 s of refill
+
+    with pytest.raises(RateLimitRejected) as exc_info:
+        asyncio.run(scenario())
+    assert exc_info.value.reason == "budget"
+    assert exc_info.value.retry_after == pytest.approx(60, rel=0.05)
+
+
+def test_rejects_when_queue_full():
+    async def scenario():
+        scheduler = UpstreamScheduler(key_rpm=600, max_queue_depth=1)
+        for _ in range(600):
+            await scheduler.acquire("key", "m", 0)
+        waiting = asyncio.ensure_future(scheduler.acquire("key", "m", 0))
+        await asyncio.sleep(0)
+        try:
+            await scheduler.acquire("key", "m", 0)
+        finally:
+            await waiting
+
+    with pytest.raises(RateLimitRejected) as exc_info:
+        asyncio.run(scenario())
+    assert exc_info.value.reason == "queue_full"
+
+
+def test_interactive_served_before_batch():
+    async def scenario():
+        scheduler = UpstreamScheduler(key_rpm=600)  # one request every 0.1 s
+        for _ in range(600):
+            await scheduler.acquire("key", "m", 0)
+        order = []
+
+        async def call(name, priority):
+            await scheduler.acquire("key", "m", 0, priority=priority)
+            order.append(name)
+
+        batch = [asyncio.ensure_future(call(f"batch{i}", Priority.BATCH)) for i in range(2)]
+        await asyncio.sleep(0)
+        interactive = asyncio.ensure_future(call("interactive", Priority.INTERACTIVE))
+        await asyncio.sleep(0)
+        depth = scheduler.queue_depth()
+        await asyncio.gather(*batch, interactive)
+        return order, depth
+
+    order, depth = asyncio.run(scenario())
+    assert depth["batch"] == 2 and depth["interactive"] == 1
+    assert order[0] == "interactive"
+
+
+def test_model_budget_does_not_block_other_models():
+    async def scenario():
+        scheduler = UpstreamScheduler(model_rpm=1, max_wait=0.5)
+        await scheduler.acquire("key", "slow-model", 0)
+        blocked = asyncio.ensure_future(scheduler.acquire("key", "slow-model", 0, timeout=0.2))
+        await asyncio.sleep(0)
+        grant = await asyncio.wait_for(scheduler.acquire("key", "other-model", 0), 0.1)
+        with pytest.raises(RateLimitRejected):
+            await blocked
+        return grant
+
+    assert asyncio.run(scenario()).waited == 0
+
+
+def test_idle_model_budgets_are_forgotten():
+    async def scenario():
+        clock = FakeClock()
+        scheduler = UpstreamScheduler(model_rpm=60, clock=clock, max_budgets=3)
+        for i in range(5):
+            await scheduler.acquire("key", f"model-{i}", 0)
+        # Each model still owes a refill: none can be dropped yet
+        assert len(scheduler._model_budgets) == 5
+        clock.now = 1
+        await scheduler.acquire("key", "model-5", 0)
+        return scheduler
+
+    assert list(asyncio.run(scenario())._model_budgets) == ["model-5"]
+
+
+def test_llm_service_surfaces_busy_status(monkeypatch):
+    heavy = completion("{}")
+    heavy["usage"]["total_tokens"] = 5000  # actual usage drains the whole TPM budget
+    with StubOpenRouter({"m": [(200, {}, heavy, 0)]}) as stub:
+        monkeypatch.setenv("OPENROUTER_BASE_URL", stub.base_url)
+        service = LLMService()
+        service.retry_policy = RetryPolicy(max_retries=0, deadline=5)
+        service.breakers = CircuitBreakerRegistry()
+        service.scheduler = UpstreamScheduler(key_tpm=5000, max_wait=1)
+
+        async def scenario():
+            await service.generate_response("p", "s", model="m", fallback_models=[])
+            await service.generate_response("p", "s", model="m", fallback_models=[])
+
+        with pytest.raises(UpstreamBusyError) as exc_info:
+            asyncio.run(scenario())
+        assert exc_info.value.status_code == 429
+        assert stub.calls_for("m") == 1
+
+
+def test_upstream_status_endpoint():
+    from app.main import app
+    body = TestClient(app).get("/api/upstream/status").json()
+    assert set(body["queue_depth"]) == {"interactive", "batch", "background"}
+    assert "granted" in body["scheduler"]
@@ -0,0 +1,129 @@
+import re
+import zlib
+import pytest
+from fastapi.testclient import TestClient
+from lxml import etree
+from app.api.endpoints import export
+from app.main import app
+from app.services.export_service import ExportService
+from app.services.render_service import RenderInputError, render_pdf, render_svg, text_width, wrap_label
+from benchmarks.synthetic import make_graph_dict
+
+client = TestClient(app)
+SVG = {"s": "http://www.w3.org/2000/svg"}
+
+GRAPH = {
+    "nodes": [
+        {"id": "a", "type": "BusinessActor", "name": "Customer & <Partner> (VIP)", "position": {"x": 100, "y": 50}},
+        {"id": "b", "type": "DataObject", "name": "Order", "position": {"x": 100, "y": 250}, "width": 200},
+        {"id": "c", "data": {"type": "Goal", "label": "Grow"}, "position": {"x": 400, "y": 50}},
+    ],
+    "edges": [{"source_id": "a", "target_id": "b"}, {"source": "a", "target": "missing"}],
+}
+
+
+def test_svg_uses_the_export_colors():
+    root = etree.fromstring(b"".join(render_svg(GRAPH)))
+    rects = root.findall("s:g/s:rect", SVG)
+    fill, border = ExportService()._get_color_by_type("BusinessActor")
+    assert (rects[0].get("fill"), rects[0].get("stroke")) == (f"#{fill}", f"#{border}")
+    assert rects[1].get("fill") == "#E8F5E9" and rects[1].get("width") == "200"
+    assert rects[2].get("fill") == "#F5F5F5"  # Goal: default colors
+
+    # Wrapped over two lines, escaped
+    assert [t.text for t in root.find("s:g/s:text", SVG)] == ["Customer & <Partner>", "(VIP)"]
+    (line,) = root.findall("s:line", SVG)  # The edge to an unknown node is dropped
+    # Bottom of the source to the top of the target
+    assert [line.get(k) for k in ("x1", "y1", "x2", "y2")] == ["175", "130", "200", "250"]
+    assert root.get("viewBox") == "80 30 490 320"
+
+
+def test_svg_thumbnail_and_streaming():
+    thumbnail = etree.fromstring(b"".join(render_svg(GRAPH, width=99)))
+    assert (thumbnail.get("width"), thumbnail.get("height")) == ("99", "64.65")
+    assert thumbnail.get("viewBox") == "80 30 490 320"
+
+    chunks = list(render_svg(make_graph_dict(100), batch_size=10))
+    assert b"<svg" in chunks[0] and b"<rect x" in chunks[0] and b"<g>" not in chunks[0]
+    assert len(chunks) > 10
+
+
+def test_labels_wrap_inside_their_node():
+    lines = wrap_label("Customer relationship management platform for the whole group", 150, 45)
+    assert len(lines) == 2 and lines[-1].endswith("...")
+    assert all(text_width(line, 12) <= 150 - 12 for line in lines)
+    assert wrap_label("Supercalifragilisticexpialidocious", 80, 80)[0] == "Supercalifra"
+
+
+def test_pdf_is_well_formed():
+    pdf = b"".join(render_pdf(GRAPH, batch_size=1))
+    assert pdf.startswith(b"%PDF-1.4") and pdf.endswith(b"%%EOF\n")
+
+    # Every xref entry points at its object, startxref at the table
+    startxref = int(re.search(rb"startxref\n(\d+)", pdf).group(1))
+    assert pdf[startxref:].startswith(b"xref")
+    offsets = re.findall(rb"(\d{10}) 00000 n", pdf[startxref:])
+    for number, offset in enumerate(offsets, 1):
+        assert pdf[int(offset):].startswith(b"%d 0 obj" % number)
+
+    start, end = pdf.index(b"stream\n") + 7, pdf.index(b"\nendstream")
+    assert int(re.search(rb"6 0 obj\n(\d+)", pdf).group(1)) == end - start
+    content = zlib.decompress(pdf[start:end]).decode("latin-1")
+    assert "(Customer & <Partner>) Tj" in content and "(\\(VIP\\)) Tj" in content
+    assert "0.88 0.96 1 rg 0.01 0.53 0.82 RG" in content  # BusinessActor colors
+    assert content.count(" l S") == 1
+    assert b"/MediaBox [0 0 490 320]" in pdf
+
+
+def test_render_endpoints_are_cached(monkeypatch):
+    renders = []
+
+    def counting_render(graph_data, **options):
+        renders.append(options)
+        return render_svg(graph_data, **options)
+
+    monkeypatch.setitem(export.RENDER_FORMATS, "svg", ("image/svg+xml", counting_render))
+    graph = make_graph_dict(30)
+    first = client.post("/api/export/svg", json=graph)
+    second = client.post("/api/export/svg", json=graph)
+    assert len(renders) == 1
+    assert first.status_code == second.status_code == 200
+    assert first.content == second.content
+    assert first.headers["content-type"] == "image/svg+xml"
+    # Served from cache and compressed: same tag, with the encoding suffix
+    assert second.headers["etag"].startswith(first.headers["etag"].rstrip('"'))
+
+    # A POST always gets the body; revalidation goes through the GET named by Content-Location
+    resent = client.post("/api/export/svg", json=graph, headers={"If-None-Match": first.headers["etag"]})
+    assert resent.status_code == 200 and resent.content == first.content
+    location = first.headers["content-location"]
+    assert location.startswith("/api/export/render/") and location.endswith(".svg")
+    fetched = client.get(location)
+    assert fetched.status_code == 200 and fetched.content == first.content
+    unchanged = client.get(location, headers={"If-None-Match": first.headers["etag"]})
+    assert unchanged.status_code == 304 and len(renders) == 1
+    assert client.get(location.replace(".svg", ".png")).status_code == 404
+    assert client.get("/api/export/render/unknown.svg").status_code == 404
+
+    thumbnail = client.post("/api/export/svg?width=240", json=graph)
+    assert renders == [{"width": None}, {"width": 240.0}]
+    assert thumbnail.headers["content-disposition"].startswith("inline")
+    assert etree.fromstring(thumbnail.content).get("width") == "240"
+
+    pdf = client.post("/api/export/pdf", json=graph)
+    assert pdf.status_code == 200 and pdf.headers["content-type"] == "application/pdf"
+    assert pdf.content.startswith(b"%PDF")
+
+
+def test_bad_node_values_are_rejected_before_streaming():
+    for node in (
+        {"id": "a", "position": {"x": "left", "y": 0}},
+        {"id": "a", "position": "top"},
+        {"id": "a", "width": "nan"},
+    ):
+        graph = {"nodes": [node], "edges": []}
+        for path in ("/api/export/svg", "/api/export/pdf"):
+            response = client.post(path, json=graph)
+            assert response.status_code == 422 and response.json()["detail"].startswith("Node 0")
+    with pytest.raises(RenderInputError):
+        render_svg({"nodes": [], "edges": [{"source": ["unhashable"]}]})
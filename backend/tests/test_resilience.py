@@ -0,0 +1,125 @@
+import asyncio
+import httpx
+import pytest
+from unittest.mock import AsyncMock, patch
+from fastapi.testclient import TestClient
+from app.core.resilience import (
+    CircuitBreaker, CircuitBreakerRegistry, Deadline, LatencyTracker, RetryPolicy, parse_retry_after,
+)
+from app.services.llm_service import (
+    LLMService, CircuitOpenError, DeadlineExceededError, UpstreamRateLimitedError, UpstreamUnavailableError
+)
+from tests.stub_server import StubOpenRouter, completion
+
+OK = (200, {}, completion('{"business_layer": []}'), 0)
+
+
+def make_service(stub, monkeypatch, failure_threshold=5):
+    monkeypatch.setenv("OPENROUTER_BASE_URL", stub.base_url)
+    service = LLMService()
+    service.retry_policy = RetryPolicy(max_retries=2, base_delay=0.01, max_delay=0.05, attempt_timeout=2, deadline=5)
+    service.breakers = CircuitBreakerRegistry(failure_threshold=failure_threshold, reset_timeout=60)
+    return service
+
+
+def generate(service, model="primary", **kwargs):
+    return asyncio.run(service.generate_response("prompt", "system", model=model, fallback_models=kwargs.pop("fallback_models", []), **kwargs))
+
+
+def test_retries_429_honoring_retry_after(monkeypatch):
+    with StubOpenRouter({"primary": [(429, {"Retry-After": "0"}, {"error": "rate limited"}, 0), OK]}) as stub:
+        result = generate(make_service(stub, monkeypatch))
+        assert result["choices"][0]["finish_reason"] == "stop"
+        assert stub.calls_for("primary") == 2
+
+
+def test_gives_up_after_max_retries(monkeypatch):
+    with StubOpenRouter({"primary": [(500, {}, {"error": "boom"}, 0)]}) as stub:
+        with pytest.raises(UpstreamUnavailableError):
+            generate(make_service(stub, monkeypatch))
+        assert stub.calls_for("primary") == 3
+
+
+def test_non_retryable_error_is_not_retried(monkeypatch):
+    with StubOpenRouter({"primary": [(400, {}, {"error": "bad request"}, 0)]}) as stub:
+        with pytest.raises(httpx.HTTPStatusError):
+            generate(make_service(stub, monkeypatch))
+        assert stub.calls_for("primary") == 1
+
+
+def test_circuit_opens_and_fails_fast(monkeypatch):
+    with StubOpenRouter({"primary": [(503, {}, {"error": "down"}, 0)]}) as stub:
+        service = make_service(stub, monkeypatch, failure_threshold=1)
+        with pytest.raises(UpstreamUnavailableError):
+            generate(service)
+        calls = stub.calls_for("primary")
+        with pytest.raises(CircuitOpenError) as exc_info:
+            generate(service)
+        assert stub.calls_for("primary") == calls
+        assert exc_info.value.retry_after > 0
+
+
+def test_falls_back_to_secondary_model(monkeypatch):
+    with StubOpenRouter({"primary": [(429, {}, {"error": "rate limited"}, 0)], "backup": [OK]}) as stub:
+        result = generate(make_service(stub, monkeypatch), fallback_models=["backup"])
+        assert result["choices"]
+        assert [r["model"] for r in stub.requests][-1] == "backup"
+
+
+def test_deadline_budget_is_enforced(monkeypatch):
+    with StubOpenRouter({"primary": [(200, {}, completion("{}"), 1.0)]}) as stub:
+        with pytest.raises(DeadlineExceededError):
+            generate(make_service(stub, monkeypatch), deadline=Deadline(0.2))
+
+
+def test_retry_after_parsing():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:10 GMT", now=1445412480) == 10.0
+    assert parse_retry_after("garbage") is None
+    assert parse_retry_after(None) is None
+
+
+def test_backoff_is_bounded():
+    policy = RetryPolicy(base_delay=1, max_delay=4)
+    assert policy.backoff(0, rng=lambda lo, hi: hi) == 1
+    assert policy.backoff(10, rng=lambda lo, hi: hi) == 4
+
+
+def test_breaker_half_open_trial():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=lambda: now[0])
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and not breaker.allow()
+    now[0] = 11
+    assert breaker.allow()          # single trial
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_per_model_state_is_bounded():
+    breakers = CircuitBreakerRegistry(failure_threshold=1, max_keys=3)
+    breakers.get("down").record_failure()
+    for i in range(10):
+        breakers.get(f"client-{i}")
+    # Open breakers outlive closed ones
+    assert list(breakers.states()) == ["down", "client-8", "client-9"]
+    assert breakers.get("down").state == CircuitBreaker.OPEN
+
+    latencies = LatencyTracker(max_keys=2)
+    latencies.observe("a", 1.0)
+    latencies.observe("b", 2.0)
+    latencies.observe("a", 3.0)
+    latencies.observe("c", 4.0)
+    assert (latencies.count("a"), latencies.count("b"), latencies.count("c")) == (2, 0, 1)
+
+
+def test_endpoint_maps_rate_limit_to_429():
+    from app.main import app
+    with patch("app.services.generation_service.GenerationService.generate_architecture", new_callable=AsyncMock) as mock_gen:
+        mock_gen.side_effect = UpstreamRateLimitedError("slow down", retry_after=1.5)
+        response = TestClient(app).post("/api/generate", json={"prompt": "x"})
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "2"
@@ -0,0 +1,111 @@
+import asyncio
+import json
+import multiprocessing
+import time
+from unittest.mock import AsyncMock, patch
+from fastapi.testclient import TestClient
+from app.core.shared_cache import FileCache, MemoryCache, create_cache, get_shared_cache
+from app.main import app
+from app.services.generation_service import GenerationService
+
+
+def test_memory_cache_ttl_lru_and_stats():
+    cache = MemoryCache(max_entries=2)
+    ns = cache.namespace("t")
+    ns.set("a", b"1", ttl=0.05)
+    ns.set("b", b"2")
+    assert ns.get("a") == b"1"
+    ns.set("c", b"3")  # evicts the least recently used ("b")
+    assert ns.get("b") is None
+    time.sleep(0.06)
+    assert ns.get("a") is None
+    assert cache.stats()["namespaces"]["t"] == {"hits": 1, "misses": 2, "sets": 3, "errors": 0, "hit_ratio": 0.3333}
+
+
+def test_file_cache_prunes_expired_and_oldest(tmp_path):
+    cache = FileCache(str(tmp_path), max_entries=2, prune_every=1000)
+    ns = cache.namespace("t")
+    ns.set("old", b"x", ttl=0.01)
+    for key in ("k1", "k2", "k3"):
+        ns.set(key, key.encode())
+        time.sleep(0.01)
+    assert cache.prune() == 2
+    assert ns.get("k1") is None and ns.get("k3") == b"k3"
+
+
+def test_create_cache_from_url(tmp_path):
+    assert create_cache("memory://").backend == "memory"
+    file_cache = create_cache(f"file://{tmp_path}")
+    assert file_cache.backend == "file" and file_cache.directory == str(tmp_path)
+
+
+def _worker(worker_id, results):
+    # Configured like a worker process of the app: SHARED_CACHE_URL, inherited from the parent
+    cache = get_shared_cache()
+    ns = cache.namespace("shared")
+    if ns.get("warm") is None:
+        ns.set("warm", f"from-{worker_id}".encode())
+    seen = ns.get("warm")
+    for i in range(50):
+        ns.set(f"k{i}", json.dumps({"worker": worker_id, "i": i}).encode())
+        value = ns.get(f"k{(i * 7) % 50}")
+        if value is not None:
+            json.loads(value)  # never a torn write
+    results.put((worker_id, cache.backend, seen.decode(), cache.stats()))
+
+
+def test_processes_share_the_configured_backend(tmp_path, monkeypatch):
+    monkeypatch.setenv("SHARED_CACHE_URL", f"file://{tmp_path}")
+    get_shared_cache().namespace("shared").set("warm", b"from-parent")
+
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    workers = [ctx.Process(target=_worker, args=(i, results)) for i in range(4)]
+    for w in workers:
+        w.start()
+    collected = [results.get(timeout=30) for _ in workers]
+    for w in workers:
+        w.join(timeout=30)
+
+    assert all(backend == "file" and seen == "from-parent" for _, backend, seen, _ in collected)
+    pids = {stats["pid"] for _, _, _, stats in collected}
+    assert len(pids) == 4
+    for _, _, _, stats in collected:
+        assert stats["namespaces"]["shared"]["hits"] >= 2
+        assert stats["namespaces"]["shared"]["errors"] == 0
+
+
+def test_async_calls_leave_the_loop_for_blocking_backends(tmp_path):
+    import threading
+    seen = []
+
+    class RecordingCache(FileCache):
+        def _get(self, key):
+            seen.append(threading.current_thread() is threading.main_thread())
+            return super()._get(key)
+
+    async def scenario(cache):
+        ns = cache.namespace("t")
+        await ns.aset_json("k", {"a": 1})
+        return await ns.aget_json("k")
+
+    assert asyncio.run(scenario(RecordingCache(str(tmp_path)))) == {"a": 1}
+    assert seen == [False]
+    assert asyncio.run(scenario(MemoryCache())) == {"a": 1}
+
+
+def test_generation_results_are_cached(monkeypatch):
+    monkeypatch.setenv("GENERATION_CACHE_TTL", "300")
+    content = json.dumps({"business_layer": [{"type": "BusinessActor", "name": "Customer", "description": ""}], "relationships": []})
+    response = {"choices": [{"message": {"content": content}}]}
+    with patch("app.services.llm_service.LLMService.generate_response", new_callable=AsyncMock) as mock_generate:
+        mock_generate.return_value = response
+        first = asyncio.run(GenerationService().generate_architecture("cached prompt", model="cache/test"))
+        second = asyncio.run(GenerationService().generate_architecture("cached prompt", model="cache/test"))
+
+    assert mock_generate.await_count == 1
+    assert second["nodes"][0]["name"] == "Customer"
+    assert second["nodes"][0]["tags"] == [] and second["nodes"][0]["layer"] == "Business"
+
+    stats = TestClient(app).get("/api/cache/stats").json()
+    assert stats["namespaces"]["generation"]["hits"] == 1
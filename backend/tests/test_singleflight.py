@@ -0,0 +1,184 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock, patch
+from app.core.singleflight import SingleFlight
+from app.services.generation_service import GenerationService
+
+
+def test_concurrent_calls_share_one_execution():
+    async def scenario():
+        flight = SingleFlight()
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return {"value": 42}
+
+        results = await asyncio.gather(*(flight.do("k", work) for _ in range(5)))
+        return flight, calls, results
+
+    flight, calls, results = asyncio.run(scenario())
+    assert calls == 1
+    assert all(r is results[0] for r in results)
+    assert flight.stats == {"leaders": 1, "shared": 4, "abandoned": 0}
+    assert flight.in_flight() == 0
+
+
+def test_different_keys_run_separately():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def work(v):
+            await asyncio.sleep(0.01)
+            return v
+
+        return await asyncio.gather(flight.do("a", lambda: work(1)), flight.do("b", lambda: work(2)))
+
+    assert asyncio.run(scenario()) == [1, 2]
+
+
+def test_cancelled_waiter_does_not_cancel_others():
+    async def scenario():
+        flight = SingleFlight()
+        started = asyncio.Event()
+
+        async def work():
+            started.set()
+            await asyncio.sleep(0.05)
+            return "done"
+
+        leader = asyncio.create_task(flight.do("k", work))
+        follower = asyncio.create_task(flight.do("k", work))
+        await started.wait()
+        leader.cancel()
+        result = await follower
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return flight, result
+
+    flight, result = asyncio.run(scenario())
+    assert result == "done"
+    assert flight.stats["abandoned"] == 0
+
+
+def test_last_waiter_leaving_cancels_upstream():
+    async def scenario():
+        flight = SingleFlight()
+        upstream_cancelled = asyncio.Event()
+
+        async def work():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                upstream_cancelled.set()
+                raise
+
+        waiters = [asyncio.create_task(flight.do("k", work)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for w in waiters:
+            w.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.wait_for(upstream_cancelled.wait(), 1)
+        await asyncio.sleep(0)
+        return flight
+
+    flight = asyncio.run(scenario())
+    assert flight.stats["abandoned"] == 1
+    assert flight.in_flight() == 0
+
+
+def test_caller_after_abandon_starts_a_new_flight():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def work():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                await asyncio.sleep(0.05)  # Slow to unwind, like closing an upstream connection
+                raise
+
+        async def fresh():
+            return "fresh"
+
+        waiter = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        # The abandoned task is still unwinding: this must not join it
+        return await flight.do("k", fresh), flight
+
+    result, flight = asyncio.run(scenario())
+    assert result == "fresh"
+    assert flight.stats == {"leaders": 2, "shared": 0, "abandoned": 1}
+
+
+def test_exception_propagates_to_all_waiters():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.01)
+            raise ValueError("upstream failed")
+
+        return await asyncio.gather(*(flight.do("k", work) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+def test_generation_service_coalesces_identical_requests():
+    mock_llm_response = {
+        "choices": [{"message": {"content": json.dumps({
+            "business_layer": [{"type": "BusinessActor", "name": "Customer", "description": "End user"}],
+            "relationships": []
+        })}}]
+    }
+
+    async def slow_response(*args, **kwargs):
+        await asyncio.sleep(0.01)
+        return mock_llm_response
+
+    with patch("app.services.llm_service.LLMService.generate_response", new_callable=AsyncMock) as mock_generate:
+        mock_generate.side_effect = slow_response
+
+        async def scenario():
+            return await asyncio.gather(
+                GenerationService().generate_architecture("Same prompt", "application", "m"),
+                GenerationService().generate_architecture("Same prompt", "application", "m"),
+                GenerationService().generate_architecture("Other prompt", "application", "m"),
+            )
+
+        first, second, third = asyncio.run(scenario())
+        assert first is second
+        assert third is not first
+        assert mock_generate.call_count == 2
+
+
+def test_generation_flights_are_per_priority():
+    from app.core.rate_limit import Priority
+    mock_llm_response = {"choices": [{"message": {"content": json.dumps({"relationships": []})}}]}
+    priorities = []
+
+    async def slow_response(*args, **kwargs):
+        priorities.append(kwargs.get("priority"))
+        await asyncio.sleep(0.01)
+        return mock_llm_response
+
+    with patch("app.services.llm_service.LLMService.generate_response", new_callable=AsyncMock) as mock_generate:
+        mock_generate.side_effect = slow_response
+
+        async def scenario():
+            # An interactive request must not wait in the batch queue behind a batch leader
+            return await asyncio.gather(
+                GenerationService().generate_architecture("Same prompt", "application", "m", Priority.BATCH),
+                GenerationService().generate_architecture("Same prompt", "application", "m", Priority.INTERACTIVE),
+                GenerationService().generate_architecture("Same prompt", "application", "m", Priority.INTERACTIVE),
+            )
+
+        batch, interactive, other = asyncio.run(scenario())
+        assert interactive is other and batch is not interactive
+        assert sorted(priorities) == [Priority.INTERACTIVE, Priority.BATCH]
@@ -0,0 +1,94 @@
+import asyncio
+from app.core.metamodel import ElementType
+from app.core.resilience import RetryPolicy
+from app.core.schema import LAYER_KEYS, graph_json_schema
+from app.core.utils import extract_json_from_text
+from app.services.llm_service import LLMService
+from app.services.model_capabilities import ModelCapabilityRegistry
+from tests.stub_server import StubOpenRouter, completion
+
+OK = (200, {}, completion('{"business_layer": []}'), 0)
+REJECTED = (400, {}, {"error": {"message": "response_format is not supported"}}, 0)
+
+CATALOGUE = {
+    "strict/model": {"id": "strict/model", "supported_parameters": ["structured_outputs", "response_format"]},
+    "json/model": {"id": "json/model", "supported_parameters": ["response_format"]},
+    "plain/model": {"id": "plain/model", "supported_parameters": ["temperature"]},
+}
+
+
+def make_service(stub, monkeypatch):
+    monkeypatch.setenv("OPENROUTER_BASE_URL", stub.base_url)
+    service = LLMService()
+    service.retry_policy = RetryPolicy(max_retries=0, attempt_timeout=2, deadline=5)
+    service.capabilities = ModelCapabilityRegistry(lookup=CATALOGUE.get)
+    return service
+
+
+def generate(service, model):
+    return asyncio.run(service.generate_response(
+        "prompt", "system", model=model, fallback_models=[], json_schema=graph_json_schema()
+    ))
+
+
+def test_schema_is_built_from_metamodel_enums():
+    schema = graph_json_schema()
+    element_types = schema["properties"]["business_layer"]["items"]["properties"]["type"]["enum"]
+    assert set(element_types) == {t.value for t in ElementType}
+    assert schema["required"] == list(LAYER_KEYS) + ["relationships"]
+    assert "Junction" not in schema["properties"]["relationships"]["items"]["properties"]["type"]["enum"]
+
+
+def test_output_mode_from_catalogue_and_static_list(monkeypatch):
+    registry = ModelCapabilityRegistry(lookup=CATALOGUE.get)
+    assert registry.output_mode("strict/model") == "json_schema"
+    assert registry.output_mode("json/model") == "json_object"
+    assert registry.output_mode("plain/model") == "text"
+    # Not in the catalogue yet: static prefixes
+    assert registry.output_mode("openai/gpt-4o-mini") == "json_schema"
+    assert registry.output_mode("unknown/model") == "text"
+
+    monkeypatch.setenv("LLM_STRUCTURED_OUTPUT", "off")
+    assert registry.output_mode("strict/model") == "text"
+
+
+def test_strict_schema_sent_to_capable_model(monkeypatch):
+    with StubOpenRouter({"strict/model": [OK], "plain/model": [OK]}) as stub:
+        service = make_service(stub, monkeypatch)
+        generate(service, "strict/model")
+        generate(service, "plain/model")
+
+    strict, plain = stub.requests
+    assert strict["response_format"]["type"] == "json_schema"
+    assert strict["response_format"]["json_schema"]["strict"] is True
+    assert strict["provider"] == {"require_parameters": True}
+    assert "response_format" not in plain
+
+
+def test_rejected_response_format_falls_back_to_free_text(monkeypatch):
+    with StubOpenRouter({"json/model": [REJECTED, OK]}) as stub:
+        service = make_service(stub, monkeypatch)
+        result = generate(service, "json/model")
+        assert result["choices"][0]["finish_reason"] == "stop"
+        assert [("response_format" in r) for r in stub.requests] == [True, False]
+
+        # Remembered: the next call goes straight to free text
+        generate(service, "json/model")
+        assert "response_format" not in stub.requests[-1]
+        assert service.breakers.get("json/model").state == "closed"
+
+
+def test_rejections_remembered_are_bounded(monkeypatch):
+    monkeypatch.setattr(ModelCapabilityRegistry, "MAX_REJECTED", 2)
+    registry = ModelCapabilityRegistry()
+    for model in ("openai/gpt-4o", "openai/gpt-4o-mini", "openai/gpt-4.1"):
+        registry.mark_unsupported(model)
+    assert [registry.output_mode(m) for m in ("openai/gpt-4o", "openai/gpt-4o-mini", "openai/gpt-4.1")] == [
+        "json_schema", "text", "text",
+    ]
+
+
+def test_bare_json_fast_path():
+    assert extract_json_from_text('  {"business_layer": [], "relationships": []}\n') == {
+        "business_layer": [], "relationships": []
+    }
@@ -0,0 +1,113 @@
+import asyncio
+import io
+import json
+import pytest
+from fastapi.testclient import TestClient
+from app.core.tracing import (
+    TRACER, ConsoleSpanExporter, InMemorySpanExporter, Tracer, current_span, parse_traceparent, request_context
+)
+from app.main import app
+from tests.stub_server import StubOpenRouter, completion
+
+GRAPH = json.dumps({
+    "business_layer": [{"type": "BusinessActor", "name": "Customer", "description": ""}],
+    "application_layer": [{"type": "ApplicationComponent", "name": "CRM", "description": ""}],
+    "relationships": [{"source": "Customer", "target": "CRM", "type": "Serving"}],
+})
+
+
+@pytest.fixture
+def exporter():
+    exporter = InMemorySpanExporter()
+    TRACER.add_exporter(exporter)
+    yield exporter
+    TRACER.remove_exporter(exporter)
+
+
+def test_nested_spans_share_the_trace():
+    exporter = InMemorySpanExporter()
+    tracer = Tracer([exporter])
+    with tracer.span("root") as root:
+        with tracer.span("child", stage="parse") as child:
+            assert current_span() is child
+        assert current_span() is root
+
+    child, root = exporter.get_finished_spans()
+    assert child.trace_id == root.trace_id
+    assert child.parent_id == root.span_id and root.parent_id is None
+    assert child.attributes == {"stage": "parse"}
+    assert root.end_ns >= child.end_ns >= child.start_ns >= root.start_ns
+
+
+def test_error_status_and_request_id():
+    exporter = InMemorySpanExporter()
+    tracer = Tracer([exporter])
+    with request_context("req-1"):
+        with pytest.raises(ValueError):
+            with tracer.span("failing"):
+                raise ValueError("bad json")
+
+    (span,) = exporter.get_finished_spans()
+    assert span.status == "ERROR" and span.status_message == "bad json"
+    assert span.attributes == {"request.id": "req-1", "exception.type": "ValueError"}
+
+
+def test_tasks_inherit_the_current_span():
+    exporter = InMemorySpanExporter()
+    tracer = Tracer([exporter])
+
+    async def zone(name):
+        with tracer.span(name):
+            await asyncio.sleep(0)
+
+    async def main():
+        with tracer.span("chunked"):
+            await asyncio.gather(zone("a"), zone("b"))
+
+    asyncio.run(main())
+    spans = {s.name: s for s in exporter.get_finished_spans()}
+    assert spans["a"].parent_id == spans["b"].parent_id == spans["chunked"].span_id
+
+
+def test_traceparent_and_console_export():
+    assert parse_traceparent("00-" + "a" * 32 + "-" + "b" * 16 + "-01") == ("a" * 32, "b" * 16)
+    assert parse_traceparent("00-" + "0" * 32 + "-" + "b" * 16 + "-01") is None
+    assert parse_traceparent("garbage") is None
+
+    stream = io.StringIO()
+    with Tracer([ConsoleSpanExporter(stream)]).span("export_pptx", parent=("a" * 32, "b" * 16)):
+        pass
+    line = json.loads(stream.getvalue())
+    assert line["traceId"] == "a" * 32 and line["parentSpanId"] == "b" * 16
+    assert line["name"] == "export_pptx" and line["durationMs"] >= 0
+
+
+def test_generate_request_is_traced_end_to_end(monkeypatch, exporter):
+    with StubOpenRouter({"trace/model": [(200, {}, completion(GRAPH), 0)]}) as stub:
+        monkeypatch.setenv("OPENROUTER_BASE_URL", stub.base_url)
+        response = TestClient(app).post(
+            "/api/generate", json={"prompt": "trace me", "model": "trace/model"}, headers={"X-Request-ID": "abc-123"}
+        )
+
+    assert response.status_code == 200
+    assert response.headers["X-Request-ID"] == "abc-123"
+
+    spans = [s for s in exporter.get_finished_spans() if s.attributes.get("request.id") == "abc-123"]
+    by_name = {s.name: s for s in spans}
+    assert {"POST /api/generate", "generate_architecture", "llm_call", "upstream_http", "parse",
+            "graph_build", "serialize", "compliance", "response"} <= set(by_name)
+    assert len({s.trace_id for s in spans}) == 1
+
+    root = by_name["POST /api/generate"]
+    assert root.attributes["http.status_code"] == 200
+    assert by_name["generate_architecture"].parent_id == root.span_id
+    assert by_name["llm_call"].parent_id == by_name["generate_architecture"].span_id
+    assert by_name["upstream_http"].parent_id == by_name["llm_call"].span_id
+    assert by_name["upstream_http"].attributes["http.status_code"] == 200
+    assert by_name["compliance"].parent_id == root.span_id
+
+
+def test_invalid_request_id_is_replaced():
+    response = TestClient(app).get("/health", headers={"X-Request-ID": "not valid\tid" * 20})
+    request_id = response.headers["X-Request-ID"]
+    assert len(request_id) == 32 and int(request_id, 16)
@@ -34,7 +34,7 @@ export const SettingsModal: React.FC<SettingsModalProps> = ({ isOpen, onClose, s
         setLoadingModels(true);
 
         if (selectedProvider === 'openrouter') {
-            fetch('http://localhost:8000/api/models')
+            fetch('http://localhost:8000/api/models?fields=id,name')
                 .then(res => res.json())
                 .then(data => {
                     if (data && data.data) {